@@ -0,0 +1,76 @@
+"""Autocomplete latency over a million stored vulnerabilities.
+
+    python benchmarks/bench_autocomplete.py [records]
+
+The index is loaded from generated rows (CVE IDs, 'Ecosystem/name'
+packages from a pool of 50k names, titles), the way warm() loads the
+table, then queried with ID prefixes, package prefixes, full names,
+title prefixes and misspelled package names. Fuzzy title matches need
+PostgreSQL and aren't part of this run.
+"""
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'projet_vtbda.settings')
+
+import django  # noqa: E402
+django.setup()
+
+from collectors.services.autocomplete import AutocompleteIndex, get_autocomplete_settings  # noqa: E402
+
+ECOSYSTEMS = ('PyPI', 'npm', 'Maven', 'Go', 'crates.io', 'RubyGems')
+SYLLABLES = ('ka', 'lo', 'mi', 'ra', 'tu', 'zen', 'py', 'js', 'net', 'sec', 'log', 'data', 'web', 'auth')
+QUERIES = ['cve-2021-4', 'cve-2019', 'CVE-2023-12345', 'lo', 'kalo', 'PyPI/ra', 'tuzen', 'secweb',
+           'remote code', 'sql injection in', 'kalomi', 'netsce', 'autdata', 'webloggs']
+
+
+def names(count, rng):
+    return [''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) + str(i % 10) for i in range(count)]
+
+
+def rows(count, rng):
+    pool = names(50000, rng)
+    for i in range(count):
+        packages = [f"{rng.choice(ECOSYSTEMS)}/{rng.choice(pool)}" for _ in range(rng.randint(0, 3))]
+        yield i + 1, f"CVE-{2000 + i % 25}-{10000 + i}", '[' + ', '.join(f'"{p}"' for p in packages) + ']'
+
+
+def titles(count, rng):
+    kinds = ('Remote code execution', 'SQL injection', 'Cross-site scripting', 'Path traversal', 'Denial of service')
+    for i in range(count):
+        yield f"{rng.choice(kinds)} in {rng.choice(SYLLABLES)}{rng.choice(SYLLABLES)} {i % 1000}"
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    config = get_autocomplete_settings()
+    rng = random.Random(7)
+    index = AutocompleteIndex(config)
+    tracemalloc.start()
+    start = time.perf_counter()
+    index.load(rows(count, rng), titles(min(count, config['MAX_TITLES']), rng))
+    load_time = time.perf_counter() - start
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"{count:,} records: {len(index.ids):,} IDs, {len(index.package_counts):,} packages, "
+          f"{len(index.titles):,} titles loaded in {load_time:.1f} s, {memory / 1e6:.0f} MB")
+
+    timings = []
+    for query in QUERIES:
+        index.suggest(query, 10)
+        start = time.perf_counter()
+        for _ in range(20):
+            suggestions = index.suggest(query, 10)
+        elapsed = (time.perf_counter() - start) / 20 * 1000
+        timings.append(elapsed)
+        print(f"  {query!r:20} {elapsed:6.3f} ms  {len(suggestions)} suggestions, first: {suggestions[0]['value'] if suggestions else '-'}")
+    print(f"median {statistics.median(timings):.3f} ms, max {max(timings):.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""Normalization and HTML extraction inline against the CPU pool at 1/2/4/8 workers.
+
+    python benchmarks/bench_cpu_pool.py [items]
+
+NVD API items (descriptions, CVSS metrics, references, CPE configurations)
+are normalized into VulnRecords the way iter_source does it, page by page:
+once from decoded pages, and once from undecoded response bodies (the path
+taken for NVD when the pool is on, where json.loads runs in the workers).
+ExploitDB-style listing pages are parsed and extracted by the spec engine
+from several threads at once, the way run_spec follows pages. Worker
+start-up is excluded: each pool is warmed before it is timed. Speedups
+are bounded by the cores the host actually has.
+"""
+import os
+import sys
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'projet_vtbda.settings')
+
+import django  # noqa: E402
+django.setup()
+
+from django.conf import settings  # noqa: E402
+
+from collectors.services import cpu_pool  # noqa: E402
+from collectors.services.scrapper import normalize_items  # noqa: E402
+from collectors.services.web_scraper import NISTNVDScraper, ExploitDBScraper  # noqa: E402
+
+PAGE_SIZE = 2000  # NVD resultsPerPage
+HTML_PAGES = 64
+HTML_ITEMS = 200
+
+
+def nvd_items(count):
+    for i in range(count):
+        cve_id = f"CVE-2024-{10000 + i}"
+        yield {'cve': {
+            'id': cve_id,
+            'published': f"2024-{1 + i % 12:02d}-{1 + i % 28:02d}T10:15:{i % 60:02d}.{i % 1000:03d}",
+            'descriptions': [
+                {'lang': 'es', 'value': 'Descripción de la vulnerabilidad. ' * 4},
+                {'lang': 'en', 'value': f"Improper input validation in component {i % 700} allows remote attackers to execute arbitrary code via a crafted request. " * 3},
+            ],
+            'metrics': {'cvssMetricV31': [{'cvssData': {
+                'baseScore': round(1 + (i % 90) / 10, 1),
+                'vectorString': 'CVSS:3.1/AV:N/AC:L/PR:N/UI:N/S:U/C:H/I:H/A:H',
+            }}]},
+            'references': [{'url': f"https://example.org/advisories/{i}/{n}"} for n in range(6)],
+            'configurations': [{'nodes': [{'cpeMatch': [
+                {'vulnerable': True, 'criteria': f"cpe:2.3:a:vendor{i % 300}:product{i % 700}:*:*:*:*:*:*:*:*",
+                 'versionStartIncluding': '1.0', 'versionEndExcluding': f"2.{n}"}
+                for n in range(4)
+            ]}]}],
+        }}
+
+
+def listing_page(page):
+    rows = []
+    for n in range(HTML_ITEMS):
+        i = page * HTML_ITEMS + n
+        rows.append(
+            f'<div class="exploit-item"><div class="exploit-title"><a href="/exploits/{i}">'
+            f'Product {i % 300} 2.{n} - Remote Code Execution (CVE-2024-{20000 + i})</a></div>'
+            f'<div class="exploit-date">2024-03-{1 + n % 28:02d}</div>'
+            f'<div class="exploit-description">Unauthenticated RCE in the admin panel. {"x" * 120}</div></div>'
+        )
+    return '<html><body><div class="exploit-list">' + ''.join(rows) + '</div></body></html>'
+
+
+def use_pool(workers):
+    cpu_pool.reset_pool()
+    settings.CPU_POOL = {'ENABLED': workers > 0, 'WORKERS': workers, 'MIN_ITEMS': 1, 'MIN_HTML_BYTES': 0}
+    if workers:
+        # Start every worker process before timing
+        pool = cpu_pool.get_pool()
+        list(pool.map(abs, range(workers * 4)))
+
+
+def run_normalize(scraper, items):
+    count = 0
+    for start in range(0, len(items), PAGE_SIZE):
+        page = items[start:start + PAGE_SIZE]
+        if cpu_pool.offload(len(page)):
+            chunks = cpu_pool.normalize(scraper, 'NVD', page)
+        else:
+            chunks = [(len(page), normalize_items(scraper, 'NVD', page))]
+        for _, records in chunks:
+            count += len(records)
+    return count
+
+
+def run_bodies(scraper, bodies):
+    if cpu_pool.enabled():
+        chunks = cpu_pool.normalize_bodies(scraper, 'NVD', iter(bodies), scraper.RAW_ITEMS_KEY)
+    else:
+        chunks = ((0, normalize_items(scraper, 'NVD', json.loads(body)[scraper.RAW_ITEMS_KEY])) for body in bodies)
+    return sum(len(records) for _, records in chunks)
+
+
+def run_extract(scraper, pages):
+    spec = scraper.SPECS[0]
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        # The spec caps items per page, so count pages
+        list(executor.map(lambda html: cpu_pool.extract(scraper, spec, 'items', html, scraper.url), pages))
+    return len(pages)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    count = fn(*args)
+    return count, time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 40000
+    items = list(nvd_items(count))
+    bodies = [json.dumps({'vulnerabilities': items[start:start + PAGE_SIZE]}).encode()
+              for start in range(0, count, PAGE_SIZE)]
+    pages = [listing_page(p) for p in range(HTML_PAGES)]
+    nvd, exploitdb = NISTNVDScraper(), ExploitDBScraper()
+    print(f"{os.cpu_count()} CPUs, {count:,} NVD items, {HTML_PAGES} listing pages of {HTML_ITEMS} items")
+
+    baseline = {}
+    for workers in (0, 1, 2, 4, 8):
+        use_pool(workers)
+        times = {}
+        normalized, times['normalize'] = timed(run_normalize, nvd, items)
+        decoded, times['bodies'] = timed(run_bodies, nvd, bodies)
+        extracted, times['extract'] = timed(run_extract, exploitdb, pages)
+        if workers == 0:
+            baseline = times
+        label = 'inline' if workers == 0 else f"{workers} worker{'s' if workers > 1 else ''}"
+        print(f"{label:10} normalize {normalized / times['normalize']:>7,.0f} items/s ({baseline['normalize'] / times['normalize']:4.2f}x)"
+              f"   raw bodies {decoded / times['bodies']:>7,.0f} items/s ({baseline['bodies'] / times['bodies']:4.2f}x)"
+              f"   extract {extracted / times['extract']:>5,.0f} pages/s ({baseline['extract'] / times['extract']:4.2f}x)")
+    cpu_pool.reset_pool()
+
+
+if __name__ == '__main__':
+    main()
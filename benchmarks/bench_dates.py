@@ -0,0 +1,71 @@
+"""parse_date against dateutil over a realistic mix of published dates.
+
+    python benchmarks/bench_dates.py [count]
+
+The mix repeats dates the way harvested batches do (many advisories share a
+publication day) and covers every source format: NVD and OSV ISO strings,
+RSS pubDate, and ExploitDB display dates. dateutil is timed on a sample
+because a full 1M run takes minutes.
+"""
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dateutil import parser as dateutil_parser  # noqa: E402
+
+from collectors.services.dates import parse_date, _parse_text, EXPLOITDB_FORMATS  # noqa: E402
+
+DATEUTIL_SAMPLE = 100000
+
+
+def sample_dates(count, distinct=20000, seed=1):
+    rng = random.Random(seed)
+    start = datetime(2015, 1, 1, tzinfo=timezone.utc)
+    formats = [
+        lambda d: d.strftime('%Y-%m-%dT%H:%M:%S.') + f"{d.microsecond // 1000:03d}",  # NVD
+        lambda d: d.strftime('%Y-%m-%dT%H:%M:%SZ'),  # OSV
+        lambda d: d.strftime('%a, %d %b %Y %H:%M:%S GMT'),  # RSS pubDate
+        lambda d: d.strftime('%Y-%m-%d'),  # ExploitDB
+    ]
+    pool = []
+    for _ in range(distinct):
+        moment = start + timedelta(seconds=rng.randrange(10 * 365 * 86400), milliseconds=rng.randrange(1000))
+        pool.append(rng.choice(formats)(moment))
+    return [rng.choice(pool) for _ in range(count)]
+
+
+def run(name, parse, values):
+    start = time.perf_counter()
+    for value in values:
+        parse(value)
+    elapsed = time.perf_counter() - start
+    print(f"{name:28} {len(values):>9,} dates  {elapsed:8.2f}s  {len(values) / elapsed:>12,.0f} dates/s")
+    return elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    values = sample_dates(count)
+
+    baseline = run('dateutil.parser.parse', dateutil_parser.parse, values[:DATEUTIL_SAMPLE])
+    baseline_rate = min(count, DATEUTIL_SAMPLE) / baseline
+
+    _parse_text.cache_clear()
+    cold = run('parse_date (cold memo)', lambda v: parse_date(v, EXPLOITDB_FORMATS), values)
+    warm = run('parse_date (warm memo)', lambda v: parse_date(v, EXPLOITDB_FORMATS), values)
+
+    _parse_text.cache_clear()
+    distinct = list(dict.fromkeys(values))
+    fast = run('parse_date (no repeats)', lambda v: parse_date(v, EXPLOITDB_FORMATS), distinct)
+
+    print(f"speedup vs dateutil: {count / cold / baseline_rate:.1f}x cold, {count / warm / baseline_rate:.1f}x warm, "
+          f"{len(distinct) / fast / baseline_rate:.1f}x without memo hits")
+    print(_parse_text.cache_info())
+
+
+if __name__ == '__main__':
+    main()
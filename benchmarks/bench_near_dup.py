@@ -0,0 +1,68 @@
+"""MinHash signing cost and LSH lookup against a linear scan.
+
+    python benchmarks/bench_near_dup.py [stored]
+
+Stored items are distinct news-like texts; each query is a lightly edited
+copy of one of them (new title, one sentence changed), which the index
+must find. The linear scan compares the query with every signature.
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'projet_vtbda.settings')
+
+import django  # noqa: E402
+django.setup()
+
+from collectors.services.near_dup import LshIndex, get_near_dup_settings, MinHasher, similarity  # noqa: E402
+
+WORDS = [f"w{i}" for i in range(5000)]
+QUERIES = 200
+
+
+def story(rng):
+    return ' '.join(rng.choice(WORDS) for _ in range(60))
+
+
+def edited(text, rng):
+    words = text.split()
+    start = rng.randrange(len(words) - 8)
+    words[start:start + 4] = [rng.choice(WORDS) for _ in range(4)]
+    return ' '.join(words)
+
+
+def main():
+    stored = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    config = get_near_dup_settings()
+    hasher = MinHasher(config['NUM_PERM'], config['SHINGLE_SIZE'], config['MAX_TEXT'])
+    rng = random.Random(1)
+    texts = [story(rng) for _ in range(stored)]
+
+    start = time.perf_counter()
+    signatures = [hasher.signature('', text) for text in texts]
+    sign_time = time.perf_counter() - start
+    index = LshIndex(config['BANDS'], config['ROWS'])
+    for key, signature in enumerate(signatures):
+        index.add(key, signature)
+    print(f"{stored:,} stored: signing {sign_time / stored * 1e6:.0f} us/item")
+
+    targets = [rng.randrange(stored) for _ in range(QUERIES)]
+    queries = [hasher.signature('', edited(texts[t], rng)) for t in targets]
+
+    start = time.perf_counter()
+    found = sum(1 for t, q in zip(targets, queries) if (index.query(q, config['THRESHOLD']) or (None,))[0] == t)
+    lsh_time = (time.perf_counter() - start) / QUERIES
+    scan_queries = queries[:10]
+    start = time.perf_counter()
+    for q in scan_queries:
+        max(range(stored), key=lambda key: similarity(q, signatures[key]))
+    scan_time = (time.perf_counter() - start) / len(scan_queries)
+    print(f"LSH lookup {lsh_time * 1000:.3f} ms, linear scan {scan_time * 1000:.1f} ms "
+          f"({scan_time / lsh_time:,.0f}x), recall {found}/{QUERIES}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""Latency of ranking a merged candidate set against a query.
+
+    python benchmarks/bench_ranking.py [candidates]
+
+Candidates mimic a harvest for 'log4j': NVD and OSV records that name the
+package, news items that only mention it, and unrelated advisories. The
+exact-ID query checks that the matching record comes out on top.
+"""
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'projet_vtbda.settings')
+
+import django  # noqa: E402
+django.setup()
+
+from collectors.services.ranking import rank  # noqa: E402
+from collectors.services.records import VulnRecord  # noqa: E402
+
+SOURCES = ('NVD', 'OSV', 'GITHUB_SECURITY', 'SECURITY_NEWS', 'EXPLOIT_DB')
+RUNS = 50
+
+
+def candidates(count):
+    now = datetime.now(timezone.utc)
+    for i in range(count):
+        source = SOURCES[i % len(SOURCES)]
+        related = i % 3 == 0
+        package = 'Maven/org.apache.logging.log4j:log4j-core' if related else f"PyPI/package-{i}"
+        yield VulnRecord(
+            cve_id=f"CVE-2021-{44228 + i}",
+            title=f"{'Apache Log4j' if related else 'Example library'} remote code execution {i}",
+            description=('JNDI lookup in log4j allows remote attackers to execute code. ' if related else '')
+                        + 'Improper input validation in a request handler. ' * 8,
+            source=source,
+            cvss_score=round(3 + (i % 70) / 10, 1),
+            published_date=now - timedelta(days=i % 1500),
+            affected_packages=[package],
+            references=[f"https://example.org/{i}"],
+        )
+
+
+def timed(query, items):
+    rank(query, items)
+    start = time.perf_counter()
+    for _ in range(RUNS):
+        ranked = rank(query, items)
+    return ranked, (time.perf_counter() - start) / RUNS * 1000
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    items = list(candidates(count))
+    for query in ('log4j remote code execution', 'log4j-core', 'CVE-2021-44238'):
+        ranked, elapsed = timed(query, items)
+        top = ', '.join(f"{item.cve_id} ({item.source}, {score:.2f})" for score, item in ranked[:3])
+        print(f"{query!r:32} {count} candidates in {elapsed:6.2f} ms   top: {top}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""Memory and throughput of VulnRecord against the dict pipeline it replaced.
+
+    python benchmarks/bench_records.py [count]
+
+The dict pipeline is reproduced as it was: the normalized dict is kept per
+row, a display dict copy is built per row, and the description is sliced
+on every access.
+"""
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'projet_vtbda.settings')
+
+import django  # noqa: E402
+django.setup()
+
+from collectors.services.records import VulnRecord  # noqa: E402
+
+
+def normalized_rows(count):
+    published = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    for i in range(count):
+        yield {
+            'cve_id': f"CVE-2024-{i}",
+            'title': f"CVE-2024-{i} - Example vulnerability in package {i % 500}",
+            'description': 'Improper input validation allows remote attackers to execute code. ' * 6,
+            'severity': 'HIGH',
+            'cvss_score': 8.1,
+            'cvss_vector': 'CVSS:3.1/AV:N/AC:L/PR:N/UI:N/S:U/C:H/I:H/A:H',
+            'published_date': published,
+            'affected_packages': [f"PyPI/package-{i % 500}"],
+            'references': [f"https://example.org/advisory/{i}"],
+            'source': 'NIST NVD',
+            'source_url': f"https://nvd.nist.gov/vuln/detail/CVE-2024-{i}",
+        }
+
+
+def dict_pipeline(rows):
+    kept, display = [], []
+    for vuln_data in rows:
+        display.append({
+            'cve_id': vuln_data.get('cve_id', ''),
+            'title': vuln_data.get('title', ''),
+            'description': vuln_data.get('description', '')[:300] + '...' if len(vuln_data.get('description', '')) > 300 else vuln_data.get('description', ''),
+            'severity': vuln_data.get('severity', 'MEDIUM'),
+            'cvss_score': vuln_data.get('cvss_score'),
+            'source': 'NVD',
+            'source_url': vuln_data.get('source_url', ''),
+            'published_date': str(vuln_data.get('published_date', '')),
+            'affected_packages': vuln_data.get('affected_packages', [])[:3],
+        })
+        kept.append(vuln_data)
+    return kept, display
+
+
+def record_pipeline(rows):
+    return [VulnRecord.from_normalized(vuln_data, 'NVD') for vuln_data in rows]
+
+
+def measure(name, pipeline, count):
+    # Rows are produced inside the measured region, as scrapers produce them,
+    # so whatever a pipeline keeps of its input is counted against it
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = pipeline(normalized_rows(count))
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:8} {count / elapsed:>12,.0f} rows/s   {current / count:>8,.0f} B/row retained   "
+          f"{peak / count:>8,.0f} B/row peak")
+    return result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    print(f"{count:,} records")
+    measure('dicts', dict_pipeline, count)
+    records = measure('records', record_pipeline, count)
+
+    start = time.perf_counter()
+    for record in records:
+        record.display()
+    print(f"display projection on demand: {count / (time.perf_counter() - start):,.0f} rows/s")
+
+
+if __name__ == '__main__':
+    main()
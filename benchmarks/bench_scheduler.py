@@ -0,0 +1,87 @@
+"""Simulated interactive search latency with and without adaptive source scheduling.
+
+    python benchmarks/bench_scheduler.py [searches]
+
+Each source has a latency distribution, a failure rate and a number of
+distinct records per search, roughly as observed for CVE lookups. A search
+waits for its slowest interactive source (or that source's timeout). The
+static run asks every source with the harvest deadline; the adaptive run
+feeds each outcome back through scheduler.observe() and plans the next
+search with scheduler.arrange(). No network or database is involved.
+"""
+import os
+import random
+import statistics
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'projet_vtbda.settings')
+
+import django  # noqa: E402
+django.setup()
+
+from collectors.services import scheduler  # noqa: E402
+from collectors.services.pipeline import get_pipeline_settings  # noqa: E402
+
+# name: (median latency s, spread, failure rate, distinct records per search)
+SOURCES = {
+    'NVD': (1.2, 0.5, 0.05, 0.5),
+    'OSV': (0.4, 0.2, 0.01, 0.5),
+    'GITHUB_SECURITY': (2.5, 1.5, 0.4, 0.05),  # Code search without a token
+    'SNYK': (1.5, 0.8, 0.2, 0.3),
+    'EXPLOIT_DB': (6.0, 3.0, 0.1, 0.0),        # Stale result selector: never matches
+}
+
+
+def outcome(source, rng, timeout):
+    median, spread, failure_rate, distinct = SOURCES[source]
+    latency = max(0.05, rng.lognormvariate(0, spread / median) * median)
+    if latency >= timeout:
+        return 'timeout', timeout, 0
+    if rng.random() < failure_rate:
+        return 'failure', latency, 0
+    return 'success', latency, distinct * (rng.random() < 0.9)
+
+
+def stat():
+    return SimpleNamespace(runs=0, successes=0, failures=0, timeouts=0, results=0, unique_results=0.0,
+                           latency=0.0, latency_var=0.0, success_rate=1.0, unique_yield=0.0)
+
+
+def simulate(searches, adaptive, rng):
+    config = scheduler.get_scheduler_settings()
+    deadline = get_pipeline_settings()['DEADLINE']
+    stats = {source: stat() for source in SOURCES}
+    waits, found = [], 0.0
+    for _ in range(searches):
+        if adaptive:
+            run, demoted, timeouts = scheduler.arrange(list(SOURCES), stats, config, deadline)
+        else:
+            run, demoted, timeouts = list(SOURCES), [], {}
+        wait = 0.0
+        for source in run:
+            result, latency, distinct = outcome(source, rng, timeouts.get(source, deadline))
+            wait = max(wait, latency)
+            found += distinct
+            scheduler.observe(stats[source], result, latency, int(distinct > 0), distinct, config['DECAY'])
+        for source in demoted:
+            # Background refreshes keep the stats of demoted sources current
+            result, latency, distinct = outcome(source, rng, deadline)
+            scheduler.observe(stats[source], result, latency, int(distinct > 0), distinct, config['DECAY'])
+        waits.append(wait)
+    return waits, found, run, demoted
+
+
+def main():
+    searches = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    for adaptive in (False, True):
+        waits, found, run, demoted = simulate(searches, adaptive, random.Random(3))
+        waits.sort()
+        print(f"{'adaptive' if adaptive else 'static':8}  mean {statistics.mean(waits):5.2f} s  "
+              f"p95 {waits[int(len(waits) * 0.95)]:5.2f} s  distinct records {found:7.0f}  "
+              f"interactive {run}  background {demoted}")
+
+
+if __name__ == '__main__':
+    main()
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class CollectorsConfig(AppConfig):
     name = 'collectors'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -1,117 +1,183 @@
-from django.http import JsonResponse
-from django.db.models import Q
 import json
-import time
+import logging
+from typing import AsyncIterator, Iterator, List, Tuple
 
-from requests import request
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
 
-from .models import Vulnerability, SearchQuery
+from .models import VulnerabilitySource
 from .services.scrapper import  VulnerabilityAggregatorFixed
+from .services.pipeline import HarvestPipeline
+from .services.analytics import record_search_event
+from .services.ranking import get_ranking_settings, rank
+from .services import planner, scheduler
 
+logger = logging.getLogger(__name__)
 
-def harvestData(query: str, user_ip: str = None, user_agent: str = None):
-    try:
-        # Initialize the aggregator and search
-        aggregator = VulnerabilityAggregatorFixed()
-                
-        # Define sources to search (web scrapers + API)
-        sources_to_search = [
-            # Web scrapers (no API key needed)
-            'SECURITY_FOCUS', 'PACKETSTORM', 'SECURITY_TRACKER',
-            'SNYK_WEB', 'MITRE_CWE', 'CYBER_NEWS',
-            # API sources
-            'CISA'
-        ]
-                
-        # Try NVD if available
-        try:
-            sources_to_search.append('NVD')
-        except:
-            pass
-                
-        print(f"Searching sources: {sources_to_search}")
-                
-        # Search all sources
-        results = aggregator.search_all_sources(query)
-                
-        # Save search query
-        search_record = SearchQuery.objects.create(
-            query=query,
-            user_ip=user_ip,
-            user_agent=user_agent,
-            results_count=sum(len(vulns) for vulns in results.values())
+
+_source_cache = {}
+
+
+def get_source(source_name: str):
+    """Return the VulnerabilitySource row for a scraper name, creating it once.
+
+    The row is only cached once the surrounding transaction commits, so a
+    rolled-back write can't leave the cache pointing at a row that was
+    never stored.
+    """
+    source = _source_cache.get(source_name)
+    if source is None:
+        source, _ = VulnerabilitySource.objects.get_or_create(
+            name=source_name, defaults={'source_type': 'scraper'}
         )
-                
-        # Process results
-        all_vulnerabilities = []
-        saved_count = 0
-                
-        for source_name, vulnerabilities in results.items():
-            for vuln_data in vulnerabilities:
-                vuln_dict = {}
-                if vuln_data.get('cve_id') or vuln_data.get('title'):
-                    # Generate CVE ID if missing
-                    if not vuln_data.get('cve_id'):
-                        vuln_data['cve_id'] = f"{source_name}-{int(time.time())}-{hash(vuln_data.get('title', ''))}"
-                    
-                    all_vulnerabilities.append({
-                        'cve_id': vuln_data.get('cve_id', ''),
-                        'title': vuln_data.get('title', ''),
-                        'description': vuln_data.get('description', '')[:300] + '...' if len(vuln_data.get('description', '')) > 300 else vuln_data.get('description', ''),
-                        'severity': vuln_data.get('severity', 'MEDIUM'),
-                        'cvss_score': vuln_data.get('cvss_score'),
-                        'source': source_name,
-                        'source_url': vuln_data.get('source_url', ''),
-                        'published_date': str(vuln_data.get('published_date', '')),
-                        'affected_packages': vuln_data.get('affected_packages', [])[:3],
-                    })  
-                    # Try to save to database
-                    try:
-                        # Check if already exists
-                        existing = Vulnerability.objects.filter(
-                            Q(cve_id=vuln_data['cve_id']) | 
-                            Q(title=vuln_data.get('title', ''))
-                        ).first()
-                                
-                        # Prepare data for saving
-                        if not existing:
-                            vuln_dict = {
-                                'cve_id': vuln_data.get('cve_id', ''),
-                                'title': vuln_data.get('title', ''),
-                                'description': vuln_data.get('description', ''),
-                                'severity': vuln_data.get('severity', 'MEDIUM'),
-                                'cvss_score': vuln_data.get('cvss_score'),
-                                'cvss_vector': vuln_data.get('cvss_vector', ''),
-                                'source_url': vuln_data.get('source_url', ''),
-                                'affected_packages': json.dumps(vuln_data.get('affected_packages', [])),
-                                'references': json.dumps(vuln_data.get('references', [])),
-                            }
-                                    
-                            # Handle published date
-                            published_date = vuln_data.get('published_date')
-                            if published_date:
-                                vuln_dict['published_date'] = published_date
-                                        
-                            # Create new vulnerability
-                            vuln = Vulnerability.objects.create(**vuln_dict)
-                            saved_count += 1
-                                
-                    except Exception as e:
-                        print(f"Error processing vulnerability from {source_name}: {e}")
-        print(f"Saved {saved_count} vulnerabilities to database") 
-        return {
-            'success': True,
-            'query': query,
-            'search_id': search_record.id,
-            'total_found': len(all_vulnerabilities),
-            'saved_to_db': saved_count,
-            'results_by_source': {k: len(v) for k, v in results.items()},
-            'vulnerabilities': all_vulnerabilities,
-        }
-                
+        transaction.on_commit(lambda: _source_cache.setdefault(source_name, source))
+    return source
+
+
+def reset_source_cache():
+    """Forget cached source rows (after the sources table is cleared)"""
+    _source_cache.clear()
+
+
+def harvest_pipeline(query: str, max_results: int = None, max_per_source: int = None,
+                     refresh: bool = False) -> Tuple[HarvestPipeline, planner.QueryPlan]:
+    """Plan the query, then a pipeline over only the sources the plan still needs, best first"""
+    aggregator = VulnerabilityAggregatorFixed()
+    plan = planner.plan(query, list(aggregator.scrapers), refresh)
+    scheduler.schedule(plan)
+    pipeline = HarvestPipeline(
+        aggregator, plan.term, max_per_query=max_results, max_per_source=max_per_source,
+        sources=plan.run, seen={record.cve_id for record in plan.local}, timeouts=plan.timeouts,
+    )
+    return pipeline, plan
+
+
+def _finish(query: str, pipeline: HarvestPipeline, plan: planner.QueryPlan, user_ip: str, user_agent: str):
+    logger.info(f"Saved {pipeline.saved_count} vulnerabilities to database")
+    planner.record_fetched(plan, sorted(pipeline.completed), pipeline.found)
+    # IDs answered from the database earn the sources shared credit only, as in a background refresh
+    scheduler.record(plan.query_class, pipeline, shared={record.cve_id for record in plan.local})
+    scheduler.refresh_in_background(plan, pipeline.aggregator, pipeline.seen)
+    record_search_event(query, pipeline.total_found + len(plan.local), user_ip, user_agent)
+
+
+def _json_head(query: str) -> bytes:
+    return ('{"query": ' + json.dumps(query) + ', "vulnerabilities": [').encode('utf-8')
+
+
+def _ranked_rows(query: str, records) -> list:
+    """Display rows best match first, each with its relevance score"""
+    return [dict(record.display(), relevance=round(score, 4)) for score, record in rank(query, records)]
+
+
+def _json_rows(rows: list, first: bool) -> bytes:
+    rows = ', '.join(json.dumps(row, cls=DjangoJSONEncoder) for row in rows)
+    return (rows if first else ', ' + rows).encode('utf-8')
+
+
+class _Listing:
+    """Result rows in arrival order, or best match first for up to MAX_CANDIDATES records.
+
+    Ranked records are held until the harvest ends or MAX_CANDIDATES are
+    held; those are then written out best match first and later records
+    follow as they arrive, so a ranked response never holds more than
+    MAX_CANDIDATES records either.
+    """
+
+    def __init__(self, query: str, ranked: bool):
+        self.query = query
+        self.limit = get_ranking_settings()['MAX_CANDIDATES'] if ranked else 0
+        self.held = []
+        self.first = True
+
+    def add(self, records: List) -> bytes:
+        if not self.limit:
+            return self._rows([record.display() for record in records])
+        self.held.extend(records)
+        return self.flush() if len(self.held) >= self.limit else b''
+
+    def flush(self) -> bytes:
+        held, self.held, self.limit = self.held, [], 0
+        return self._rows(_ranked_rows(self.query, held))
+
+    def _rows(self, rows: list) -> bytes:
+        if not rows:
+            return b''
+        data = _json_rows(rows, self.first)
+        self.first = False
+        return data
+
+
+def _json_tail(pipeline: HarvestPipeline, plan: planner.QueryPlan, error: str = None) -> bytes:
+    tail = {
+        'total_found': pipeline.total_found,
+        'saved_to_db': pipeline.saved_count,
+        'results_by_source': pipeline.results_by_source(),
+        'plan': plan.describe(),
+        'truncated': pipeline.truncated,
+        'success': error is None,
+    }
+    if error is not None:
+        tail['error'] = error
+    # Close the list and continue the object: '], "total_found": ...}'
+    return ('], ' + json.dumps(tail)[1:]).encode('utf-8')
+
+
+def stream_harvest(query: str, user_ip: str = None, user_agent: str = None, ranked: bool = False,
+                   refresh: bool = False, **caps) -> Iterator[bytes]:
+    """Harvest the query into a streamed JSON document.
+    
+    Stored rows that answer the query come first, then each harvested
+    batch once it is stored, so the response never holds more than one
+    batch. The totals and the query plan come last, and a failure part way
+    through ends the document with "success": false and the error. With
+    ranked=True the first MAX_CANDIDATES records are held and written out
+    best match first, since relevance is relative to the whole set (see
+    _Listing).
+    """
+    pipeline, plan = harvest_pipeline(query, refresh=refresh, **caps)
+    yield _json_head(query)
+    error = None
+    listing = _Listing(query, ranked)
+    try:
+        rows = listing.add(plan.local)
+        if rows:
+            yield rows
+        for batch in pipeline:
+            rows = listing.add([record for _, record in batch.records])
+            if rows:
+                yield rows
+    except Exception as e:
+        logger.exception(f"Harvest of '{query}' failed")
+        error = str(e)
+    rows = listing.flush()
+    if rows:
+        yield rows
+    _finish(query, pipeline, plan, user_ip, user_agent)
+    yield _json_tail(pipeline, plan, error)
+
+
+async def astream_harvest(query: str, user_ip: str = None, user_agent: str = None, ranked: bool = False,
+                          refresh: bool = False, **caps) -> AsyncIterator[bytes]:
+    """stream_harvest() for async views; batches are awaited, not waited for on a thread"""
+    pipeline, plan = await sync_to_async(harvest_pipeline)(query, refresh=refresh, **caps)
+    yield _json_head(query)
+    error = None
+    listing = _Listing(query, ranked)
+    try:
+        rows = listing.add(plan.local)
+        if rows:
+            yield rows
+        async for batch in pipeline:
+            rows = listing.add([record for _, record in batch.records])
+            if rows:
+                yield rows
     except Exception as e:
-        print(e)
-        return {
-            'error': str(e),
-            'success': False
-        }
\ No newline at end of file
+        logger.exception(f"Harvest of '{query}' failed")
+        error = str(e)
+    rows = listing.flush()
+    if rows:
+        yield rows
+    await sync_to_async(_finish)(query, pipeline, plan, user_ip, user_agent)
+    yield _json_tail(pipeline, plan, error)
@@ -0,0 +1,58 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from django.conf import settings
+
+REPLICA_ALIAS = 'replica'
+
+# Alias reads go to in the current context; None means the primary
+_read_alias: ContextVar[Optional[str]] = ContextVar('vtbda_read_alias', default=None)
+
+
+def get_routing_settings():
+    config = {
+        'PIN_COOKIE': 'vtbda_primary',
+        'STICKY_SECONDS': 15,  # Reads stay on the primary this long after a write
+    }
+    config.update(getattr(settings, 'DATABASE_ROUTING', {}))
+    return config
+
+
+def replica_configured() -> bool:
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+def current_read_alias() -> str:
+    return _read_alias.get() or 'default'
+
+
+@contextmanager
+def read_from(alias: Optional[str]):
+    """Route reads in this block to alias (None or 'default' = primary)"""
+    token = _read_alias.set(None if alias == 'default' else alias)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+class ReadReplicaRouter:
+    """Writes always go to the primary. Reads go to the replica only inside
+    read_from(), which ReplicaRoutingMiddleware enters for views that opt in.
+    Background threads, management commands and harvests therefore read
+    their own writes by default.
+    """
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica is a copy of the primary and is migrated through it
+        return db != REPLICA_ALIAS
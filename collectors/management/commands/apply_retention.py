@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from collectors.services.purge import apply_search_retention
+from collectors.services.planner import prune_freshness
+
+
+class Command(BaseCommand):
+    help = "Roll expired SearchQuery rows into daily aggregates and delete them, and drop stale source freshness rows"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None, help="Override DATA_RETENTION['SEARCH_QUERY_DAYS']")
+        parser.add_argument('--batch-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        result = apply_search_retention(days=options['days'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Rolled up {result['rolled_up']} searches older than {result['cutoff']}"
+        ))
+        self.stdout.write(self.style.SUCCESS(f"Deleted {prune_freshness()} stale source freshness rows"))
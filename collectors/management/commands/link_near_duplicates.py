@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from collectors.services.near_dup import backfill
+
+
+class Command(BaseCommand):
+    help = "Compute MinHash signatures for stored items without a CVE ID and link near-duplicates"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        counts = backfill(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Signed {counts['signed']} vulnerabilities, {counts['linked']} linked to a canonical row, "
+            f"{counts['unlinked']} advisories unlinked"
+        ))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from collectors.services.purge import purge_all
+
+
+class Command(BaseCommand):
+    help = "Delete all vulnerabilities, searches, sources and dashboard rollups"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--yes', action='store_true', help="Skip the confirmation prompt")
+
+    def handle(self, *args, **options):
+        if not options['yes']:
+            answer = input("This deletes ALL collected data. Type 'yes' to continue: ")
+            if answer.strip().lower() != 'yes':
+                self.stdout.write("Aborted")
+                return
+
+        counts = purge_all(batch_size=options['batch_size'])
+        for model_name, count in counts.items():
+            deleted = 'truncated' if count < 0 else f"{count} rows"
+            self.stdout.write(f"{model_name}: {deleted}")
+        self.stdout.write(self.style.SUCCESS("Purge complete"))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from collectors.services.stats import rebuild_stats
+from collectors.services.recent import rebuild_latest
+
+
+class Command(BaseCommand):
+    help = "Recompute the dashboard rollups and the home page latest-vulnerability ring"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        counts = rebuild_stats(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {counts['vulnerability_stats']} vulnerability stats "
+            f"and {counts['search_stats']} search stats"
+        ))
+        self.stdout.write(self.style.SUCCESS(f"Refilled latest ring with {rebuild_latest()} vulnerabilities"))
@@ -0,0 +1,101 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from .db_router import REPLICA_ALIAS, get_routing_settings, read_from, replica_configured
+from .services.purge import apurge_generation, check_purge_generation
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ReplicaRoutingMiddleware:
+    """Send reads of opted-in views to the replica, with read-your-writes.
+
+    A view opts in with ``replica_reads = True``. A successful unsafe request
+    (a harvest, a purge) sets a short-lived cookie, and while it is present
+    that client's reads stay on the primary so it sees what it just wrote.
+    ``request.read_db`` holds the chosen alias for querysets that are
+    evaluated after the view returns (streaming exports).
+
+    Runs natively in both modes so that under ASGI an async view is not
+    pushed through a thread by this middleware.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        request.read_db = 'default'
+        return self.pin(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        request.read_db = 'default'
+        return self.pin(request, await self.get_response(request))
+
+    def pin(self, request, response):
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            config = get_routing_settings()
+            response.set_cookie(config['PIN_COOKIE'], '1', max_age=config['STICKY_SECONDS'], httponly=True, samesite='Lax')
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'view_class', view_func)
+        if not getattr(view_class, 'replica_reads', False) or not replica_configured():
+            return None
+        if request.method not in SAFE_METHODS or request.COOKIES.get(get_routing_settings()['PIN_COOKIE']):
+            return None
+
+        request.read_db = REPLICA_ALIAS
+        if iscoroutinefunction(view_func):
+            # The coroutine runs after we return; the view enters read_from() itself
+            return None
+        with read_from(REPLICA_ALIAS):
+            return view_func(request, *view_args, **view_kwargs)
+
+
+class PurgeGenerationMiddleware:
+    """Drop this process's caches when another process has purged the data.
+
+    One primary-key read of PurgeState per request; see
+    services.purge.check_purge_generation().
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        check_purge_generation()
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        check_purge_generation(await apurge_generation())
+        return await self.get_response(request)
+
+
+class AsyncReplicaReadsMixin:
+    """Replica reads for async class-based views.
+
+    process_view can't wrap a coroutine, so dispatch enters read_from() for
+    the alias the middleware picked. The async ORM runs queries with a copy
+    of this context, so the router sees it.
+    """
+
+    replica_reads = True
+
+    async def dispatch(self, request, *args, **kwargs):
+        with read_from(getattr(request, 'read_db', 'default')):
+            return await super().dispatch(request, *args, **kwargs)
@@ -0,0 +1,41 @@
+# Generated by Django 6.0 on 2026-10-19 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collectors', '0003_alter_vulnerability_published_date'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchQueryStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('query', models.CharField(max_length=500, unique=True)),
+                ('search_count', models.IntegerField(db_index=True, default=0)),
+                ('zero_result_count', models.IntegerField(db_index=True, default=0)),
+                ('last_results_count', models.IntegerField(default=0)),
+                ('last_searched_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-search_count'],
+            },
+        ),
+        migrations.CreateModel(
+            name='VulnerabilityStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(choices=[('total', 'Total'), ('severity', 'Severity'), ('source', 'Source'), ('ecosystem', 'Ecosystem'), ('month', 'Publish month')], max_length=20)),
+                ('key', models.CharField(max_length=250)),
+                ('count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['dimension', '-count'],
+                'constraints': [models.UniqueConstraint(fields=('dimension', 'key'), name='unique_vulnerability_stat')],
+            },
+        ),
+    ]
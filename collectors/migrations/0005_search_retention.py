@@ -0,0 +1,33 @@
+# Generated by Django 6.0 on 2026-10-19 10:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collectors', '0004_dashboard_stats'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='searchquery',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.CreateModel(
+            name='SearchQueryDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('query', models.CharField(max_length=500)),
+                ('search_count', models.IntegerField(default=0)),
+                ('results_total', models.IntegerField(default=0)),
+                ('zero_result_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-day', '-search_count'],
+                'constraints': [models.UniqueConstraint(fields=('day', 'query'), name='unique_search_query_daily')],
+            },
+        ),
+    ]
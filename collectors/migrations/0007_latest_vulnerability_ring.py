@@ -0,0 +1,33 @@
+# Generated by Django 6.0 on 2026-10-19 11:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collectors', '0006_search_user_agents'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='vulnerability',
+            name='published_date',
+            field=models.CharField(blank=True, db_index=True, max_length=250, null=True),
+        ),
+        migrations.CreateModel(
+            name='LatestVulnerability',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cve_id', models.CharField(max_length=50)),
+                ('title', models.CharField(max_length=500)),
+                ('severity', models.CharField(max_length=20)),
+                ('published_date', models.CharField(blank=True, default='', max_length=250)),
+                ('vulnerability', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='latest_entry', to='collectors.vulnerability')),
+            ],
+            options={
+                'ordering': ['-published_date', '-id'],
+            },
+        ),
+    ]
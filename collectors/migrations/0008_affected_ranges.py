@@ -0,0 +1,30 @@
+# Generated by Django 6.0 on 2026-10-19 12:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collectors', '0007_latest_vulnerability_ring'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AffectedRange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('advisory_id', models.CharField(max_length=100)),
+                ('ecosystem', models.CharField(max_length=100)),
+                ('package', models.CharField(max_length=250)),
+                ('introduced', models.CharField(blank=True, max_length=100)),
+                ('fixed', models.CharField(blank=True, max_length=100)),
+                ('last_affected', models.CharField(blank=True, max_length=100)),
+                ('vulnerability', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='version_ranges', to='collectors.vulnerability')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['ecosystem', 'package'], name='affected_range_pkg_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 6.0 on 2026-10-19 17:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collectors', '0008_affected_ranges'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CpeMatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('criteria', models.CharField(max_length=500)),
+                ('part', models.CharField(blank=True, max_length=1)),
+                ('vendor', models.CharField(max_length=150)),
+                ('product', models.CharField(max_length=150)),
+                ('version', models.CharField(blank=True, max_length=100)),
+                ('version_start', models.CharField(blank=True, max_length=100)),
+                ('start_inclusive', models.BooleanField(default=True)),
+                ('version_end', models.CharField(blank=True, max_length=100)),
+                ('end_inclusive', models.BooleanField(default=False)),
+                ('vulnerability', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cpe_criteria', to='collectors.vulnerability')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['vendor', 'product'], name='cpe_match_product_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 6.0 on 2026-10-19 18:05
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collectors', '0009_cpe_matches'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PageCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url_hash', models.CharField(max_length=64, unique=True)),
+                ('url', models.TextField()),
+                ('content_hash', models.CharField(max_length=64)),
+                ('body', models.BinaryField()),
+                ('size', models.IntegerField(default=0)),
+                ('extracted', models.TextField(default='{}')),
+                ('fetched_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_access', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
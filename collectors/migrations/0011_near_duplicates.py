@@ -0,0 +1,24 @@
+# Generated by Django 6.0 on 2026-10-19 19:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collectors', '0010_page_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vulnerability',
+            name='canonical',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='near_duplicates', to='collectors.vulnerability'),
+        ),
+        migrations.AddField(
+            model_name='vulnerability',
+            name='minhash',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
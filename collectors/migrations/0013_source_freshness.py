@@ -0,0 +1,28 @@
+# Generated by Django 6.0 on 2026-10-19 15:10
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collectors', '0012_title_trigram_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SourceFreshness',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=100)),
+                ('query_key', models.CharField(max_length=550)),
+                ('query_class', models.CharField(max_length=20)),
+                ('results_count', models.IntegerField(default=0)),
+                ('fetched_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('source', 'query_key'), name='unique_source_freshness')],
+            },
+        ),
+    ]
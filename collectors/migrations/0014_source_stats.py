@@ -0,0 +1,36 @@
+# Generated by Django 6.0 on 2026-10-19 16:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collectors', '0013_source_freshness'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SourceStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=100)),
+                ('query_class', models.CharField(max_length=20)),
+                ('runs', models.IntegerField(default=0)),
+                ('successes', models.IntegerField(default=0)),
+                ('failures', models.IntegerField(default=0)),
+                ('timeouts', models.IntegerField(default=0)),
+                ('results', models.IntegerField(default=0)),
+                ('unique_results', models.FloatField(default=0)),
+                ('latency', models.FloatField(default=0)),
+                ('latency_var', models.FloatField(default=0)),
+                ('success_rate', models.FloatField(default=1)),
+                ('unique_yield', models.FloatField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['query_class', 'source'],
+                'constraints': [models.UniqueConstraint(fields=('source', 'query_class'), name='unique_source_stats')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 6.0 on 2026-10-19 18:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collectors', '0014_source_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PurgeState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('generation', models.IntegerField(default=0)),
+                ('state', models.CharField(default='idle', max_length=20)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('deleted', models.TextField(default='{}')),
+                ('error', models.TextField(blank=True)),
+            ],
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 import json
 
 class VulnerabilitySource(models.Model):
@@ -38,7 +39,7 @@ class Vulnerability(models.Model):
     
     # Dates
     # published_date = models.DateTimeField(null=True, blank=True)
-    published_date = models.CharField(max_length=250, null=True, blank=True)
+    published_date = models.CharField(max_length=250, null=True, blank=True, db_index=True)
     
     # JSON data stored as text
     affected_packages = models.TextField(default='[]')  # Store as JSON string
@@ -48,6 +49,10 @@ class Vulnerability(models.Model):
     # Search fields
     search_vector = models.TextField(blank=True)
     
+    # Near-duplicate detection for items without a CVE ID
+    minhash = models.BinaryField(null=True, blank=True)  # MinHash signature of title + description
+    canonical = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='near_duplicates')
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -79,14 +84,218 @@ class Vulnerability(models.Model):
             return []
 
 
+class LatestVulnerability(models.Model):
+    """Small ring of the most recently published vulnerabilities for the home page"""
+    vulnerability = models.OneToOneField(Vulnerability, on_delete=models.CASCADE, related_name='latest_entry')
+    cve_id = models.CharField(max_length=50)
+    title = models.CharField(max_length=500)
+    severity = models.CharField(max_length=20)
+    published_date = models.CharField(max_length=250, blank=True, default='')
+
+    class Meta:
+        ordering = ['-published_date', '-id']
+
+    def __str__(self):
+        return self.cve_id
+
+
+class UserAgent(models.Model):
+    """Distinct user agent strings referenced by SearchQuery"""
+    agent_hash = models.CharField(max_length=64, unique=True)
+    value = models.TextField()
+
+    def __str__(self):
+        return self.value[:80]
+
+
 class SearchQuery(models.Model):
     """Track search queries for analytics"""
     query = models.CharField(max_length=500)
     source = models.CharField(max_length=100, blank=True)
     results_count = models.IntegerField(default=0)
     user_ip = models.GenericIPAddressField(null=True, blank=True)
-    user_agent = models.TextField(blank=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    user_agent = models.TextField(blank=True)  # Legacy rows only, new rows use agent
+    agent = models.ForeignKey(UserAgent, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
     
     class Meta:
-        ordering = ['-created_at']
\ No newline at end of file
+        ordering = ['-created_at']
+
+class VulnerabilityStat(models.Model):
+    """Pre-aggregated vulnerability counts used by the dashboard"""
+    DIMENSION_CHOICES = [
+        ('total', 'Total'),
+        ('severity', 'Severity'),
+        ('source', 'Source'),
+        ('ecosystem', 'Ecosystem'),
+        ('month', 'Publish month'),
+    ]
+
+    dimension = models.CharField(max_length=20, choices=DIMENSION_CHOICES)
+    key = models.CharField(max_length=250)
+    count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['dimension', '-count']
+        constraints = [
+            models.UniqueConstraint(fields=['dimension', 'key'], name='unique_vulnerability_stat'),
+        ]
+
+    def __str__(self):
+        return f"{self.dimension}:{self.key} = {self.count}"
+
+
+class SearchQueryStat(models.Model):
+    """Pre-aggregated search counts per normalized query"""
+    query = models.CharField(max_length=500, unique=True)
+    search_count = models.IntegerField(default=0, db_index=True)
+    zero_result_count = models.IntegerField(default=0, db_index=True)
+    last_results_count = models.IntegerField(default=0)
+    last_searched_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-search_count']
+
+    def __str__(self):
+        return f"{self.query} ({self.search_count})"
+
+
+class SearchQueryDaily(models.Model):
+    """Daily search aggregates kept after raw SearchQuery rows expire"""
+    day = models.DateField()
+    query = models.CharField(max_length=500)
+    search_count = models.IntegerField(default=0)
+    results_total = models.IntegerField(default=0)
+    zero_result_count = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['-day', '-search_count']
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'query'], name='unique_search_query_daily'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.query} ({self.search_count})"
+
+
+class AffectedRange(models.Model):
+    """One affected version interval of a package, from OSV affected[].ranges"""
+    vulnerability = models.ForeignKey(Vulnerability, on_delete=models.CASCADE, related_name='version_ranges')
+    advisory_id = models.CharField(max_length=100)  # OSV/GHSA id the range came from
+    ecosystem = models.CharField(max_length=100)
+    package = models.CharField(max_length=250)  # Normalized package name
+    introduced = models.CharField(max_length=100, blank=True)  # '' or '0' means from the first version
+    fixed = models.CharField(max_length=100, blank=True)  # Exclusive upper bound
+    last_affected = models.CharField(max_length=100, blank=True)  # Inclusive upper bound
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['ecosystem', 'package'], name='affected_range_pkg_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.ecosystem}/{self.package} [{self.introduced}, {self.fixed or self.last_affected})"
+
+
+class CpeMatch(models.Model):
+    """One vulnerable CPE match criterion from NVD configurations"""
+    vulnerability = models.ForeignKey(Vulnerability, on_delete=models.CASCADE, related_name='cpe_criteria')
+    criteria = models.CharField(max_length=500)  # Original cpe:2.3 string
+    part = models.CharField(max_length=1, blank=True)  # a / o / h
+    vendor = models.CharField(max_length=150)
+    product = models.CharField(max_length=150)
+    version = models.CharField(max_length=100, blank=True)  # '*' when bounded by the range below
+    version_start = models.CharField(max_length=100, blank=True)
+    start_inclusive = models.BooleanField(default=True)
+    version_end = models.CharField(max_length=100, blank=True)
+    end_inclusive = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['vendor', 'product'], name='cpe_match_product_idx'),
+        ]
+
+    def __str__(self):
+        return self.criteria
+
+
+class SourceFreshness(models.Model):
+    """When a source last answered a query, so a repeat search within its freshness window stays local"""
+    source = models.CharField(max_length=100)
+    query_key = models.CharField(max_length=550)  # '<query class>:<normalized query>'
+    query_class = models.CharField(max_length=20)
+    results_count = models.IntegerField(default=0)
+    fetched_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['source', 'query_key'], name='unique_source_freshness'),
+        ]
+
+    def __str__(self):
+        return f"{self.source} {self.query_key} @ {self.fetched_at}"
+
+
+class SourceStats(models.Model):
+    """Running latency, success and yield of one source for one query class, used to schedule it"""
+    source = models.CharField(max_length=100)
+    query_class = models.CharField(max_length=20)
+    runs = models.IntegerField(default=0)
+    successes = models.IntegerField(default=0)
+    failures = models.IntegerField(default=0)
+    timeouts = models.IntegerField(default=0)
+    results = models.IntegerField(default=0)  # Records returned, all runs
+    unique_results = models.FloatField(default=0)  # Distinct records; one k sources returned counts 1/k
+    # Exponentially weighted averages over recent runs
+    latency = models.FloatField(default=0)  # Seconds
+    latency_var = models.FloatField(default=0)
+    success_rate = models.FloatField(default=1)
+    unique_yield = models.FloatField(default=0)  # Distinct records per run, as in unique_results
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['query_class', 'source']
+        constraints = [
+            models.UniqueConstraint(fields=['source', 'query_class'], name='unique_source_stats'),
+        ]
+
+    def __str__(self):
+        return f"{self.source} [{self.query_class}] {self.latency:.2f}s, {self.success_rate:.0%} ok, {self.unique_yield:.2f} unique/run"
+
+
+class PurgeState(models.Model):
+    """Single row shared by every worker: how many purges have run, and how the last one went"""
+    generation = models.IntegerField(default=0)  # Bumped by each purge; workers drop their caches when it changes
+    state = models.CharField(max_length=20, default='idle')  # idle / running / done / failed
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    deleted = models.TextField(default='{}')  # JSON: model name -> rows deleted
+    error = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"purge #{self.generation} ({self.state})"
+
+
+class IndexGeneration(models.Model):
+    """Change counter of an index each worker loads from a table ('ranges', 'cpe'), bumped when the table changes"""
+    name = models.CharField(max_length=50, unique=True)
+    generation = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} #{self.generation}"
+
+
+class PageCache(models.Model):
+    """Fetched detail page, stored compressed with the fields extracted from it"""
+    url_hash = models.CharField(max_length=64, unique=True)  # sha256 of url
+    url = models.TextField()
+    content_hash = models.CharField(max_length=64)  # sha256 of the page body
+    body = models.BinaryField()  # zlib-compressed page body
+    size = models.IntegerField(default=0)  # Compressed bytes, counted against the store cap
+    extracted = models.TextField(default='{}')  # JSON: extractor key -> extracted fields
+    fetched_at = models.DateTimeField(default=timezone.now)
+    last_access = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return self.url
@@ -0,0 +1,181 @@
+import atexit
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from . import stats, recent
+
+logger = logging.getLogger(__name__)
+
+
+def get_analytics_settings() -> Dict[str, Any]:
+    analytics = {
+        'BUFFERED': True,
+        'BUFFER_SIZE': 100,
+        'FLUSH_INTERVAL': 5.0,
+        'USER_AGENT_CACHE_SIZE': 1000,
+    }
+    analytics.update(getattr(settings, 'SEARCH_ANALYTICS', {}))
+    return analytics
+
+
+def agent_hash(user_agent: str) -> str:
+    return hashlib.sha256(user_agent.encode('utf-8', 'replace')).hexdigest()
+
+
+class SearchEventBuffer:
+    """Collects search events in memory and writes them in batches.
+
+    record() only appends to a list; a daemon thread flushes the list with
+    bulk_create when it reaches BUFFER_SIZE events or FLUSH_INTERVAL seconds,
+    and an atexit hook flushes whatever is left when the worker shuts down.
+    User agent strings are stored once in UserAgent and referenced by id.
+    """
+
+    def __init__(self, buffer_size: int = 100, flush_interval: float = 5.0, agent_cache_size: int = 1000):
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.agent_cache_size = agent_cache_size
+        self._events: List[Tuple] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._agent_ids: OrderedDict = OrderedDict()
+
+    def record(self, query: str, results_count: int = 0, user_ip: str = None,
+               user_agent: str = None, source: str = ''):
+        event = (query[:500], source or '', results_count or 0, user_ip, user_agent or '', timezone.now())
+        with self._lock:
+            self._events.append(event)
+            full = len(self._events) >= self.buffer_size
+        self._ensure_thread()
+        if full:
+            self._wakeup.set()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._events)
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name='vtbda-analytics', daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing search analytics: {e}")
+            finally:
+                connections.close_all()
+
+    def flush(self) -> int:
+        """Write all buffered events; returns the number of rows written"""
+        with self._flush_lock:
+            with self._lock:
+                events, self._events = self._events, []
+            if not events:
+                return 0
+
+            from ..models import SearchQuery
+
+            agent_ids = self._resolve_agents({e[4] for e in events if e[4]})
+            SearchQuery.objects.bulk_create([
+                SearchQuery(
+                    query=query,
+                    source=source,
+                    results_count=results_count,
+                    user_ip=user_ip,
+                    agent_id=agent_ids.get(user_agent),
+                    created_at=created_at,
+                )
+                for query, source, results_count, user_ip, user_agent, created_at in events
+            ], batch_size=500)
+            stats.record_searches((e[0], e[2]) for e in events)
+            recent.bump_fragment('searches')
+            return len(events)
+
+    def _resolve_agents(self, user_agents) -> Dict[str, int]:
+        """Map user agent strings to UserAgent ids, inserting unseen ones"""
+        from ..models import UserAgent
+
+        resolved = {}
+        missing = {}
+        for value in user_agents:
+            agent_id = self._agent_ids.get(value)
+            if agent_id is not None:
+                self._agent_ids.move_to_end(value)
+                resolved[value] = agent_id
+            else:
+                missing[agent_hash(value)] = value
+
+        if missing:
+            UserAgent.objects.bulk_create(
+                [UserAgent(agent_hash=h, value=v) for h, v in missing.items()],
+                ignore_conflicts=True,
+            )
+            for h, agent_id in UserAgent.objects.filter(agent_hash__in=list(missing)).values_list('agent_hash', 'id'):
+                value = missing[h]
+                resolved[value] = agent_id
+                self._agent_ids[value] = agent_id
+
+            while len(self._agent_ids) > self.agent_cache_size:
+                self._agent_ids.popitem(last=False)
+
+        return resolved
+
+    def reset(self):
+        """Drop buffered events and cached agent ids (after a purge)"""
+        with self._lock:
+            self._events = []
+        self._agent_ids.clear()
+
+
+_buffer: Optional[SearchEventBuffer] = None
+_buffer_lock = threading.Lock()
+
+
+def get_buffer() -> SearchEventBuffer:
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                config = get_analytics_settings()
+                _buffer = SearchEventBuffer(
+                    buffer_size=config['BUFFER_SIZE'],
+                    flush_interval=config['FLUSH_INTERVAL'],
+                    agent_cache_size=config['USER_AGENT_CACHE_SIZE'],
+                )
+                atexit.register(flush_search_events)
+    return _buffer
+
+
+def record_search_event(query: str, results_count: int = 0, user_ip: str = None,
+                        user_agent: str = None, source: str = ''):
+    """Queue one search for the analytics tables"""
+    search_buffer = get_buffer()
+    search_buffer.record(query, results_count, user_ip, user_agent, source)
+    if not get_analytics_settings()['BUFFERED']:
+        search_buffer.flush()
+
+
+def flush_search_events() -> int:
+    if _buffer is None:
+        return 0
+    try:
+        return _buffer.flush()
+    except Exception as e:
+        logger.error(f"Error flushing search analytics: {e}")
+        return 0
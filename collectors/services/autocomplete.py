@@ -0,0 +1,358 @@
+import re
+import json
+import math
+import time
+import heapq
+import threading
+import logging
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+ID_PREFIX_RE = re.compile(r'^(?:cve|ghsa|pysec|rustsec|osv|gsd)-', re.IGNORECASE)  # No fuzzy matching for IDs
+
+
+def get_autocomplete_settings() -> Dict[str, Any]:
+    config = {
+        'LIMIT': 10,               # Suggestions returned by default
+        'MAX_LIMIT': 50,
+        'MIN_CHARS': 2,
+        'REFRESH_INTERVAL': 5,     # Seconds between checks for rows stored since the last refresh
+        'MAX_TITLES': 200000,      # Newest titles loaded into the prefix index at warm-up
+        'DELTA_LIMIT': 5000,       # New keys kept aside before they are merged into the main list
+        'SCAN': 50,                # Prefix matches examined per kind before picking the top ones
+        'FUZZY_MIN_CHARS': 3,      # Shorter queries get prefix matches only
+        'FUZZY_THRESHOLD': 0.3,    # Trigram similarity for fuzzy package and title matches
+        'MAX_POSTING': 2000,       # Package trigrams shared by more names than this don't nominate candidates
+    }
+    config.update(getattr(settings, 'AUTOCOMPLETE', {}))
+    return config
+
+
+def trigrams(text: str) -> set:
+    """Trigrams of a lowercase string, padded like pg_trgm so prefixes weigh more"""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SortedKeys:
+    """Case-folded keys in a sorted list searched with bisect, each with its display label.
+
+    New keys go to a small sorted delta list (insort into the big list
+    would move up to a million pointers per key) that is merged in once it
+    grows past delta_limit. Labels equal to their key share the same
+    string object, which is why IDs are folded to upper case.
+    """
+
+    def __init__(self, labels: Dict[str, str], delta_limit: int = 5000, fold=str.lower):
+        self.keys = sorted(labels)
+        self.labels = [labels[key] for key in self.keys]
+        self.delta: List[Tuple[str, str]] = []
+        self.delta_limit = delta_limit
+        self.fold = fold
+
+    def __len__(self) -> int:
+        return len(self.keys) + len(self.delta)
+
+    def __contains__(self, key: str) -> bool:
+        i = bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            return True
+        i = bisect_left(self.delta, (key,))
+        return i < len(self.delta) and self.delta[i][0] == key
+
+    def add(self, label: str) -> bool:
+        """Add a label under its folded key; False when the key is already present"""
+        key = self.fold(label)
+        if key in self:
+            return False
+        insort(self.delta, (key, label if key != label else key))
+        if len(self.delta) > self.delta_limit:
+            merged = list(heapq.merge(zip(self.keys, self.labels), self.delta))
+            self.keys = [key for key, _ in merged]
+            self.labels = [label for _, label in merged]
+            self.delta = []
+        return True
+
+    def prefix(self, prefix: str, limit: int) -> List[Tuple[str, str]]:
+        """Up to limit (key, label) pairs starting with prefix, in key order"""
+        found = []
+        keys = self.keys
+        i = bisect_left(keys, prefix)
+        while i < len(keys) and len(found) < limit and keys[i].startswith(prefix):
+            found.append((keys[i], self.labels[i]))
+            i += 1
+        i = bisect_left(self.delta, (prefix,))
+        while i < len(self.delta) and self.delta[i][0].startswith(prefix):
+            found.append(self.delta[i])
+            i += 1
+        found.sort()
+        return found[:limit]
+
+
+class AutocompleteIndex:
+    """In-memory prefix index over CVE/advisory IDs, package names and recent titles.
+
+    Built from the table on first use, then kept current by refresh(),
+    which reads only rows with an id above the last one seen, at most
+    every REFRESH_INTERVAL seconds. Packages ('PyPI/django') are indexed
+    under the full and the bare name, carry the number of stored
+    vulnerabilities naming them, and have a trigram index for misspelled
+    names. Fuzzy title matches come from pg_trgm where available.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.lock = threading.Lock()
+        self.refresh_lock = threading.Lock()
+        self.ids = SortedKeys({}, config['DELTA_LIMIT'], str.upper)
+        self.packages = SortedKeys({}, config['DELTA_LIMIT'])
+        self.titles = SortedKeys({}, config['DELTA_LIMIT'])
+        self.package_counts: Counter = Counter()  # Full package name (lowercase) -> vulnerabilities
+        self.package_names: Dict[str, str] = {}   # Key (full or bare name) -> full package label
+        self.package_trigrams: Dict[str, set] = defaultdict(set)
+        self.trigram_counts: Dict[str, int] = {}  # Package key -> number of trigrams
+        self.last_id = 0
+        self.last_refresh = 0.0
+        self.warmed = False
+
+    @staticmethod
+    def _packages(affected_packages: str) -> List[str]:
+        try:
+            packages = json.loads(affected_packages or '[]')
+        except ValueError:
+            return []
+        return [p.strip() for p in packages if isinstance(p, str) and p.strip()] if isinstance(packages, list) else []
+
+    def _add_package(self, package: str, labels: Optional[Dict[str, str]] = None):
+        """Count a package, indexing its names the first time; labels collects keys for a bulk build"""
+        full = package.lower()
+        seen = full in self.package_counts
+        self.package_counts[full] += 1
+        if seen:
+            return
+        # 'PyPI/django' under 'django' too; 'Maven/group:artifact' under 'group:artifact' and 'artifact'
+        bare = package.rsplit('/', 1)[-1]
+        for label in {package, bare, bare.rsplit(':', 1)[-1]}:
+            key = label.lower()
+            if labels is not None:
+                labels.setdefault(key, label if key != label else key)
+            else:
+                self.packages.add(label)
+            if key == full:
+                self.package_names[key] = package
+            else:
+                self.package_names.setdefault(key, package)
+            if key not in self.trigram_counts:
+                key_trigrams = trigrams(key)
+                self.trigram_counts[key] = len(key_trigrams)
+                for trigram in key_trigrams:
+                    self.package_trigrams[trigram].add(key)
+
+    def _add_rows(self, rows: Iterable[Tuple[int, str, str, str]]):
+        for vuln_id, cve_id, title, affected_packages in rows:
+            if cve_id:
+                self.ids.add(cve_id)
+            if title:
+                self.titles.add(title)
+            for package in self._packages(affected_packages):
+                self._add_package(package)
+            self.last_id = max(self.last_id, vuln_id)
+
+    def warm(self, chunk_size: int = 5000):
+        from ..models import Vulnerability
+
+        rows = Vulnerability.objects.values_list('id', 'cve_id', 'affected_packages').order_by()
+        newest = Vulnerability.objects.order_by('-id').values_list('title', flat=True)[:self.config['MAX_TITLES']]
+        self.load(rows.iterator(chunk_size=chunk_size), newest.iterator(chunk_size=chunk_size))
+        logger.info(f"Autocomplete index warmed: {len(self.ids)} IDs, {len(self.package_counts)} packages, {len(self.titles)} titles")
+
+    def load(self, rows: Iterable[Tuple[int, str, str]], titles: Iterable[str]):
+        """Replace the contents with (id, cve_id, affected_packages) rows and titles, newest first"""
+        fresh = AutocompleteIndex(self.config)
+        ids = {}
+        packages = {}
+        for vuln_id, cve_id, affected_packages in rows:
+            if cve_id:
+                key = cve_id.upper()
+                ids[key] = cve_id if key != cve_id else key
+            for package in fresh._packages(affected_packages):
+                fresh._add_package(package, packages)
+            fresh.last_id = max(fresh.last_id, vuln_id)
+        newest = {}
+        for title in titles:
+            if title:
+                newest.setdefault(title.lower(), title)
+
+        with self.lock:
+            self.ids = SortedKeys(ids, self.config['DELTA_LIMIT'], str.upper)
+            self.titles = SortedKeys(newest, self.config['DELTA_LIMIT'])
+            self.packages = SortedKeys(packages, self.config['DELTA_LIMIT'])
+            self.package_counts, self.package_names = fresh.package_counts, fresh.package_names
+            self.package_trigrams, self.trigram_counts = fresh.package_trigrams, fresh.trigram_counts
+            self.last_id = fresh.last_id
+            self.last_refresh = time.monotonic()
+            self.warmed = True
+
+    def refresh(self, force: bool = False):
+        """Add rows stored since the last refresh; a shrunken table (purge) triggers a rebuild"""
+        from ..models import Vulnerability
+
+        if not force and time.monotonic() - self.last_refresh < self.config['REFRESH_INTERVAL']:
+            return
+        if not self.refresh_lock.acquire(blocking=False):
+            return  # Another request is refreshing; serve what we have
+        try:
+            self.last_refresh = time.monotonic()
+            newest = Vulnerability.objects.order_by('-id').values_list('id', flat=True).first() or 0
+            if newest < self.last_id:
+                self.warm()
+                return
+            if newest == self.last_id:
+                return
+            rows = list(Vulnerability.objects.filter(id__gt=self.last_id).order_by('id').values_list(
+                'id', 'cve_id', 'title', 'affected_packages'
+            ))
+            with self.lock:
+                self._add_rows(rows)
+        finally:
+            self.refresh_lock.release()
+
+    def _fuzzy_packages(self, query: str, limit: int) -> List[Tuple[float, str]]:
+        """Package names whose trigram similarity to the query (as pg_trgm computes it) reaches the threshold.
+
+        Similarity t needs at least t * len(query trigrams) shared, so a
+        match must appear in one of the len - that + 1 shortest non-empty
+        posting lists; only those nominate candidates (skipping any longer
+        than MAX_POSTING but the shortest, which trades a little recall for
+        a bounded scan). The rest only complete the overlap of candidates
+        that can still qualify.
+        """
+        wanted = trigrams(query)
+        threshold = self.config['FUZZY_THRESHOLD']
+        postings = sorted((self.package_trigrams.get(trigram, ()) for trigram in wanted), key=len)
+        needed = max(1, math.ceil(threshold * len(wanted)))
+        postings = [posting for posting in postings if posting]
+        cut = len(postings) - needed + 1
+        if cut <= 0:
+            return []
+        nominating, remaining = postings[:1], postings[cut:]
+        for posting in postings[1:cut]:
+            (nominating if len(posting) <= self.config['MAX_POSTING'] else remaining).append(posting)
+
+        overlap: Counter = Counter()
+        for posting in nominating:
+            overlap.update(posting)
+        scored = []
+        for key, shared in overlap.items():
+            size = self.trigram_counts[key]
+            best = shared + len(remaining)
+            if best / (len(wanted) + size - best) < threshold:
+                continue
+            shared += sum(1 for posting in remaining if key in posting)
+            score = shared / (len(wanted) + size - shared)
+            if score >= threshold:
+                scored.append((score, key))
+        return heapq.nlargest(limit, scored)
+
+    def suggest(self, query: str, limit: int) -> List[Dict[str, Any]]:
+        """Prefix matches per kind, exact matches first, then fuzzy package names to fill up"""
+        query = ' '.join(query.split()).lower()
+        scan = max(limit, self.config['SCAN'])
+        suggestions = []
+        seen = set()
+
+        def add(kind, label, rank, count=None):
+            key = (kind, label.lower())
+            if key in seen:
+                return
+            seen.add(key)
+            suggestion = {'value': label, 'kind': kind}
+            if count is not None:
+                suggestion['count'] = count
+            suggestions.append((rank, suggestion))
+
+        with self.lock:
+            id_query = query.upper()
+            for key, label in self.ids.prefix(id_query, scan):
+                add('id', label, (key != id_query, 0, 0, len(key), key))
+            for key, label in self.packages.prefix(query, scan):
+                package = self.package_names.get(key, label)
+                count = self.package_counts[package.lower()]
+                add('package', package, (key != query and package.lower() != query, 1, -count, len(key), key), count)
+            for key, label in self.titles.prefix(query, scan):
+                add('title', label, (key != query, 2, 0, len(key), key))
+            if len(suggestions) < limit and len(query) >= self.config['FUZZY_MIN_CHARS'] and not ID_PREFIX_RE.match(query):
+                for score, key in self._fuzzy_packages(query, limit):
+                    package = self.package_names.get(key, key)
+                    count = self.package_counts[package.lower()]
+                    add('package', package, (True, 3, -score, -count, key), count)
+
+        suggestions.sort(key=lambda pair: pair[0])
+        return [suggestion for _, suggestion in suggestions[:limit]]
+
+
+def fuzzy_titles(query: str, limit: int) -> List[str]:
+    """Titles similar to the query through the pg_trgm GIN index; empty on other databases"""
+    from django.contrib.postgres.search import TrigramSimilarity
+    from ..models import Vulnerability
+
+    queryset = Vulnerability.objects.all()
+    if connections[queryset.db].vendor != 'postgresql':
+        return []
+    rows = (
+        queryset
+        .filter(title__trigram_similar=query)
+        .annotate(similarity=TrigramSimilarity('title', query))
+        .order_by('-similarity')
+        .values_list('title', flat=True)[:limit]
+    )
+    return list(rows)
+
+
+_index: Optional[AutocompleteIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> AutocompleteIndex:
+    """Shared index, warmed from the table on first use"""
+    global _index
+    if _index is None or not _index.warmed:
+        with _index_lock:
+            if _index is None:
+                _index = AutocompleteIndex(get_autocomplete_settings())
+            if not _index.warmed:
+                _index.warm()
+    return _index
+
+
+def reset_index():
+    """Forget everything (after a purge); the next use re-warms from the table"""
+    global _index
+    with _index_lock:
+        _index = None
+
+
+def suggest(query: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Top suggestions for a partial query: IDs, packages and titles"""
+    config = get_autocomplete_settings()
+    limit = max(1, min(limit or config['LIMIT'], config['MAX_LIMIT']))
+    query = ' '.join((query or '').split())
+    if len(query) < config['MIN_CHARS']:
+        return []
+
+    index = get_index()
+    index.refresh()
+    suggestions = index.suggest(query, limit)
+    if len(suggestions) < limit and len(query) >= config['FUZZY_MIN_CHARS'] and not ID_PREFIX_RE.match(query):
+        known = {s['value'].lower() for s in suggestions if s['kind'] == 'title'}
+        for title in fuzzy_titles(query, limit - len(suggestions)):
+            if title.lower() not in known:
+                known.add(title.lower())
+                suggestions.append({'value': title, 'kind': 'title'})
+    return suggestions[:limit]
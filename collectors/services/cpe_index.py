@@ -0,0 +1,240 @@
+import re
+import threading
+import logging
+from collections import OrderedDict
+from functools import reduce
+from operator import or_
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Q
+
+from . import generations
+from .versions import version_key
+
+logger = logging.getLogger(__name__)
+
+GENERATION = 'cpe'  # IndexGeneration.name
+LOOKUP_CHUNK = 200
+ANY = ('*', '-', '')
+
+# Split a CPE 2.3 formatted string on colons that aren't backslash-escaped
+CPE_SPLIT_RE = re.compile(r'(?<!\\):')
+CPE_UNESCAPE_RE = re.compile(r'\\(.)')
+
+
+def _unescape(value: str) -> str:
+    return CPE_UNESCAPE_RE.sub(r'\1', value).lower()
+
+
+def split_cpe(cpe: str) -> Optional[Tuple[str, str, str, str]]:
+    """(part, vendor, product, version) from a CPE 2.3 string or a 2.2 URI"""
+    cpe = (cpe or '').strip()
+    if cpe.startswith('cpe:2.3:'):
+        fields = CPE_SPLIT_RE.split(cpe[len('cpe:2.3:'):])
+    elif cpe.startswith('cpe:/'):
+        fields = cpe[len('cpe:/'):].split(':')
+    else:
+        return None
+    fields += [''] * (4 - len(fields))
+    part, vendor, product, version = (_unescape(f) for f in fields[:4])
+    if not vendor or not product or vendor in ANY or product in ANY:
+        return None
+    return part, vendor, product, version
+
+
+def extract_cpe_matches(configurations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Vulnerable cpeMatch criteria from an NVD CVE API 2.0 configurations block"""
+    matches = []
+    seen = set()
+
+    def walk(nodes):
+        for node in nodes or []:
+            for cpe_match in node.get('cpeMatch', []):
+                if not cpe_match.get('vulnerable'):
+                    continue
+                parsed = split_cpe(cpe_match.get('criteria', ''))
+                if not parsed:
+                    continue
+                start = cpe_match.get('versionStartIncluding') or cpe_match.get('versionStartExcluding') or ''
+                end = cpe_match.get('versionEndExcluding') or cpe_match.get('versionEndIncluding') or ''
+                entry = {
+                    'criteria': cpe_match['criteria'],
+                    'part': parsed[0],
+                    'vendor': parsed[1],
+                    'product': parsed[2],
+                    'version': parsed[3],
+                    'version_start': start,
+                    'start_inclusive': 'versionStartExcluding' not in cpe_match,
+                    'version_end': end,
+                    'end_inclusive': 'versionEndIncluding' in cpe_match,
+                }
+                key = tuple(entry.values())
+                if key not in seen:
+                    seen.add(key)
+                    matches.append(entry)
+            walk(node.get('children'))
+
+    for configuration in configurations or []:
+        walk(configuration.get('nodes'))
+    return matches
+
+
+CPE_FIELDS = ('criteria', 'part', 'vendor', 'product', 'version', 'version_start', 'start_inclusive',
+              'version_end', 'end_inclusive')
+
+
+def store_cpe_matches(entries: Iterable[Tuple[Any, List[Dict[str, Any]]]]) -> int:
+    """Persist CPE criteria given as (stored vulnerability, criteria) entries.
+
+    NVD is the only source of criteria, so the latest set for a
+    vulnerability replaces the stored one; entries for the same
+    vulnerability are merged and unchanged sets are not written.
+    Returns the number of rows inserted.
+    """
+    from ..models import CpeMatch
+
+    wanted = {}  # vulnerability id -> (vulnerability, criteria tuples in CPE_FIELDS order)
+    for vulnerability, cpe_matches in entries:
+        criteria = wanted.setdefault(vulnerability.pk, (vulnerability, set()))[1]
+        for match in cpe_matches or []:
+            criteria.add((
+                match['criteria'][:500], match['part'][:1], match['vendor'][:150], match['product'][:150],
+                match['version'][:100], match['version_start'][:100], match['start_inclusive'],
+                match['version_end'][:100], match['end_inclusive'],
+            ))
+
+    stored = {}
+    vulnerability_ids = list(wanted)
+    for start in range(0, len(vulnerability_ids), LOOKUP_CHUNK):
+        rows = CpeMatch.objects.filter(vulnerability_id__in=vulnerability_ids[start:start + LOOKUP_CHUNK])
+        for vulnerability_id, *match in rows.values_list('vulnerability_id', *CPE_FIELDS):
+            stored.setdefault(vulnerability_id, set()).add(tuple(match))
+
+    rows = []
+    changed = False
+    for vulnerability_id, (vulnerability, criteria) in wanted.items():
+        if criteria == stored.get(vulnerability_id, set()):
+            continue
+        changed = True
+        if vulnerability_id in stored:
+            CpeMatch.objects.filter(vulnerability_id=vulnerability_id).delete()
+        rows.extend(
+            CpeMatch(vulnerability=vulnerability, **dict(zip(CPE_FIELDS, match)))
+            for match in sorted(criteria)
+        )
+    if changed:
+        CpeMatch.objects.bulk_create(rows, batch_size=500)
+        # Other processes must not reload the index before these rows are visible
+        transaction.on_commit(bump_generation)
+    return len(rows)
+
+
+def bump_generation():
+    """Tell every process to drop its cached criteria (the generation lives in the database)"""
+    generations.bump_generation(GENERATION)
+
+
+class CpeIndex:
+    """Per-(vendor, product) version bounds loaded from CpeMatch.
+
+    Products are fetched in chunks (one OR of vendor/product pairs per
+    chunk, each served by the (vendor, product) index) and kept with
+    precomputed version keys in a bounded LRU, cleared when the table
+    changes: each lookup reads the shared IndexGeneration row, so criteria
+    loaded by any worker are dropped once another stores new ones. A
+    lookup is then a few tuple comparisons per criterion. Criteria keep
+    their part, so an operating system (o) criterion doesn't match an
+    application (a) CPE of the same vendor and product; a '*' part on
+    either side matches any.
+    """
+
+    def __init__(self, max_products: int = 200000):
+        self.max_products = max_products
+        self.products: OrderedDict = OrderedDict()
+        self.generation = None
+        self.lock = threading.Lock()
+
+    def _check_generation(self):
+        generation = generations.get_generation(GENERATION)
+        if generation != self.generation:
+            self.products.clear()
+            self.generation = generation
+
+    def _load(self, products: Iterable[Tuple[str, str]]):
+        from ..models import CpeMatch
+
+        missing = [p for p in products if p not in self.products]
+        for start in range(0, len(missing), LOOKUP_CHUNK):
+            chunk = missing[start:start + LOOKUP_CHUNK]
+            loaded = {p: [] for p in chunk}
+            rows = CpeMatch.objects.filter(
+                reduce(or_, (Q(vendor=vendor, product=product) for vendor, product in chunk))
+            ).values_list(
+                'part', 'vendor', 'product', 'version', 'version_start', 'start_inclusive',
+                'version_end', 'end_inclusive', 'criteria', 'vulnerability__cve_id',
+            )
+            for part, vendor, product, version, version_start, start_inclusive, version_end, end_inclusive, criteria, cve_id in rows:
+                exact = None if version in ANY else version_key('', version)
+                low = version_key('', version_start) if version_start else None
+                high = version_key('', version_end) if version_end else None
+                loaded[(vendor, product)].append((part, exact, low, start_inclusive, high, end_inclusive, {
+                    'cve_id': cve_id,
+                    'criteria': criteria,
+                    'version_start': version_start,
+                    'version_end': version_end,
+                }))
+            for product, criteria in loaded.items():
+                self.products[product] = criteria
+        while len(self.products) > self.max_products:
+            self.products.popitem(last=False)
+
+    @staticmethod
+    def _matches(key, exact, low, start_inclusive, high, end_inclusive) -> bool:
+        if key is None:
+            return True  # Any version was asked for
+        if exact is not None:
+            return key == exact
+        if low is not None and (key < low or (key == low and not start_inclusive)):
+            return False
+        if high is not None and (key > high or (key == high and not end_inclusive)):
+            return False
+        return True
+
+    def lookup(self, cpes: List[str]) -> List[Dict[str, Any]]:
+        """Match CPE strings against the index; unparseable CPEs are reported as invalid"""
+        parsed = []
+        for cpe in cpes:
+            parsed.append((cpe, split_cpe(cpe)))
+
+        results = []
+        with self.lock:
+            self._check_generation()
+            self._load(list({(p[1], p[2]) for cpe, p in parsed if p}))
+            for cpe, parts in parsed:
+                if not parts:
+                    results.append({'cpe': cpe, 'valid': False, 'vulnerabilities': []})
+                    continue
+                part, vendor, product, version = parts
+                key = None if version in ANY else version_key('', version)
+                matches = {}
+                for stored_part, exact, low, start_inclusive, high, end_inclusive, info in self.products.get((vendor, product), []):
+                    if part not in ANY and stored_part not in ANY and part != stored_part:
+                        continue
+                    if self._matches(key, exact, low, start_inclusive, high, end_inclusive):
+                        matches.setdefault(info['cve_id'], info)
+                results.append({'cpe': cpe, 'valid': True, 'vulnerabilities': list(matches.values())})
+        return results
+
+
+_index: Optional[CpeIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> CpeIndex:
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = CpeIndex()
+    return _index
@@ -0,0 +1,217 @@
+import os
+import json
+import sys
+import threading
+import logging
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from collections import deque
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def get_cpu_pool_settings() -> Dict[str, Any]:
+    config = {
+        'ENABLED': False,          # Worth it on multi-core hosts with bulk ingests
+        'WORKERS': 0,              # 0: one per CPU
+        'MIN_ITEMS': 500,          # Smaller pages are normalized inline
+        'CHUNK_SIZE': 500,         # Raw items per task sent to a worker
+        'MIN_HTML_BYTES': 20000,   # Smaller pages are parsed inline
+        'START_METHOD': 'spawn',   # Forking a process with live threads is unsafe
+    }
+    config.update(getattr(settings, 'CPU_POOL', {}))
+    return config
+
+
+def free_threaded() -> bool:
+    """True on a free-threaded interpreter, where threads run Python in parallel"""
+    is_gil_enabled = getattr(sys, '_is_gil_enabled', None)
+    return is_gil_enabled is not None and not is_gil_enabled()
+
+
+def _init_worker():
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+
+
+_pool: Optional[Executor] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> Executor:
+    """Shared CPU pool: processes, or threads on a free-threaded interpreter"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                config = get_cpu_pool_settings()
+                workers = config['WORKERS'] or os.cpu_count() or 1
+                if free_threaded():
+                    _pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='vtbda-cpu')
+                else:
+                    _pool = ProcessPoolExecutor(
+                        max_workers=workers,
+                        mp_context=multiprocessing.get_context(config['START_METHOD']),
+                        initializer=_init_worker,
+                    )
+    return _pool
+
+
+def reset_pool():
+    """Shut the pool down; the next use starts a new one"""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def enabled() -> bool:
+    return bool(get_cpu_pool_settings()['ENABLED'])
+
+
+# Worker side: scrapers and specs are looked up by class, never pickled
+
+_scrapers: Dict[type, Any] = {}
+
+
+def _scraper(scraper_class: type):
+    instance = _scrapers.get(scraper_class)
+    if instance is None:
+        instance = _scrapers[scraper_class] = scraper_class()
+    return instance
+
+
+def _find_spec(scraper_class: type, name: str):
+    from .scraper_spec import ScraperSpec
+
+    scraper = _scraper(scraper_class)
+    specs = list(scraper.get_specs()) if hasattr(scraper, 'get_specs') else []
+    specs += [value for value in vars(scraper_class).values() if isinstance(value, ScraperSpec)]
+    for spec in specs:
+        if spec.name == name:
+            return spec
+    raise LookupError(f"No spec '{name}' on {scraper_class.__name__}")
+
+
+def _run_extract(spec, method: str, html: str, url: str, query: str):
+    if method == 'items':
+        return spec.extract_items(html, url)
+    return spec.extract_detail(html, url, query)
+
+
+def _extract_task(scraper_class: type, spec_name: str, method: str, html: str, url: str, query: str):
+    return _run_extract(_find_spec(scraper_class, spec_name), method, html, url, query)
+
+
+def _normalize_task(scraper_class: type, source: str, items: List[Dict[str, Any]]):
+    from .scrapper import normalize_items
+
+    return normalize_items(_scraper(scraper_class), source, items)
+
+
+def _decode(scraper, source: str, body: bytes, key: str) -> Tuple[int, list]:
+    from .scrapper import normalize_items
+
+    items = json.loads(body).get(key) or []
+    return len(items), normalize_items(scraper, source, items)
+
+
+def _decode_task(scraper_class: type, source: str, body: bytes, key: str):
+    return _decode(_scraper(scraper_class), source, body, key)
+
+
+# Caller side: every call falls back to running inline if the pool can't be used
+
+def _pool_failed(e: Exception):
+    logger.warning(f"CPU pool task failed, running inline: {e!r}")
+    if isinstance(e, BrokenProcessPool):
+        reset_pool()
+
+
+def extract(scraper, spec, method: str, html: str, url: str, query: str = ''):
+    """spec.extract_items (method 'items') or extract_detail ('detail'), parsed on the pool when enabled"""
+    config = get_cpu_pool_settings()
+    if not config['ENABLED'] or len(html) < config['MIN_HTML_BYTES']:
+        return _run_extract(spec, method, html, url, query)
+    try:
+        return get_pool().submit(_extract_task, type(scraper), spec.name, method, html, url, query).result()
+    except Exception as e:
+        _pool_failed(e)
+        return _run_extract(spec, method, html, url, query)
+
+
+def offload(size: int) -> bool:
+    """Whether a page of size raw items is worth normalizing on the pool"""
+    config = get_cpu_pool_settings()
+    return config['ENABLED'] and size >= config['MIN_ITEMS']
+
+
+def normalize(scraper, source: str, items: List[Dict[str, Any]]) -> Iterator[Tuple[int, list]]:
+    """Normalize raw items on the pool, yielding (chunk size, VulnRecords) in order.
+
+    The page is split into CHUNK_SIZE tasks that all start at once; each
+    chunk is yielded as soon as it and the ones before it are done, so the
+    pipeline can persist early chunks while later ones are still parsing.
+    """
+    from .scrapper import normalize_items
+
+    chunk_size = get_cpu_pool_settings()['CHUNK_SIZE']
+    chunks = [items[start:start + chunk_size] for start in range(0, len(items), chunk_size)]
+    try:
+        pool = get_pool()
+        futures = [pool.submit(_normalize_task, type(scraper), source, chunk) for chunk in chunks]
+    except Exception as e:
+        _pool_failed(e)
+        futures = [None] * len(chunks)
+
+    for chunk, future in zip(chunks, futures):
+        records = None
+        if future is not None:
+            try:
+                records = future.result()
+            except Exception as e:
+                _pool_failed(e)
+        if records is None:
+            records = normalize_items(scraper, source, chunk)
+        yield len(chunk), records
+
+
+def normalize_bodies(scraper, source: str, bodies: Iterable[bytes], key: str) -> Iterator[Tuple[int, list]]:
+    """Decode and normalize undecoded JSON response bodies on the pool.
+
+    Yields (raw item count, VulnRecords) per body. The parent only moves
+    bytes out and records back; json.loads runs in the workers too. Bodies
+    are submitted as they arrive, with up to two per worker in flight.
+    """
+    config = get_cpu_pool_settings()
+    window = 2 * (config['WORKERS'] or os.cpu_count() or 1)
+    pending = deque()
+
+    def result(body, future):
+        if future is not None:
+            try:
+                return future.result()
+            except Exception as e:
+                _pool_failed(e)
+        return _decode(scraper, source, body, key)
+
+    for body in bodies:
+        try:
+            future = get_pool().submit(_decode_task, type(scraper), source, body, key)
+        except Exception as e:
+            _pool_failed(e)
+            future = None
+        pending.append((body, future))
+        while len(pending) >= window:
+            yield result(*pending.popleft())
+    while pending:
+        yield result(*pending.popleft())
+
@@ -0,0 +1,77 @@
+import re
+from datetime import date, datetime, timezone
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from typing import Any, Optional, Tuple
+
+from dateutil import parser as dateutil_parser
+
+# YYYY-MM-DD, optionally followed by a time (NVD, OSV, GitHub, most APIs)
+ISO_RE = re.compile(r'^\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?)?(?:Z|[+-]\d{2}:?\d{2})?$')
+# RSS pubDate / RFC 2822: "Tue, 10 Dec 2021 10:15:09 GMT", "10 Dec 2021 10:15:09 +0000"
+RFC2822_RE = re.compile(r'^(?:[A-Za-z]{3}, )?\d{1,2} [A-Za-z]{3} \d{4} \d{2}:\d{2}')
+FRACTION_RE = re.compile(r'\.(\d+)')
+
+# Display formats of specific sources, tried before the dateutil fallback
+EXPLOITDB_FORMATS = ('%Y-%m-%d', '%d %b %Y', '%b %d, %Y')
+
+
+def _fraction(match) -> str:
+    # fromisoformat before 3.11 only takes 3 or 6 fractional digits
+    return '.' + match.group(1)[:6].ljust(6, '0')
+
+
+def to_utc(value: datetime) -> datetime:
+    """Aware UTC datetime; naive values are taken to be UTC already"""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+@lru_cache(maxsize=50000)
+def _parse_text(text: str, formats: Tuple[str, ...]) -> Optional[datetime]:
+    if ISO_RE.match(text):
+        iso = text[:-1] + '+00:00' if text.endswith('Z') else text
+        try:
+            return to_utc(datetime.fromisoformat(FRACTION_RE.sub(_fraction, iso)))
+        except ValueError:
+            pass
+
+    for fmt in formats:
+        try:
+            return to_utc(datetime.strptime(text, fmt))
+        except ValueError:
+            continue
+
+    if RFC2822_RE.match(text):
+        try:
+            return to_utc(parsedate_to_datetime(text))
+        except (TypeError, ValueError):
+            pass
+
+    try:
+        return to_utc(dateutil_parser.parse(text))
+    except (ValueError, OverflowError):
+        return None
+
+
+def parse_date(value: Any, formats: Tuple[str, ...] = ()) -> Optional[datetime]:
+    """Normalize a published/modified date to an aware UTC datetime.
+
+    ISO 8601 / RFC 3339 strings, the given strptime formats and RFC 2822
+    dates are handled without dateutil, which is only the fallback for
+    anything else. String results are memoized, since batches repeat the
+    same dates a lot. Returns None for empty or unparseable values.
+    """
+    if value is None or value == '':
+        return None
+    if isinstance(value, datetime):
+        return to_utc(value)
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day, tzinfo=timezone.utc)
+    if not isinstance(value, str):
+        return None
+    text = value.strip()
+    if not text:
+        return None
+    return _parse_text(text, formats)
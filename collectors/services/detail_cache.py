@@ -0,0 +1,134 @@
+import hashlib
+import logging
+from typing import Dict, Any, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .dates import parse_date
+
+logger = logging.getLogger(__name__)
+
+
+def get_detail_cache_timeout() -> int:
+    return getattr(settings, 'VULNERABILITY_SCANNER', {}).get('DETAIL_CACHE_TIMEOUT', 3600)
+
+
+def _digest(value: str) -> str:
+    return hashlib.md5(value.encode('utf-8')).hexdigest()
+
+
+def _payload_key(cve_id: str, version: str) -> str:
+    return f"vuln:payload:{_digest(cve_id)}:{version}"
+
+
+def _html_key(cve_id: str, version: str) -> str:
+    return f"vuln:html:{_digest(cve_id)}:{version}"
+
+
+def build_payload(vuln) -> Dict[str, Any]:
+    """Everything the detail page needs, decoded once per record version"""
+    version = vuln.updated_at.isoformat()
+    return {
+        'id': vuln.id,
+        'cve_id': vuln.cve_id,
+        'title': vuln.title,
+        'description': vuln.description,
+        'severity': vuln.severity,
+        'cvss_score': float(vuln.cvss_score) if vuln.cvss_score is not None else None,
+        'cvss_vector': vuln.cvss_vector,
+        'source': vuln.source.name if vuln.source else None,
+        'source_url': vuln.source_url,
+        'published_date': vuln.published_date,
+        'affected_packages': vuln.get_affected_packages(),
+        'references': vuln.get_references(),
+        'tags': vuln.get_tags(),
+        'created_at': vuln.created_at,
+        'updated_at': vuln.updated_at,
+        'etag': f'"{_digest(vuln.cve_id + version)}"',
+        'version': version,
+    }
+
+
+def _lookup(cve_id: Optional[str], vuln_id: Optional[int]) -> Dict[str, Any]:
+    return {'cve_id': cve_id} if cve_id is not None else {'pk': vuln_id}
+
+
+def get_payload(cve_id: Optional[str] = None, vuln_id: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """Cached detail payload by CVE ID or primary key, None if not found.
+
+    The row's current updated_at is read on every call (one indexed
+    lookup, which the conditional GET needs anyway) and is part of the
+    cache key. An update or delete made by any worker is therefore seen
+    at once, even with a per-process cache, and nothing has to be
+    invalidated; superseded versions simply expire.
+    """
+    from ..models import Vulnerability
+
+    current = Vulnerability.objects.filter(**_lookup(cve_id, vuln_id)).values_list('cve_id', 'updated_at').first()
+    if current is None:
+        return None
+    payload = cache.get(_payload_key(current[0], current[1].isoformat()))
+    if payload is not None:
+        return payload
+
+    vuln = Vulnerability.objects.select_related('source').filter(**_lookup(cve_id, vuln_id)).first()
+    if vuln is None:
+        return None
+    payload = build_payload(vuln)
+    cache.set(_payload_key(vuln.cve_id, payload['version']), payload, get_detail_cache_timeout())
+    return payload
+
+
+async def aget_payload(cve_id: Optional[str] = None, vuln_id: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """get_payload() with the async cache and ORM APIs"""
+    from ..models import Vulnerability
+
+    current = await Vulnerability.objects.filter(**_lookup(cve_id, vuln_id)).values_list('cve_id', 'updated_at').afirst()
+    if current is None:
+        return None
+    payload = await cache.aget(_payload_key(current[0], current[1].isoformat()))
+    if payload is not None:
+        return payload
+
+    vuln = await Vulnerability.objects.select_related('source').filter(**_lookup(cve_id, vuln_id)).afirst()
+    if vuln is None:
+        return None
+    payload = build_payload(vuln)
+    await cache.aset(_payload_key(vuln.cve_id, payload['version']), payload, get_detail_cache_timeout())
+    return payload
+
+
+def get_cached_html(payload: Dict[str, Any]) -> Optional[str]:
+    return cache.get(_html_key(payload['cve_id'], payload['version']))
+
+
+def set_cached_html(payload: Dict[str, Any], html: str):
+    cache.set(_html_key(payload['cve_id'], payload['version']), html, get_detail_cache_timeout())
+
+
+async def aget_cached_html(payload: Dict[str, Any]) -> Optional[str]:
+    return await cache.aget(_html_key(payload['cve_id'], payload['version']))
+
+
+async def aset_cached_html(payload: Dict[str, Any], html: str):
+    await cache.aset(_html_key(payload['cve_id'], payload['version']), html, get_detail_cache_timeout())
+
+
+def template_context(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Context for vulnerability_detail.html"""
+    vulnerability = dict(payload)
+    if isinstance(vulnerability['published_date'], str):
+        vulnerability['published_date'] = parse_date(vulnerability['published_date']) or vulnerability['published_date']
+    return {
+        'vulnerability': vulnerability,
+        'affected_packages': payload['affected_packages'],
+        'references': payload['references'],
+    }
+
+
+def json_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
+    data = {k: v for k, v in payload.items() if k not in ('etag', 'version')}
+    data['created_at'] = payload['created_at'].isoformat()
+    data['updated_at'] = payload['updated_at'].isoformat()
+    return data
@@ -0,0 +1,271 @@
+import csv
+import json
+import zlib
+import logging
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from typing import List, Dict, Any, AsyncIterator, Iterator, Optional
+
+from asgiref.sync import sync_to_async
+
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Export column -> ORM lookup
+EXPORT_FIELDS = {
+    'cve_id': 'cve_id',
+    'title': 'title',
+    'description': 'description',
+    'severity': 'severity',
+    'cvss_score': 'cvss_score',
+    'cvss_vector': 'cvss_vector',
+    'source': 'source__name',
+    'source_url': 'source_url',
+    'published_date': 'published_date',
+    'affected_packages': 'affected_packages',
+    'references': 'references',
+    'tags': 'tags',
+    'created_at': 'created_at',
+    'updated_at': 'updated_at',
+}
+JSON_FIELDS = {'affected_packages', 'references', 'tags'}
+DEFAULT_FIELDS = [
+    'cve_id', 'title', 'severity', 'cvss_score', 'source',
+    'source_url', 'published_date', 'affected_packages',
+]
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrows'),
+}
+
+
+class ExportError(ValueError):
+    """Invalid export parameters"""
+
+
+def parse_fields(fields: Optional[str]) -> List[str]:
+    """Validate a comma separated field projection"""
+    if not fields:
+        return list(DEFAULT_FIELDS)
+    selected = [f.strip() for f in fields.split(',') if f.strip()]
+    unknown = [f for f in selected if f not in EXPORT_FIELDS]
+    if unknown:
+        raise ExportError(f"Unknown export fields: {', '.join(unknown)}")
+    return selected
+
+
+def build_queryset(fields: List[str], since: str = '', severity: str = '',
+                   source: str = '', ecosystem: str = ''):
+    """Filtered, projected queryset in primary key order"""
+    from ..models import Vulnerability
+
+    queryset = Vulnerability.objects.all()
+
+    if since:
+        since_value = parse_datetime(since)
+        if since_value is None:
+            since_date = parse_date(since)
+            if since_date is None:
+                raise ExportError("'since' must be an ISO-8601 date or datetime")
+            since_value = datetime.combine(since_date, datetime.min.time())
+        if timezone.is_naive(since_value):
+            since_value = timezone.make_aware(since_value, dt_timezone.utc)
+        queryset = queryset.filter(updated_at__gte=since_value)
+
+    if severity:
+        queryset = queryset.filter(severity__in=[s.strip().upper() for s in severity.split(',') if s.strip()])
+
+    if source:
+        queryset = queryset.filter(source__name__in=[s.strip() for s in source.split(',') if s.strip()])
+
+    if ecosystem:
+        # affected_packages is a JSON list of "ecosystem/name" strings
+        queryset = queryset.filter(affected_packages__contains=f'"{ecosystem.strip()}/')
+
+    return queryset.order_by('pk').values_list(*[EXPORT_FIELDS[f] for f in fields])
+
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def iter_rows(queryset, fields: List[str], chunk_size: int = 2000, decode_json: bool = False) -> Iterator[Dict[str, Any]]:
+    """Stream rows from a server-side cursor as plain dicts"""
+    json_positions = [i for i, f in enumerate(fields) if f in JSON_FIELDS] if decode_json else []
+    for row in queryset.iterator(chunk_size=chunk_size):
+        row = [_plain(v) for v in row]
+        for i in json_positions:
+            try:
+                row[i] = json.loads(row[i]) if row[i] else []
+            except ValueError:
+                pass
+        yield dict(zip(fields, row))
+
+
+class _Echo:
+    """File-like object whose write() returns what was written"""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(queryset, fields: List[str], chunk_size: int = 2000) -> Iterator[bytes]:
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields).encode('utf-8')
+    for row in iter_rows(queryset, fields, chunk_size):
+        yield writer.writerow([row[f] if row[f] is not None else '' for f in fields]).encode('utf-8')
+
+
+def iter_ndjson(queryset, fields: List[str], chunk_size: int = 2000) -> Iterator[bytes]:
+    for row in iter_rows(queryset, fields, chunk_size, decode_json=True):
+        yield (json.dumps(row, default=str) + '\n').encode('utf-8')
+
+
+class _ChunkSink:
+    """Write-only sink that hands buffered bytes back to the response generator"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _arrow_schema(pa, fields: List[str]):
+    return pa.schema([
+        (f, pa.float64() if f == 'cvss_score' else pa.string()) for f in fields
+    ])
+
+
+def _arrow_batches(pa, queryset, fields: List[str], schema, chunk_size: int):
+    """Group streamed rows into Arrow record batches of chunk_size rows"""
+    columns = {f: [] for f in fields}
+    count = 0
+    for row in iter_rows(queryset, fields, chunk_size):
+        for f in fields:
+            value = row[f]
+            columns[f].append(value if value is None or f == 'cvss_score' else str(value))
+        count += 1
+        if count >= chunk_size:
+            yield pa.record_batch([columns[f] for f in fields], schema=schema)
+            columns = {f: [] for f in fields}
+            count = 0
+    if count:
+        yield pa.record_batch([columns[f] for f in fields], schema=schema)
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet  # noqa: F401
+        import pyarrow.ipc  # noqa: F401
+        return pyarrow
+    except ImportError:
+        raise ExportError("Parquet/Arrow export requires the optional 'pyarrow' package")
+
+
+def iter_parquet(queryset, fields: List[str], chunk_size: int = 2000) -> Iterator[bytes]:
+    """Write one Parquet row group per chunk and yield the bytes as they are produced"""
+    pa = _import_pyarrow()
+    schema = _arrow_schema(pa, fields)
+    sink = _ChunkSink()
+    writer = pa.parquet.ParquetWriter(sink, schema, compression='snappy')
+    try:
+        for batch in _arrow_batches(pa, queryset, fields, schema, chunk_size):
+            writer.write_batch(batch)
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def iter_arrow(queryset, fields: List[str], chunk_size: int = 2000) -> Iterator[bytes]:
+    """Arrow IPC stream, one record batch per chunk"""
+    pa = _import_pyarrow()
+    schema = _arrow_schema(pa, fields)
+    sink = _ChunkSink()
+    writer = pa.ipc.new_stream(sink, schema)
+    try:
+        for batch in _arrow_batches(pa, queryset, fields, schema, chunk_size):
+            writer.write_batch(batch)
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def gzip_stream(chunks: Iterator[bytes], level: int = 6) -> Iterator[bytes]:
+    """Compress a byte stream into gzip format incrementally"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+EXPORT_WRITERS = {
+    'csv': iter_csv,
+    'ndjson': iter_ndjson,
+    'parquet': iter_parquet,
+    'arrow': iter_arrow,
+}
+
+
+def export_stream(export_format: str, queryset, fields: List[str],
+                  chunk_size: int = 2000, compress: bool = False) -> Iterator[bytes]:
+    """Byte stream for one export; pyarrow availability is checked up front"""
+    if export_format not in EXPORT_WRITERS:
+        raise ExportError(f"Unsupported export format '{export_format}'")
+    if export_format in ('parquet', 'arrow'):
+        _import_pyarrow()
+    stream = EXPORT_WRITERS[export_format](queryset, fields, chunk_size)
+    return gzip_stream(stream) if compress else stream
+
+
+async def aiter_stream(chunks: Iterator[bytes]) -> AsyncIterator[bytes]:
+    """Serve an export stream from an async view without buffering it.
+
+    Under ASGI Django reads a sync iterator into memory before sending it.
+    Here each chunk (one fetch from the server-side cursor, encoded) is
+    produced on the request's sync thread, so the cursor stays on one
+    connection and the event loop is free while the database works.
+    """
+    chunks = iter(chunks)
+    next_chunk = sync_to_async(next)
+    while True:
+        chunk = await next_chunk(chunks, None)
+        if chunk is None:
+            return
+        yield chunk
@@ -0,0 +1,16 @@
+from django.db.models import F
+
+
+def get_generation(name: str) -> int:
+    """Current generation of a table-derived index, shared by every process through the database"""
+    from ..models import IndexGeneration
+
+    return IndexGeneration.objects.filter(name=name).values_list('generation', flat=True).first() or 0
+
+
+def bump_generation(name: str):
+    """Tell every process to drop what it loaded for the index"""
+    from ..models import IndexGeneration
+
+    IndexGeneration.objects.get_or_create(name=name)
+    IndexGeneration.objects.filter(name=name).update(generation=F('generation') + 1)
@@ -0,0 +1,185 @@
+import json
+import math
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+NEW = 'new'              # Definitely not stored yet
+KNOWN = 'known'          # Stored, content fingerprint unknown or different
+UNCHANGED = 'unchanged'  # Stored with exactly this content
+UNKNOWN = 'unknown'      # Filter can't tell, ask the database
+
+
+def get_filter_settings() -> Dict[str, Any]:
+    config = {
+        'CAPACITY': 1000000,
+        'ERROR_RATE': 0.01,
+        'EXACT_SIZE': 50000,
+    }
+    config.update(getattr(settings, 'KNOWN_ID_FILTER', {}))
+    return config
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter using double hashing over a blake2b digest"""
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        self.capacity = max(1, capacity)
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, key: str) -> bool:
+        """Set the key's bits; False when they were all set already (nothing counted)"""
+        added = False
+        for position in self._positions(key):
+            byte, bit = position >> 3, 1 << (position & 7)
+            if not self.bits[byte] & bit:
+                self.bits[byte] |= bit
+                added = True
+        self.count += added
+        return added
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+
+def content_fingerprint(title: Any, description: Any, severity: Any, cvss_score: Any,
+                        published_date: Any, affected_packages: Any) -> str:
+    """Hash of the stored projection of a vulnerability.
+
+    Accepts both normalized scraper values and values read back from the
+    table (JSON text, Decimal scores) and maps them to the same digest.
+    """
+    if isinstance(affected_packages, str):
+        try:
+            affected_packages = json.loads(affected_packages)
+        except ValueError:
+            pass
+    parts = [
+        title or '',
+        description or '',
+        (severity or '').upper(),
+        '' if cvss_score in (None, '') else str(float(cvss_score)),
+        str(published_date or ''),
+        json.dumps(affected_packages or [], sort_keys=True),
+    ]
+    return hashlib.blake2b('\x1f'.join(parts).encode('utf-8'), digest_size=16).hexdigest()
+
+
+class KnownIdFilter:
+    """Process-local membership test for stored CVE IDs and titles.
+
+    A Bloom filter over every stored ``cve_id`` and title answers "definitely
+    new" without a query. An exact LRU of recently seen IDs and their content
+    fingerprints answers "stored, and unchanged or not". Anything else falls
+    through to the database. Other processes can insert rows this filter has
+    not seen, so callers must still handle the unique constraint on insert,
+    and can delete rows it still lists, so an LRU answer is only a hint to
+    confirm against the table.
+    """
+
+    HEADROOM = 2  # Bloom capacity as a multiple of the keys loaded by warm()
+
+    def __init__(self, capacity: int = 1000000, error_rate: float = 0.01, exact_size: int = 50000):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.exact_size = exact_size
+        self.lock = threading.Lock()
+        self.bloom = BloomFilter(capacity, error_rate)
+        self.exact: OrderedDict = OrderedDict()
+        self.warmed = False
+
+    def warm(self, chunk_size: int = 5000):
+        """Load every stored ID and title, and fingerprints for the newest rows"""
+        from ..models import Vulnerability
+
+        # One key per ID plus one per title
+        total = Vulnerability.objects.count()
+        bloom = BloomFilter(max(self.capacity, total * 2 * self.HEADROOM), self.error_rate)
+        for cve_id, title in Vulnerability.objects.values_list('cve_id', 'title').order_by().iterator(chunk_size=chunk_size):
+            bloom.add(f"id:{cve_id}")
+            if title:
+                bloom.add(f"title:{title}")
+
+        exact = OrderedDict()
+        newest = Vulnerability.objects.order_by('-id').values_list(
+            'cve_id', 'title', 'description', 'severity', 'cvss_score', 'published_date', 'affected_packages'
+        )[:self.exact_size]
+        for cve_id, *content in newest.iterator(chunk_size=chunk_size):
+            exact[cve_id] = content_fingerprint(*content)
+        exact = OrderedDict(reversed(exact.items()))
+
+        with self.lock:
+            self.bloom = bloom
+            self.exact = exact
+            self.warmed = True
+        logger.info(f"Known-ID filter warmed with {total} vulnerabilities ({bloom.count} keys, capacity {bloom.capacity})")
+
+    def classify(self, cve_id: str, title: str = '', fingerprint: Optional[str] = None) -> str:
+        with self.lock:
+            stored = self.exact.get(cve_id)
+            if stored is not None:
+                self.exact.move_to_end(cve_id)
+                return UNCHANGED if fingerprint is not None and stored == fingerprint else KNOWN
+            if f"id:{cve_id}" in self.bloom:
+                return UNKNOWN
+            if title and f"title:{title}" in self.bloom:
+                return UNKNOWN
+            return NEW
+
+    def remember(self, cve_id: str, title: str = '', fingerprint: Optional[str] = None):
+        with self.lock:
+            self.bloom.add(f"id:{cve_id}")
+            if title:
+                self.bloom.add(f"title:{title}")
+            self.exact[cve_id] = fingerprint or ''
+            self.exact.move_to_end(cve_id)
+            while len(self.exact) > self.exact_size:
+                self.exact.popitem(last=False)
+            if self.bloom.count > self.bloom.capacity:
+                # Past its design load the false positive rate climbs; rebuild larger on next use
+                self.warmed = False
+
+    def forget(self, cve_id: str):
+        """Drop an ID from the exact LRU, e.g. once the table shows it was deleted"""
+        with self.lock:
+            self.exact.pop(cve_id, None)
+
+
+_filter: Optional[KnownIdFilter] = None
+_filter_lock = threading.Lock()
+
+
+def get_filter() -> KnownIdFilter:
+    """Shared filter, warmed from the table on first use"""
+    global _filter
+    if _filter is None or not _filter.warmed:
+        with _filter_lock:
+            if _filter is None:
+                config = get_filter_settings()
+                _filter = KnownIdFilter(config['CAPACITY'], config['ERROR_RATE'], config['EXACT_SIZE'])
+            if not _filter.warmed:
+                _filter.warm()
+    return _filter
+
+
+def reset_filter():
+    """Forget everything (after a purge); the next use re-warms from the table"""
+    global _filter
+    with _filter_lock:
+        _filter = None
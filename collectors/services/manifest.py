@@ -0,0 +1,166 @@
+import json
+import re
+from typing import List, Optional, Tuple
+from urllib.parse import unquote
+
+# (ecosystem, name, version); version is '' when the manifest doesn't pin one
+Dependency = Tuple[str, str, str]
+
+REQUIREMENT_RE = re.compile(
+    r'^(?P<name>[A-Za-z0-9][A-Za-z0-9._-]*)\s*(?:\[[^\]]*\])?\s*'
+    r'(?:(?P<op>===|==|>=|<=|~=|!=|>|<)\s*(?P<version>[^\s,;#]+))?'
+)
+
+# purl type -> OSV ecosystem
+PURL_ECOSYSTEMS = {
+    'pypi': 'PyPI',
+    'npm': 'npm',
+    'golang': 'Go',
+    'maven': 'Maven',
+    'cargo': 'crates.io',
+    'gem': 'RubyGems',
+    'nuget': 'NuGet',
+    'composer': 'Packagist',
+    'hex': 'Hex',
+    'pub': 'Pub',
+}
+
+
+class ManifestError(ValueError):
+    """The manifest could not be parsed"""
+
+
+def parse_requirements(text: str) -> List[Dependency]:
+    dependencies = []
+    for line in text.splitlines():
+        line = line.split(' #', 1)[0].strip()
+        if not line or line.startswith(('#', '-', 'git+', 'http://', 'https://')):
+            continue
+        line = line.split(';', 1)[0].strip()
+        match = REQUIREMENT_RE.match(line)
+        if not match:
+            continue
+        pinned = match.group('op') in ('==', '===') and '*' not in (match.group('version') or '')
+        dependencies.append(('PyPI', match.group('name'), match.group('version') if pinned else ''))
+    return dependencies
+
+
+def _package_lock_name(path: str) -> str:
+    return path.rsplit('node_modules/', 1)[-1]
+
+
+def parse_package_lock(text: str) -> List[Dependency]:
+    try:
+        data = json.loads(text)
+    except ValueError as e:
+        raise ManifestError(f"Invalid package-lock.json: {e}")
+
+    dependencies = set()
+    # lockfileVersion 2/3
+    for path, info in (data.get('packages') or {}).items():
+        if path and info.get('version') and not info.get('link'):
+            dependencies.add(('npm', info.get('name') or _package_lock_name(path), info['version']))
+
+    # lockfileVersion 1
+    def walk(tree):
+        for name, info in (tree or {}).items():
+            if info.get('version'):
+                dependencies.add(('npm', name, info['version']))
+            walk(info.get('dependencies'))
+
+    if not dependencies:
+        walk(data.get('dependencies'))
+    return sorted(dependencies)
+
+
+def parse_go_sum(text: str) -> List[Dependency]:
+    dependencies = set()
+    for line in text.splitlines():
+        parts = line.split()
+        if len(parts) >= 2:
+            version = parts[1]
+            if version.endswith('/go.mod'):
+                version = version[:-len('/go.mod')]
+            dependencies.add(('Go', parts[0], version))
+    return sorted(dependencies)
+
+
+def parse_purl(purl: str) -> Optional[Dependency]:
+    """pkg:type/namespace/name@version -> (ecosystem, name, version)"""
+    if not purl.startswith('pkg:'):
+        return None
+    purl = purl[4:].split('#', 1)[0].split('?', 1)[0]
+    purl_type, _, rest = purl.partition('/')
+    ecosystem = PURL_ECOSYSTEMS.get(purl_type.lower())
+    if not ecosystem or not rest:
+        return None
+    path, _, version = rest.rpartition('@') if '@' in rest.lstrip('@') else (rest, '', '')
+    segments = [unquote(s) for s in path.split('/') if s]
+    if not segments:
+        return None
+    if ecosystem == 'Maven' and len(segments) >= 2:
+        name = f"{segments[-2]}:{segments[-1]}"
+    elif ecosystem in ('npm', 'Go', 'Packagist'):
+        name = '/'.join(segments)
+    else:
+        name = segments[-1]
+    return (ecosystem, name, unquote(version))
+
+
+def parse_cyclonedx(text: str) -> List[Dependency]:
+    try:
+        data = json.loads(text)
+    except ValueError as e:
+        raise ManifestError(f"Invalid CycloneDX JSON: {e}")
+
+    dependencies = set()
+
+    def walk(components):
+        for component in components or []:
+            dependency = parse_purl(component.get('purl', ''))
+            if dependency:
+                dependencies.add(dependency)
+            walk(component.get('components'))
+
+    walk(data.get('components'))
+    return sorted(dependencies)
+
+
+PARSERS = {
+    'requirements': parse_requirements,
+    'package-lock': parse_package_lock,
+    'go.sum': parse_go_sum,
+    'cyclonedx': parse_cyclonedx,
+}
+
+
+def detect_format(filename: str, text: str) -> str:
+    filename = (filename or '').lower()
+    if filename.endswith('package-lock.json'):
+        return 'package-lock'
+    if filename.endswith('go.sum'):
+        return 'go.sum'
+    if filename.endswith(('.txt', '.in')) or 'requirements' in filename:
+        return 'requirements'
+
+    stripped = text.lstrip()
+    if stripped.startswith('{'):
+        try:
+            data = json.loads(stripped)
+        except ValueError:
+            raise ManifestError("Unrecognized JSON manifest")
+        if data.get('bomFormat') == 'CycloneDX':
+            return 'cyclonedx'
+        if 'lockfileVersion' in data:
+            return 'package-lock'
+        raise ManifestError("Unrecognized JSON manifest")
+    if re.search(r'^\S+ v\S+ h1:', stripped, re.MULTILINE):
+        return 'go.sum'
+    return 'requirements'
+
+
+def parse_manifest(text: str, filename: str = '', manifest_format: str = '') -> Tuple[str, List[Dependency]]:
+    manifest_format = manifest_format or detect_format(filename, text)
+    if manifest_format not in PARSERS:
+        raise ManifestError(f"Unsupported manifest format '{manifest_format}'")
+    return manifest_format, PARSERS[manifest_format](text)
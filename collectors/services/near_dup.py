@@ -0,0 +1,316 @@
+import re
+import random
+import struct
+import threading
+import zlib
+import logging
+from collections import defaultdict
+from typing import List, Dict, Any, Iterable, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.db import transaction
+
+from .planner import CVE_RE, GHSA_RE, OSV_ID_RE
+
+logger = logging.getLogger(__name__)
+
+PRIME = (1 << 31) - 1  # Hash values stay below 2**31 and pack as uint32
+SEED = 20261019        # Fixed so stored signatures stay comparable across processes and restarts
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+SNYK_ID_RE = re.compile(r'^SNYK-[A-Z]+(?:-[A-Z0-9]+)*-\d+$')  # SNYK-PYTHON-DJANGO-1066259
+
+
+def get_near_dup_settings() -> Dict[str, Any]:
+    config = {
+        'ENABLED': True,
+        'NUM_PERM': 64,       # Signature length; must equal BANDS * ROWS
+        'BANDS': 16,
+        'ROWS': 4,            # Items sharing any band of 4 values become candidates (~50% Jaccard)
+        'THRESHOLD': 0.6,     # Estimated Jaccard a candidate needs to be linked
+        'SHINGLE_SIZE': 3,    # Words per shingle
+        'MAX_TEXT': 4000,     # Characters of title + description shingled
+    }
+    config.update(getattr(settings, 'NEAR_DUPLICATES', {}))
+    return config
+
+
+def is_candidate(cve_id: str) -> bool:
+    """Only items without a stable advisory ID (news, exploits, scraped pages) go through MinHash.
+
+    CVE, GHSA, OSV-style (PYSEC-, RUSTSEC-, GO-...) and Snyk IDs name one
+    advisory each and are deduplicated by ID; advisories written from the
+    same template must not be merged. The IDs scrapers make up for
+    everything else (NEWS-123456, SNYK-123456, '<source>-<hash>') are not
+    stable and match none of these.
+    """
+    cve_id = cve_id or ''
+    return not (CVE_RE.match(cve_id) or GHSA_RE.match(cve_id) or OSV_ID_RE.match(cve_id) or SNYK_ID_RE.match(cve_id))
+
+
+class MinHasher:
+    """MinHash signatures over word shingles.
+
+    Each shingle is hashed once with crc32; the NUM_PERM permutations are
+    the universal hashes (a * x + b) mod 2**31 - 1 with coefficients drawn
+    from a fixed seed. The fraction of equal positions in two signatures
+    estimates the Jaccard similarity of their shingle sets.
+    """
+
+    def __init__(self, num_perm: int = 64, shingle_size: int = 3, max_text: int = 4000):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.max_text = max_text
+        rng = random.Random(SEED)
+        self.permutations = [(rng.randrange(1, PRIME), rng.randrange(0, PRIME)) for _ in range(num_perm)]
+        self.format = f"<{num_perm}I"
+
+    def shingles(self, text: str) -> set:
+        tokens = TOKEN_RE.findall(text[:self.max_text].lower())
+        size = self.shingle_size
+        if len(tokens) <= size:
+            return {' '.join(tokens)} if tokens else set()
+        return {' '.join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+    def signature(self, title: str, description: str = '') -> Optional[Tuple[int, ...]]:
+        shingles = self.shingles(f"{title} {description}")
+        if not shingles:
+            return None
+        hashes = [zlib.crc32(shingle.encode('utf-8')) for shingle in shingles]
+        return tuple(min([(a * x + b) % PRIME for x in hashes]) for a, b in self.permutations)
+
+    def pack(self, signature: Sequence[int]) -> bytes:
+        return struct.pack(self.format, *signature)
+
+    def unpack(self, data: bytes) -> Optional[Tuple[int, ...]]:
+        data = bytes(data)
+        if len(data) != struct.calcsize(self.format):
+            return None  # Stored with a different NUM_PERM
+        return struct.unpack(self.format, data)
+
+
+def similarity(first: Sequence[int], second: Sequence[int]) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    return sum(1 for x, y in zip(first, second) if x == y) / len(first)
+
+
+class LshIndex:
+    """Banded LSH over MinHash signatures.
+
+    A signature is cut into BANDS slices of ROWS values and filed under
+    each slice. A query only compares against items that share at least
+    one slice, so lookups touch a handful of buckets instead of every
+    stored signature.
+    """
+
+    def __init__(self, bands: int = 16, rows: int = 4):
+        self.bands = bands
+        self.rows = rows
+        self.buckets: Dict[Tuple[int, Tuple[int, ...]], List[Any]] = defaultdict(list)
+        self.signatures: Dict[Any, Tuple[int, ...]] = {}
+
+    def _keys(self, signature: Sequence[int]):
+        rows = self.rows
+        for band in range(self.bands):
+            yield band, tuple(signature[band * rows:(band + 1) * rows])
+
+    def add(self, key: Any, signature: Sequence[int]):
+        signature = tuple(signature)
+        self.signatures[key] = signature
+        for bucket in self._keys(signature):
+            self.buckets[bucket].append(key)
+
+    def query(self, signature: Sequence[int], threshold: float) -> Optional[Tuple[Any, float]]:
+        """Most similar stored key at or above threshold, with its similarity"""
+        seen = set()
+        best = None
+        for bucket in self._keys(signature):
+            for key in self.buckets.get(bucket, ()):
+                if key in seen:
+                    continue
+                seen.add(key)
+                score = similarity(signature, self.signatures[key])
+                if score >= threshold and (best is None or score > best[1]):
+                    best = (key, score)
+        return best
+
+    def __len__(self) -> int:
+        return len(self.signatures)
+
+
+class NearDuplicateIndex:
+    """Process-local LSH over the stored signatures, mapping each to its canonical row.
+
+    Warmed from the table on first use and kept current by register() as
+    this process inserts rows. Rows inserted by other processes are picked
+    up at the next warm; missing one only means a duplicate isn't linked.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.hasher = MinHasher(config['NUM_PERM'], config['SHINGLE_SIZE'], config['MAX_TEXT'])
+        self.bands = config['BANDS']
+        self.rows = config['ROWS']
+        self.threshold = config['THRESHOLD']
+        self.lsh = LshIndex(self.bands, self.rows)
+        self.canonical: Dict[int, int] = {}  # Row id -> canonical row id
+        self.lock = threading.Lock()
+        self.warmed = False
+
+    def warm(self, chunk_size: int = 5000):
+        from ..models import Vulnerability
+
+        lsh = LshIndex(self.bands, self.rows)
+        canonical = {}
+        rows = Vulnerability.objects.filter(minhash__isnull=False).values_list('id', 'cve_id', 'minhash', 'canonical_id')
+        for vuln_id, cve_id, minhash, canonical_id in rows.order_by().iterator(chunk_size=chunk_size):
+            if not is_candidate(cve_id):
+                continue
+            signature = self.hasher.unpack(minhash)
+            if signature is not None:
+                lsh.add(vuln_id, signature)
+                canonical[vuln_id] = canonical_id or vuln_id
+        with self.lock:
+            self.lsh = lsh
+            self.canonical = canonical
+            self.warmed = True
+        logger.info(f"Near-duplicate index warmed with {len(lsh)} signatures")
+
+    def assign(self, vulns: Iterable[Any]) -> List[Tuple[Any, Any]]:
+        """Sign the unsaved CVE-less rows and point duplicates of stored rows at their canonical.
+
+        Returns (row, earlier row) pairs for duplicates within this batch;
+        those can only be linked once the earlier row has a primary key.
+        """
+        batch = LshIndex(self.bands, self.rows)
+        pending = []
+        links = []
+        for vuln in vulns:
+            if not is_candidate(vuln.cve_id):
+                continue
+            signature = self.hasher.signature(vuln.title, vuln.description)
+            if signature is None:
+                continue
+            vuln.minhash = self.hasher.pack(signature)
+            with self.lock:
+                match = self.lsh.query(signature, self.threshold)
+                if match:
+                    vuln.canonical_id = self.canonical.get(match[0], match[0])
+                    continue
+            match = batch.query(signature, self.threshold)
+            if match:
+                links.append((vuln, pending[match[0]]))
+                continue
+            batch.add(len(pending), signature)
+            pending.append(vuln)
+        return links
+
+    def resolve(self, links: List[Tuple[Any, Any]]) -> List[Any]:
+        """Point in-batch duplicates at the earlier row once inserted; returns the rows changed"""
+        linked = []
+        for vuln, earlier in links:
+            if vuln.pk is not None and earlier.pk is not None:
+                vuln.canonical_id = earlier.canonical_id or earlier.pk
+                linked.append(vuln)
+        return linked
+
+    def add(self, vulns: Iterable[Any]):
+        """Index stored rows; only call once they are committed"""
+        with self.lock:
+            for vuln in vulns:
+                if vuln.pk is None or not vuln.minhash:
+                    continue
+                self.lsh.add(vuln.pk, self.hasher.unpack(vuln.minhash))
+                self.canonical[vuln.pk] = vuln.canonical_id or vuln.pk
+
+
+_index: Optional[NearDuplicateIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> NearDuplicateIndex:
+    """Shared index, warmed from the table on first use"""
+    global _index
+    if _index is None or not _index.warmed:
+        with _index_lock:
+            if _index is None:
+                _index = NearDuplicateIndex(get_near_dup_settings())
+            if not _index.warmed:
+                _index.warm()
+    return _index
+
+
+def reset_index():
+    """Forget everything (after a purge); the next use re-warms from the table"""
+    global _index
+    with _index_lock:
+        _index = None
+
+
+def enabled() -> bool:
+    return bool(get_near_dup_settings()['ENABLED'])
+
+
+def assign(vulns: List[Any]) -> List[Tuple[Any, Any]]:
+    """Before insert: sign CVE-less rows and link duplicates of stored rows (see NearDuplicateIndex.assign)"""
+    if not enabled():
+        return []
+    return get_index().assign(vulns)
+
+
+def register(inserted: List[Any], links: List[Tuple[Any, Any]]):
+    """After insert: save links to rows of the same batch, and index the new rows on commit"""
+    from ..models import Vulnerability
+
+    if not enabled():
+        return
+    index = get_index()
+    linked = index.resolve(links)
+    if linked:
+        Vulnerability.objects.bulk_update(linked, ['canonical'], batch_size=500)
+    # A rolled back batch must not leave ids in the index that later rows would point at
+    transaction.on_commit(lambda: index.add(inserted))
+
+
+def unlink_advisories(chunk_size: int = 2000) -> int:
+    """Undo signatures and links stored for rows with a stable advisory ID.
+
+    Rows that were linked to such a row lose their signature too, so the
+    next backfill signs them again and links them among real candidates.
+    Returns the number of advisory rows unlinked.
+    """
+    from ..models import Vulnerability
+
+    signed = Vulnerability.objects.filter(minhash__isnull=False).values_list('id', 'cve_id').order_by()
+    advisories = [vuln_id for vuln_id, cve_id in signed.iterator(chunk_size=chunk_size) if not is_candidate(cve_id)]
+    for start in range(0, len(advisories), chunk_size):
+        chunk = advisories[start:start + chunk_size]
+        with transaction.atomic():
+            Vulnerability.objects.filter(canonical_id__in=chunk).update(minhash=None, canonical=None)
+            Vulnerability.objects.filter(id__in=chunk).update(minhash=None, canonical=None)
+    if advisories:
+        reset_index()
+    return len(advisories)
+
+
+def backfill(chunk_size: int = 2000) -> Dict[str, int]:
+    """Sign stored CVE-less rows that have no signature yet, oldest first, and link their duplicates"""
+    from ..models import Vulnerability
+
+    unlinked = unlink_advisories(chunk_size)
+    index = get_index()
+    counts = {'signed': 0, 'linked': 0, 'unlinked': unlinked}
+    last_id = 0
+    while True:
+        rows = list(
+            Vulnerability.objects.filter(minhash__isnull=True, id__gt=last_id)
+            .only('id', 'cve_id', 'title', 'description', 'canonical_id')
+            .order_by('id')[:chunk_size]
+        )
+        if not rows:
+            return counts
+        last_id = rows[-1].id
+        index.resolve(index.assign(rows))
+        signed = [row for row in rows if row.minhash]
+        Vulnerability.objects.bulk_update(signed, ['minhash', 'canonical'], batch_size=500)
+        index.add(signed)
+        counts['signed'] += len(signed)
+        counts['linked'] += sum(1 for row in signed if row.canonical_id)
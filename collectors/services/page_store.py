@@ -0,0 +1,148 @@
+import json
+import zlib
+import hashlib
+import logging
+from datetime import timedelta
+from typing import Dict, Any, Callable, Optional
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models import Sum
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Extractions kept per page; query-dependent extractors would otherwise grow without bound
+MAX_EXTRACTIONS = 16
+
+
+def get_page_store_settings() -> Dict[str, Any]:
+    config = {
+        'FRESHNESS': 3600,            # Seconds a stored page is used without refetching
+        'MAX_BYTES': 100 * 1024 * 1024,  # Compressed bytes kept before LRU eviction
+        'TOUCH_INTERVAL': 60,         # Seconds between last_access updates of one page
+    }
+    config.update(getattr(settings, 'PAGE_STORE', {}))
+    return config
+
+
+def url_hash(url: str) -> str:
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+
+def content_hash(html: str) -> str:
+    return hashlib.sha256(html.encode('utf-8', 'replace')).hexdigest()
+
+
+def load_body(page) -> str:
+    return zlib.decompress(bytes(page.body)).decode('utf-8')
+
+
+def _store_extraction(page, key: str, value: Any):
+    extracted = json.loads(page.extracted or '{}')
+    extracted.pop(key, None)
+    extracted[key] = value
+    while len(extracted) > MAX_EXTRACTIONS:
+        extracted.pop(next(iter(extracted)))
+    page.extracted = json.dumps(extracted)
+
+
+def fetch(url: str, fetcher: Callable[[str], Optional[str]], extract: Callable[[str], Any], key: str = '') -> Any:
+    """Extracted fields for url, fetching and parsing only when needed.
+
+    - stored and younger than FRESHNESS: no fetch; the stored extraction is
+      returned, or the stored body is parsed if this key hasn't run yet
+    - refetched with the same content hash: no parse if this key already ran
+    - new or changed content: parsed, compressed and stored, then the
+      least recently used pages are evicted past MAX_BYTES
+
+    If the fetch fails, a stale extraction is better than nothing and is
+    returned when present.
+    """
+    from ..models import PageCache
+
+    config = get_page_store_settings()
+    now = timezone.now()
+    page = PageCache.objects.filter(url_hash=url_hash(url)).first()
+
+    if page is not None:
+        extracted = json.loads(page.extracted or '{}')
+        fresh = now - page.fetched_at < timedelta(seconds=config['FRESHNESS'])
+        if fresh:
+            if key in extracted:
+                value = extracted[key]
+            else:
+                value = extract(load_body(page))
+                _store_extraction(page, key, value)
+                page.save(update_fields=['extracted'])
+            _touch(page, now, config)
+            return value
+
+    html = fetcher(url)
+    if html is None:
+        if page is not None:
+            return json.loads(page.extracted or '{}').get(key)
+        return None
+
+    digest = content_hash(html)
+    if page is not None and page.content_hash == digest:
+        # Unchanged since the last fetch
+        page.fetched_at = now
+        page.last_access = now
+        extracted = json.loads(page.extracted or '{}')
+        if key in extracted:
+            value = extracted[key]
+            page.save(update_fields=['fetched_at', 'last_access'])
+        else:
+            value = extract(html)
+            _store_extraction(page, key, value)
+            page.save(update_fields=['fetched_at', 'last_access', 'extracted'])
+        return value
+
+    value = extract(html)
+    body = zlib.compress(html.encode('utf-8'), 6)
+    if page is None:
+        page = PageCache(url_hash=url_hash(url), url=url)
+    page.content_hash = digest
+    page.body = body
+    page.size = len(body)
+    page.extracted = '{}'
+    _store_extraction(page, key, value)
+    page.fetched_at = now
+    page.last_access = now
+    try:
+        page.save()
+    except IntegrityError:
+        # Another worker stored the same URL first; its copy is as good as ours
+        pass
+    evict(config['MAX_BYTES'])
+    return value
+
+
+def _touch(page, now, config):
+    if now - page.last_access >= timedelta(seconds=config['TOUCH_INTERVAL']):
+        type(page).objects.filter(pk=page.pk).update(last_access=now)
+
+
+def evict(max_bytes: Optional[int] = None, batch_size: int = 100) -> int:
+    """Delete least recently used pages until the store fits in max_bytes"""
+    from ..models import PageCache
+
+    if max_bytes is None:
+        max_bytes = get_page_store_settings()['MAX_BYTES']
+    total = PageCache.objects.aggregate(total=Sum('size'))['total'] or 0
+    deleted = 0
+    while total > max_bytes:
+        oldest = list(PageCache.objects.order_by('last_access').values_list('pk', 'size')[:batch_size])
+        if not oldest:
+            break
+        victims = []
+        for pk, size in oldest:
+            victims.append(pk)
+            total -= size
+            if total <= max_bytes:
+                break
+        deleted += PageCache.objects.filter(pk__in=victims).delete()[0]
+    if deleted:
+        logger.info(f"Evicted {deleted} pages from the page store")
+    return deleted
@@ -0,0 +1,314 @@
+import asyncio
+import threading
+import time
+import logging
+from collections import Counter, deque
+from dataclasses import dataclass
+from typing import List, Dict, Any, Iterator, AsyncIterator, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from . import writer, stats, recent
+from .records import VulnRecord
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()  # Pushed by a producer when its source is exhausted
+
+
+def get_pipeline_settings() -> Dict[str, Any]:
+    config = {
+        'BATCH_SIZE': 200,        # Records persisted and emitted together
+        'QUEUE_SIZE': 1000,       # Normalized records buffered before producers block
+        'MAX_PER_SOURCE': None,   # Optional cap on records taken from one source
+        'MAX_PER_QUERY': None,    # Optional cap on unique records per harvest
+        'DEADLINE': 25,           # Seconds spent waiting on sources before the rest are abandoned
+    }
+    config.update(getattr(settings, 'HARVEST_PIPELINE', {}))
+    return config
+
+
+def _smallest(*caps: Optional[int]) -> Optional[int]:
+    """Tightest of the given caps; None means uncapped"""
+    caps = [cap for cap in caps if cap]
+    return min(caps) if caps else None
+
+
+@dataclass
+class HarvestBatch:
+    records: List[Tuple[str, VulnRecord]]  # (source name, record), unique within the harvest
+    saved: writer.SaveResult
+
+
+class HarvestPipeline:
+    """Scrapers -> normalize -> dedupe -> batch persist -> emit, with backpressure.
+
+    Each source runs on a pool thread and pushes normalized records into a
+    buffer of QUEUE_SIZE slots; when it is full the producer blocks, so a
+    fast source can't run ahead of persistence. The consumer drops records
+    whose ID it has already seen (their affected ranges and CPE criteria
+    are still stored, with the next batch), applies the caps and yields HarvestBatch
+    objects of BATCH_SIZE records once they are stored. Peak memory is the
+    buffer plus one batch (and the seen IDs), not the whole result set.
+    A source that runs past its entry in timeouts is cut off the same way
+    the deadline cuts off the rest, and per-source latency, outcome and
+    yield of distinct records are kept for scheduling.
+
+    Iterate it from sync code, or with ``async for`` from async views.
+    """
+
+    def __init__(self, aggregator, query: str, update_existing: bool = False,
+                 batch_size: Optional[int] = None, queue_size: Optional[int] = None,
+                 max_per_source: Optional[int] = None, max_per_query: Optional[int] = None,
+                 deadline: Optional[float] = None, sources: Optional[List[str]] = None,
+                 seen: Optional[set] = None, timeouts: Optional[Dict[str, float]] = None):
+        config = get_pipeline_settings()
+        self.aggregator = aggregator
+        self.query = query
+        # Only these sources are fetched (all of the aggregator's by default), started in this order
+        self.sources = [s for s in (aggregator.scrapers if sources is None else sources) if s in aggregator.scrapers]
+        self.timeouts = timeouts or {}   # Per-source seconds from the start, within the overall deadline
+        self.update_existing = update_existing
+        self.batch_size = batch_size or config['BATCH_SIZE']
+        self.max_per_source = _smallest(max_per_source, config['MAX_PER_SOURCE'])
+        self.max_per_query = _smallest(max_per_query, config['MAX_PER_QUERY'])
+        self.deadline = deadline or config['DEADLINE']
+
+        self.found: Counter = Counter()  # Normalized records received per source
+        self.raw: Counter = Counter()    # Raw items fetched per source
+        self.saved_count = 0
+        self.truncated = False           # A cap or the deadline cut the harvest short
+        self.unfinished: List[str] = []  # Sources still running at the deadline
+        self.completed: set = set()      # Sources that returned everything without an error
+        self.failed: set = set()         # Sources that raised
+        self.timed_out: set = set()      # Sources cut off by their own timeout or the deadline
+        self.latency: Dict[str, float] = {}  # Seconds from the start until each source finished or was cut off
+
+        self._items: deque = deque()
+        self._slots = threading.Semaphore(queue_size or config['QUEUE_SIZE'])
+        self._stop = threading.Event()
+        self._notify = None
+        self._seen = set(seen or ())     # IDs already answered elsewhere (e.g. from the database)
+        self._batch: List[Tuple[str, VulnRecord]] = []
+        self._extra: List[Tuple[str, VulnRecord]] = []  # Repeated IDs that carry ranges or CPE criteria
+        self._running: set = set()
+        self._waited = 0.0
+        self._started = 0.0
+        self._delivered: Dict[str, Any] = {}  # ID -> the source that returned it, or a set of several
+
+    @property
+    def total_found(self) -> int:
+        return sum(self.found.values())
+
+    def results_by_source(self) -> Dict[str, int]:
+        return {source: count for source, count in self.found.items() if count}
+
+    @property
+    def seen(self) -> set:
+        """IDs answered so far, from the database or a source"""
+        return set(self._seen)
+
+    def yield_by_source(self, shared: Optional[set] = None) -> Dict[str, float]:
+        """Distinct records per source; an ID returned by k sources counts 1/k to each.
+
+        IDs in shared were also answered outside this pipeline (the search
+        a background refresh follows) and count as returned by one more
+        source.
+        """
+        shared = shared or ()
+        credit: Counter = Counter()
+        for cve_id, delivered in self._delivered.items():
+            others = cve_id in shared
+            if delivered.__class__ is str:
+                credit[delivered] += 1 / (1 + others)
+            else:
+                for source in delivered:
+                    credit[source] += 1 / (len(delivered) + others)
+        return dict(credit)
+
+    # Producers
+
+    def _start(self, notify):
+        from .scrapper import get_io_executor
+
+        self._notify = notify
+        self._running = set(self.sources)
+        self._started = time.monotonic()
+        executor = get_io_executor()
+        for source in self.sources:
+            executor.submit(self._produce, source)
+
+    def _expired(self, source: str) -> bool:
+        timeout = self.timeouts.get(source)
+        return timeout is not None and time.monotonic() - self._started >= timeout
+
+    def _push(self, item):
+        self._items.append(item)
+        try:
+            self._notify()
+        except RuntimeError:
+            # The async consumer's loop is gone; nobody is waiting any more
+            pass
+
+    def _produce(self, source: str):
+        taken = 0
+        pages = self.aggregator.iter_source(source, self.query)
+        try:
+            for page_size, records in pages:
+                self.raw[source] += page_size
+                for record in records:
+                    while not self._slots.acquire(timeout=0.5):
+                        if self._stop.is_set() or source in self.timed_out:
+                            return
+                    if self._stop.is_set() or source in self.timed_out:
+                        self._slots.release()
+                        return
+                    self._push((source, record))
+                    taken += 1
+                    if self.max_per_source and taken >= self.max_per_source:
+                        self.truncated = True
+                        return
+                if self._expired(source):
+                    self.timed_out.add(source)
+                    return
+            if source not in self.timed_out:
+                self.completed.add(source)
+        except Exception as e:
+            logger.error(f"Error searching {source}: {e}")
+            self.failed.add(source)
+        finally:
+            self.latency.setdefault(source, time.monotonic() - self._started)
+            # Stops further page fetches when we return early
+            pages.close()
+            self._push((source, _DONE))
+
+    # Consumer
+
+    def _remaining(self) -> float:
+        # Only time spent waiting on sources counts; time blocked on persistence doesn't
+        return self.deadline - self._waited
+
+    def _wait_time(self) -> float:
+        """How long to wait for records before checking the deadline and source timeouts again"""
+        wait = min(self._remaining(), 1.0)
+        elapsed = time.monotonic() - self._started
+        for source in self._running:
+            if source in self.timeouts:
+                wait = min(wait, self.timeouts[source] - elapsed)
+        return max(0.01, wait)
+
+    def _drain(self) -> Optional[List[Tuple[str, VulnRecord]]]:
+        """Move buffered records into the current batch; return the batch once full or finished"""
+        while self._items:
+            source, record = self._items.popleft()
+            if record is _DONE:
+                self._running.discard(source)
+                continue
+            self._slots.release()
+            self.found[source] += 1
+            delivered = self._delivered.setdefault(record.cve_id, source)
+            if delivered != source:
+                if delivered.__class__ is str:
+                    self._delivered[record.cve_id] = delivered = {delivered}
+                delivered.add(source)
+            if self._stop.is_set():
+                continue
+            if record.cve_id in self._seen:
+                if record.affected_ranges or record.cpe_matches:
+                    self._extra.append((source, record))
+                continue
+            self._seen.add(record.cve_id)
+            self._batch.append((source, record))
+            if self.max_per_query and len(self._seen) >= self.max_per_query:
+                self.truncated = True
+                self._stop.set()
+            if len(self._batch) >= self.batch_size:
+                return self._take_batch()
+
+        for source in [source for source in self._running if self._expired(source)]:
+            # Its producer stops at the next record or page; whatever it was waiting on is abandoned
+            logger.info(f"Harvest '{self.query}': {source} timed out after {self.timeouts[source]:.1f}s")
+            self._cut_off(source)
+        if self._running and not self._stop.is_set() and self._remaining() <= 0:
+            self.unfinished = sorted(self._running)
+            for source in self.unfinished:
+                self._cut_off(source)
+            logger.warning(f"Harvest '{self.query}' deadline reached, abandoning {', '.join(self.unfinished)}")
+            self.truncated = True
+            self._stop.set()
+        if self._stop.is_set():
+            # Producers stuck in a slow request finish on their own; don't wait for them
+            self._running = set()
+        if not self._running and self._batch:
+            return self._take_batch()
+        return None
+
+    def _cut_off(self, source: str):
+        self.timed_out.add(source)
+        self.latency.setdefault(source, time.monotonic() - self._started)
+        self._running.discard(source)
+
+    def _take_batch(self) -> List[Tuple[str, VulnRecord]]:
+        batch, self._batch = self._batch, []
+        return batch
+
+    def _take_extra(self) -> List[Tuple[str, VulnRecord]]:
+        extra, self._extra = self._extra, []
+        return extra
+
+    def _record(self, saved: writer.SaveResult):
+        self.saved_count += len(saved.created)
+        stats.record_vulnerabilities(saved.created_records, saved.stat_changes)
+        recent.record_latest(saved.created)
+
+    def __iter__(self) -> Iterator[HarvestBatch]:
+        wake = threading.Event()
+        self._start(wake.set)
+        try:
+            while True:
+                wake.clear()
+                batch = self._drain()
+                if batch:
+                    saved = writer.persist(batch + self._take_extra(), self.update_existing)
+                    self._record(saved)
+                    yield HarvestBatch(batch, saved)
+                elif not self._running:
+                    extra = self._take_extra()
+                    if extra:
+                        self._record(writer.persist(extra, self.update_existing))
+                    return
+                else:
+                    started = time.monotonic()
+                    wake.wait(self._wait_time())
+                    self._waited += time.monotonic() - started
+        finally:
+            # Also reached when the consumer stops early (client went away)
+            self._stop.set()
+
+    async def __aiter__(self) -> AsyncIterator[HarvestBatch]:
+        loop = asyncio.get_running_loop()
+        wake = asyncio.Event()
+        self._start(lambda: loop.call_soon_threadsafe(wake.set))
+        try:
+            while True:
+                wake.clear()
+                batch = self._drain()
+                if batch:
+                    saved = await writer.apersist(batch + self._take_extra(), self.update_existing)
+                    await sync_to_async(self._record)(saved)
+                    yield HarvestBatch(batch, saved)
+                elif not self._running:
+                    extra = self._take_extra()
+                    if extra:
+                        await sync_to_async(self._record)(await writer.apersist(extra, self.update_existing))
+                    return
+                else:
+                    started = time.monotonic()
+                    try:
+                        await asyncio.wait_for(wake.wait(), self._wait_time())
+                    except asyncio.TimeoutError:
+                        pass
+                    self._waited += time.monotonic() - started
+        finally:
+            self._stop.set()
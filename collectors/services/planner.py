@@ -0,0 +1,267 @@
+import re
+import logging
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import List, Dict, Any, Optional, Tuple
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from . import autocomplete
+from .cpe_index import split_cpe
+from .manifest import PURL_ECOSYSTEMS, parse_purl
+from .records import VulnRecord
+from .stats import normalize_query
+from .versions import normalize_package_name
+
+logger = logging.getLogger(__name__)
+
+CVE_RE = re.compile(r'^CVE-\d{4}-\d{4,}$', re.IGNORECASE)
+GHSA_RE = re.compile(r'^GHSA(?:-[23456789cfghjmpqrvwx]{4}){3}$', re.IGNORECASE)
+OSV_ID_RE = re.compile(r'^[A-Za-z]+-\d{4}-[A-Za-z0-9._-]+$')  # PYSEC-2021-19, RUSTSEC-2021-0001, GO-2022-0001
+PACKAGE_RE = re.compile(r'^[A-Za-z0-9@][A-Za-z0-9._@/:+-]*$')
+
+# Lowercase spelling -> OSV ecosystem, for 'PyPI/django' and 'pypi:django'
+ECOSYSTEMS = {name.lower(): name for name in PURL_ECOSYSTEMS.values()}
+ECOSYSTEMS.update(PURL_ECOSYSTEMS)
+
+QUERY_CLASSES = ('cve', 'advisory', 'package', 'cpe', 'text')
+
+
+def get_planner_settings() -> Dict[str, Any]:
+    config = {
+        'ENABLED': True,
+        'FRESH_FOR': {  # Seconds a source's answer to a query stays fresh, per query class
+            'cve': 86400,
+            'advisory': 86400,
+            'package': 6 * 3600,
+            'cpe': 86400,
+            'text': 3600,
+        },
+        'SOURCES': {  # Sources able to answer each query class; None means every source
+            'cve': ['NVD', 'OSV', 'GITHUB_SECURITY', 'SNYK', 'EXPLOIT_DB'],
+            'advisory': ['OSV', 'GITHUB_SECURITY'],
+            'package': ['OSV', 'GITHUB_SECURITY', 'SNYK', 'PYTHON_PACKAGES', 'NVD'],
+            'cpe': ['NVD'],
+            'text': None,
+        },
+        'ECOSYSTEM_SOURCES': {  # Sources that only know some ecosystems, for package queries
+            'PYTHON_PACKAGES': ['PyPI'],
+        },
+        'LOCAL_LIMIT': 500,  # Stored rows returned for a query answered locally
+    }
+    overrides = getattr(settings, 'QUERY_PLANNER', {})
+    for name in ('FRESH_FOR', 'SOURCES', 'ECOSYSTEM_SOURCES'):
+        config[name] = dict(config[name], **overrides.get(name, {}))
+    config.update({name: value for name, value in overrides.items() if not isinstance(value, dict)})
+    return config
+
+
+def _split_ecosystem(query: str) -> Tuple[Optional[str], str]:
+    """('PyPI', 'django') from 'PyPI/django', 'pypi:django' or a purl; (None, query) otherwise"""
+    if query.startswith('pkg:'):
+        parsed = parse_purl(query)
+        return (parsed[0], parsed[1]) if parsed else (None, query)
+    for separator in ('/', ':'):
+        prefix, found, name = query.partition(separator)
+        if found and name and prefix.lower() in ECOSYSTEMS:
+            return ECOSYSTEMS[prefix.lower()], name
+    return None, query
+
+
+def classify(query: str) -> Tuple[str, str, Optional[str]]:
+    """(query class, term, ecosystem) of a search query.
+
+    IDs come back upper-cased (advisory IDs other than CVE and GHSA as
+    typed), CPEs as 'vendor product' and packages without their ecosystem
+    prefix. A single bare word such as 'django' or 'log4j' counts as a
+    package name only when a stored vulnerability names that package;
+    other words ('ransomware', 'xss') and anything with spaces are free
+    text, which every source can answer.
+    """
+    query = ' '.join(query.split())
+    if CVE_RE.match(query):
+        return 'cve', query.upper(), None
+    if GHSA_RE.match(query):
+        return 'advisory', 'GHSA' + query[4:].lower(), None
+    if OSV_ID_RE.match(query):
+        return 'advisory', query, None
+    if query.lower().startswith(('cpe:2.3:', 'cpe:/')):
+        parts = split_cpe(query)
+        if parts:
+            return 'cpe', f"{parts[1]} {parts[2]}", None
+    ecosystem, name = _split_ecosystem(query)
+    if PACKAGE_RE.match(name) and not name.isdigit() and (ecosystem or _known_package(name)):
+        return 'package', name, ecosystem
+    return 'text', query, None
+
+
+def _known_package(name: str) -> bool:
+    """Whether a bare name is a package some stored vulnerability affects"""
+    from ..models import AffectedRange
+
+    index = autocomplete.get_index()
+    index.refresh()
+    with index.lock:
+        if name.lower() in index.package_names:
+            return True
+    spellings = {name, name.lower(), normalize_package_name('PyPI', name)}
+    return AffectedRange.objects.filter(package__in=spellings).exists()
+
+
+@dataclass
+class QueryPlan:
+    """What a search needs: the local answer, and which sources to ask upstream"""
+    query: str
+    query_class: str
+    term: str                    # What the upstream sources are sent
+    ecosystem: Optional[str]
+    key: str                     # SourceFreshness.query_key
+    sources: List[str]           # Sources able to answer this class
+    fresh: List[str] = field(default_factory=list)  # ...that answered it within the freshness window
+    local: List[VulnRecord] = field(default_factory=list)
+    run: List[str] = field(default_factory=list)    # Sources to fetch from now, in priority order
+    demoted: List[str] = field(default_factory=list)  # Low-value sources left to background refresh
+    timeouts: Dict[str, float] = field(default_factory=dict)  # Per-source seconds for the sources in run
+
+    @property
+    def answered_locally(self) -> bool:
+        return not self.run
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            'query_class': self.query_class,
+            'ecosystem': self.ecosystem,
+            'sources': self.run,
+            'fresh_sources': self.fresh,
+            'demoted_sources': self.demoted,
+            'timeouts': self.timeouts,
+            'local_results': len(self.local),
+            'answered_locally': self.answered_locally,
+        }
+
+
+def capable_sources(query_class: str, ecosystem: Optional[str], available: List[str]) -> List[str]:
+    """Sources among available that can answer a query of this class"""
+    config = get_planner_settings()
+    wanted = config['SOURCES'].get(query_class)
+    sources = list(available) if wanted is None else [source for source in wanted if source in available]
+    if query_class == 'package' and ecosystem:
+        limited = config['ECOSYSTEM_SOURCES']
+        sources = [source for source in sources if source not in limited or ecosystem in limited[source]]
+    return sources
+
+
+def local_queryset(query_class: str, term: str, ecosystem: Optional[str]):
+    """Stored rows answering the query.
+
+    ID lookups also match rows linked as near-duplicates (see
+    canonical_rows); the other classes leave them out like the listing.
+    """
+    from ..models import Vulnerability
+    from . import cpe_index
+
+    if query_class == 'cve':
+        return Vulnerability.objects.filter(cve_id=term)
+    if query_class == 'advisory':
+        return Vulnerability.objects.filter(
+            Q(cve_id__iexact=term) | Q(version_ranges__advisory_id__iexact=term)
+        ).distinct()
+    vulnerabilities = Vulnerability.objects.filter(canonical__isnull=True)
+    # Packages and text match like the search listing, which covers what the sources returned for them
+    listing = (
+        Q(title__icontains=term) | Q(description__icontains=term) |
+        Q(cve_id__icontains=term) | Q(affected_packages__icontains=term)
+    )
+    if query_class == 'package':
+        ranges = Q(version_ranges__package=normalize_package_name(ecosystem or '', term))
+        if ecosystem:
+            ranges &= Q(version_ranges__ecosystem=ecosystem)
+        return vulnerabilities.filter(ranges | listing).distinct()
+    if query_class == 'cpe':
+        vendor, product = term.split(' ', 1)
+        cve_ids = [
+            info['cve_id'] for result in cpe_index.get_index().lookup([f"cpe:2.3:*:{vendor}:{product}:*"])
+            for info in result['vulnerabilities']
+        ]
+        return vulnerabilities.filter(cve_id__in=cve_ids)
+    return vulnerabilities.filter(listing)
+
+
+def canonical_rows(rows: List[Any]) -> List[Any]:
+    """Rows with near-duplicates replaced by their canonical row, each row once, in order"""
+    resolved = {}
+    for row in rows:
+        row = row.canonical or row
+        resolved.setdefault(row.pk, row)
+    return list(resolved.values())
+
+
+def plan(query: str, available: List[str], refresh: bool = False) -> QueryPlan:
+    """Classify the query and decide between the local answer and an upstream fetch.
+
+    Sources that answered the same query within FRESH_FOR are skipped, and
+    an ID whose stored rows were all updated within the window is answered
+    from the database alone. Stored rows are loaded whenever upstream is
+    skipped entirely, whenever some source is fresh (its answer is only
+    in the database now), and always for IDs and CPEs (indexed lookups),
+    so the response can lead with them. A package or text search no
+    source has answered recently skips the table scan. refresh=True
+    fetches from every capable source regardless.
+    """
+    config = get_planner_settings()
+    query_class, term, ecosystem = classify(query)
+    key = f"{query_class}:{normalize_query(f'{ecosystem}/{term}' if ecosystem else term)}"[:550]
+    sources = capable_sources(query_class, ecosystem, available)
+    result = QueryPlan(query, query_class, term, ecosystem, key, sources, run=list(sources))
+    if not config['ENABLED']:
+        result.sources = result.run = list(available)
+        result.term = query
+        return result
+    if refresh:
+        return result
+
+    from ..models import SourceFreshness
+
+    window = timedelta(seconds=config['FRESH_FOR'].get(query_class, 0))
+    cutoff = timezone.now() - window
+    result.fresh = sorted(SourceFreshness.objects.filter(
+        query_key=key, source__in=sources, fetched_at__gte=cutoff,
+    ).values_list('source', flat=True))
+    result.run = [source for source in sources if source not in result.fresh]
+
+    if query_class in ('package', 'text') and result.run and not result.fresh:
+        return result
+    rows = list(
+        local_queryset(query_class, term, ecosystem).select_related('source', 'canonical__source')
+        .order_by('-published_date')[:config['LOCAL_LIMIT']]
+    )
+    result.local = [VulnRecord.from_row(row) for row in canonical_rows(rows)]
+    if query_class in ('cve', 'advisory') and rows and all(row.updated_at >= cutoff for row in rows):
+        result.run = []
+    return result
+
+
+def record_fetched(result: QueryPlan, completed: List[str], found: Dict[str, int]):
+    """Mark the sources that finished answering this query as fresh"""
+    from ..models import SourceFreshness
+
+    if not get_planner_settings()['ENABLED']:
+        return
+    now = timezone.now()
+    for source in completed:
+        SourceFreshness.objects.update_or_create(
+            source=source, query_key=result.key,
+            defaults={'query_class': result.query_class, 'results_count': found.get(source, 0), 'fetched_at': now},
+        )
+
+
+def prune_freshness() -> int:
+    """Delete freshness rows older than the longest window; they can no longer skip a fetch"""
+    from ..models import SourceFreshness
+
+    longest = max(get_planner_settings()['FRESH_FOR'].values(), default=0)
+    cutoff = timezone.now() - timedelta(seconds=longest)
+    deleted, _ = SourceFreshness.objects.filter(fetched_at__lt=cutoff).delete()
+    return deleted
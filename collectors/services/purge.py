@@ -0,0 +1,273 @@
+import json
+import threading
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from typing import List, Dict, Any, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connections, transaction
+from django.db.models import F, Max, Min
+from django.utils import timezone
+
+from . import cpe_index, range_index
+from .stats import bump_rollup, normalize_query, rebuild_stats
+
+logger = logging.getLogger(__name__)
+
+
+def get_retention_settings() -> Dict[str, Any]:
+    retention = {
+        'SEARCH_QUERY_DAYS': 90,
+        'BATCH_SIZE': 5000,
+        'PURGE_STALE_AFTER': 3600,
+    }
+    retention.update(getattr(settings, 'DATA_RETENTION', {}))
+    return retention
+
+
+def chunked_delete(queryset, batch_size: int = 5000) -> int:
+    """Delete rows matching queryset in primary key ranges.
+
+    Each range is deleted with a single DELETE statement in its own short
+    transaction. Rows are not loaded into Python and no signals or cascades
+    are collected, so only use this on tables nothing else points at (or
+    after the referencing rows are gone).
+    """
+    queryset = queryset.order_by()
+    bounds = queryset.aggregate(low=Min('pk'), high=Max('pk'))
+    if bounds['low'] is None:
+        return 0
+
+    deleted = 0
+    low = bounds['low']
+    while low <= bounds['high']:
+        with transaction.atomic(using=queryset.db):
+            deleted += queryset.filter(pk__gte=low, pk__lt=low + batch_size)._raw_delete(queryset.db)
+        low += batch_size
+    return deleted
+
+
+def truncate_tables(models: List, using: str = 'default') -> bool:
+    """TRUNCATE the given tables where the backend supports it"""
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return False
+    tables = ', '.join(connection.ops.quote_name(m._meta.db_table) for m in models)
+    with connection.cursor() as cursor:
+        cursor.execute(f"TRUNCATE TABLE {tables} RESTART IDENTITY CASCADE")
+    return True
+
+
+def purge_all(batch_size: Optional[int] = None) -> Dict[str, int]:
+    """Remove every vulnerability, search and source row plus the rollups"""
+    from ..models import (
+        Vulnerability, SearchQuery, SearchQueryDaily, VulnerabilitySource, VulnerabilityStat,
+        SearchQueryStat, UserAgent, LatestVulnerability, AffectedRange, CpeMatch, PageCache, SourceFreshness,
+        SourceStats,
+    )
+
+    batch_size = batch_size or get_retention_settings()['BATCH_SIZE']
+    # Vulnerabilities first so deleting sources has nothing to SET_NULL
+    models = [
+        LatestVulnerability, AffectedRange, CpeMatch, Vulnerability, VulnerabilitySource, SearchQuery, UserAgent, SearchQueryDaily,
+        VulnerabilityStat, SearchQueryStat, PageCache, SourceFreshness, SourceStats,
+    ]
+
+    counts = {}
+    if truncate_tables(models):
+        counts = {m.__name__: -1 for m in models}
+    else:
+        # Chunks delete canonical rows before their later duplicates, so unlink them first
+        Vulnerability.objects.filter(canonical__isnull=False).update(canonical=None)
+        for model in models:
+            counts[model.__name__] = chunked_delete(model.objects.all(), batch_size)
+
+    # Other processes see the new generation and drop their caches too
+    _swap_generation(bump_purge_generation())
+    range_index.bump_generation()
+    cpe_index.bump_generation()
+    reset_process_caches()
+    cache.clear()
+    # Harvests that ran during the purge may have added rows after their rollups were cleared
+    rebuild_stats()
+    logger.info(f"Purged data: {counts}")
+    return counts
+
+
+def purge_state():
+    from ..models import PurgeState
+
+    state, _ = PurgeState.objects.get_or_create(pk=1)
+    return state
+
+
+def purge_generation() -> int:
+    """Number of purges so far, shared by every process through the database"""
+    from ..models import PurgeState
+
+    return PurgeState.objects.filter(pk=1).values_list('generation', flat=True).first() or 0
+
+
+async def apurge_generation() -> int:
+    from ..models import PurgeState
+
+    return await PurgeState.objects.filter(pk=1).values_list('generation', flat=True).afirst() or 0
+
+
+def bump_purge_generation() -> int:
+    from ..models import PurgeState
+
+    purge_state()
+    PurgeState.objects.filter(pk=1).update(generation=F('generation') + 1)
+    return purge_generation()
+
+
+def reset_process_caches():
+    """Forget everything this process derived from the purged tables; each rebuilds on next use"""
+    from ..collector import reset_source_cache
+    from .analytics import get_buffer
+    from .known_ids import reset_filter
+    from . import autocomplete, near_dup
+
+    reset_source_cache()
+    get_buffer().reset()
+    reset_filter()
+    near_dup.reset_index()
+    autocomplete.reset_index()
+
+
+_generation_seen: Optional[int] = None
+_generation_lock = threading.Lock()
+
+
+def _swap_generation(generation: int) -> Optional[int]:
+    global _generation_seen
+    with _generation_lock:
+        previous, _generation_seen = _generation_seen, generation
+    return previous
+
+
+def check_purge_generation(generation: Optional[int] = None):
+    """Reset this process's caches if a purge ran anywhere since the last check.
+
+    The known-ID filter, source rows, near-duplicate and autocomplete
+    indexes, buffered searches and a local-memory cache all live in one
+    process, so purge_all can only reset its own. Every other process
+    calls this before using them (per request, and per write batch) and
+    catches up when PurgeState.generation has moved.
+    """
+    if generation is None:
+        generation = purge_generation()
+    previous = _swap_generation(generation)
+    if previous is None or previous == generation:
+        return
+    logger.info(f"Purge generation {previous} -> {generation}, resetting process caches")
+    reset_process_caches()
+    if isinstance(cache, LocMemCache):
+        cache.clear()
+
+
+def apply_search_retention(days: Optional[int] = None, batch_size: Optional[int] = None) -> Dict[str, int]:
+    """Roll SearchQuery rows older than the retention window into daily aggregates.
+
+    Works through the expired rows in primary key order, one batch per
+    transaction: the batch is summed into SearchQueryDaily and then deleted
+    by primary key, so locks are held only for one batch at a time.
+    """
+    from ..models import SearchQuery, SearchQueryDaily
+
+    retention = get_retention_settings()
+    days = retention['SEARCH_QUERY_DAYS'] if days is None else days
+    batch_size = batch_size or retention['BATCH_SIZE']
+    cutoff = timezone.now() - timedelta(days=days)
+
+    rolled_up = 0
+    last_pk = 0
+    while True:
+        rows = list(
+            SearchQuery.objects.filter(created_at__lt=cutoff, pk__gt=last_pk)
+            .order_by('pk')
+            .values_list('pk', 'query', 'results_count', 'created_at')[:batch_size]
+        )
+        if not rows:
+            break
+
+        daily = defaultdict(lambda: [0, 0, 0])
+        for pk, query, results_count, created_at in rows:
+            entry = daily[(created_at.date(), normalize_query(query))]
+            entry[0] += 1
+            entry[1] += results_count or 0
+            entry[2] += 0 if results_count else 1
+
+        with transaction.atomic():
+            for (day, query), (searches, results_total, zero) in daily.items():
+                bump_rollup(
+                    SearchQueryDaily,
+                    {'day': day, 'query': query},
+                    {
+                        'search_count': F('search_count') + searches,
+                        'results_total': F('results_total') + results_total,
+                        'zero_result_count': F('zero_result_count') + zero,
+                    },
+                    {'search_count': searches, 'results_total': results_total, 'zero_result_count': zero},
+                )
+            SearchQuery.objects.filter(pk__in=[row[0] for row in rows])._raw_delete(SearchQuery.objects.db)
+
+        rolled_up += len(rows)
+        last_pk = rows[-1][0]
+
+    return {'rolled_up': rolled_up, 'cutoff': cutoff.isoformat()}
+
+
+class PurgeJob:
+    """Runs purge_all on a background thread, one job at a time across processes.
+
+    The status is kept in the PurgeState row so every worker reports the
+    same job. A job still 'running' after PURGE_STALE_AFTER seconds is
+    taken to have died with its worker and can be started again.
+    """
+
+    @classmethod
+    def status(cls) -> Dict[str, Any]:
+        state = purge_state()
+        status = {'state': state.state}
+        if state.started_at:
+            status['started_at'] = state.started_at.isoformat()
+        if state.finished_at:
+            status['finished_at'] = state.finished_at.isoformat()
+        if state.state == 'done':
+            status['deleted'] = json.loads(state.deleted)
+        if state.state == 'failed':
+            status['error'] = state.error
+        return status
+
+    @classmethod
+    def start(cls) -> bool:
+        from ..models import PurgeState
+
+        purge_state()
+        now = timezone.now()
+        stale = now - timedelta(seconds=get_retention_settings()['PURGE_STALE_AFTER'])
+        claimed = PurgeState.objects.filter(pk=1).exclude(state='running', started_at__gte=stale).update(
+            state='running', started_at=now, finished_at=None, deleted='{}', error='',
+        )
+        if not claimed:
+            return False
+        threading.Thread(target=cls._run, name='vtbda-purge', daemon=True).start()
+        return True
+
+    @classmethod
+    def _run(cls):
+        from ..models import PurgeState
+
+        try:
+            counts = purge_all()
+            PurgeState.objects.filter(pk=1).update(state='done', finished_at=timezone.now(), deleted=json.dumps(counts))
+        except Exception as e:
+            logger.exception("Purge failed")
+            PurgeState.objects.filter(pk=1).update(state='failed', finished_at=timezone.now(), error=str(e))
+        finally:
+            connections.close_all()
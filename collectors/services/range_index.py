@@ -0,0 +1,212 @@
+import threading
+import logging
+from collections import OrderedDict, defaultdict
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+
+from django.db import transaction
+
+from . import generations
+from .versions import version_key, normalize_package_name
+
+logger = logging.getLogger(__name__)
+
+GENERATION = 'ranges'  # IndexGeneration.name
+LOOKUP_CHUNK = 500
+
+
+def compact_osv_affected(affected: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Reduce OSV affected[] to (ecosystem, package, intervals) entries.
+
+    Each interval is ``(introduced, fixed, last_affected)``. GIT ranges are
+    commit hashes and are skipped; an explicit ``versions`` list is only used
+    when the entry has no ECOSYSTEM/SEMVER range.
+    """
+    compact = []
+    for entry in affected or []:
+        package = entry.get('package', {})
+        ecosystem, name = package.get('ecosystem', ''), package.get('name', '')
+        if not ecosystem or not name:
+            continue
+
+        intervals = []
+        for version_range in entry.get('ranges', []):
+            if version_range.get('type') not in ('ECOSYSTEM', 'SEMVER'):
+                continue
+            introduced = None
+            for event in version_range.get('events', []):
+                if 'introduced' in event:
+                    if introduced is not None:
+                        intervals.append((introduced, '', ''))
+                    introduced = event['introduced']
+                elif 'fixed' in event and introduced is not None:
+                    intervals.append((introduced, event['fixed'], ''))
+                    introduced = None
+                elif 'last_affected' in event and introduced is not None:
+                    intervals.append((introduced, '', event['last_affected']))
+                    introduced = None
+            if introduced is not None:
+                intervals.append((introduced, '', ''))
+
+        if not intervals:
+            intervals = [(v, '', v) for v in entry.get('versions', [])]
+
+        if intervals:
+            compact.append({'ecosystem': ecosystem, 'package': name, 'intervals': intervals})
+    return compact
+
+
+def store_ranges(entries: Iterable[Tuple[Any, str, List[Dict[str, Any]]]]) -> int:
+    """Persist compacted ranges given as (stored vulnerability, advisory ID, ranges) entries.
+
+    Ranges are kept per (vulnerability, advisory): an advisory seen again
+    replaces its earlier intervals, entries for the same pair are merged,
+    and pairs whose intervals are unchanged are not written at all.
+    Returns the number of rows inserted.
+    """
+    from ..models import AffectedRange
+
+    wanted = {}  # (vulnerability id, advisory id) -> (vulnerability, interval tuples)
+    for vulnerability, advisory_id, affected_ranges in entries:
+        advisory_id = (advisory_id or vulnerability.cve_id)[:100]
+        intervals = wanted.setdefault((vulnerability.pk, advisory_id), (vulnerability, set()))[1]
+        for entry in affected_ranges or []:
+            package = normalize_package_name(entry['ecosystem'], entry['package'])[:250]
+            for introduced, fixed, last_affected in entry['intervals']:
+                intervals.add((
+                    entry['ecosystem'][:100], package,
+                    (introduced or '')[:100], (fixed or '')[:100], (last_affected or '')[:100],
+                ))
+
+    stored = defaultdict(set)
+    vulnerability_ids = list({key[0] for key in wanted})
+    for start in range(0, len(vulnerability_ids), LOOKUP_CHUNK):
+        rows = AffectedRange.objects.filter(vulnerability_id__in=vulnerability_ids[start:start + LOOKUP_CHUNK]).values_list(
+            'vulnerability_id', 'advisory_id', 'ecosystem', 'package', 'introduced', 'fixed', 'last_affected'
+        )
+        for vulnerability_id, advisory_id, *interval in rows:
+            stored[(vulnerability_id, advisory_id)].add(tuple(interval))
+
+    rows = []
+    changed = False
+    for (vulnerability_id, advisory_id), (vulnerability, intervals) in wanted.items():
+        if intervals == stored.get((vulnerability_id, advisory_id), set()):
+            continue
+        changed = True
+        if (vulnerability_id, advisory_id) in stored:
+            AffectedRange.objects.filter(vulnerability_id=vulnerability_id, advisory_id=advisory_id).delete()
+        rows.extend(
+            AffectedRange(
+                vulnerability=vulnerability, advisory_id=advisory_id, ecosystem=ecosystem, package=package,
+                introduced=introduced, fixed=fixed, last_affected=last_affected,
+            )
+            for ecosystem, package, introduced, fixed, last_affected in sorted(intervals)
+        )
+    if changed:
+        AffectedRange.objects.bulk_create(rows, batch_size=500)
+        # Other processes must not reload the index before these rows are visible
+        transaction.on_commit(bump_generation)
+    return len(rows)
+
+
+def bump_generation():
+    """Tell every process to drop its cached intervals (the generation lives in the database)"""
+    generations.bump_generation(GENERATION)
+
+
+class IntervalIndex:
+    """Per-(ecosystem, package) interval lists loaded from AffectedRange.
+
+    Intervals are stored with precomputed version keys so a lookup is a few
+    tuple comparisons per interval. Packages are loaded in batches with one
+    ``package__in`` query per chunk and kept in a bounded LRU that is
+    cleared when the ranges table changes: each lookup reads the shared
+    IndexGeneration row, so intervals (and packages known to have none)
+    loaded by any worker are dropped once another stores new ranges.
+    """
+
+    def __init__(self, max_packages: int = 200000):
+        self.max_packages = max_packages
+        self.packages: OrderedDict = OrderedDict()
+        self.generation = None
+        self.lock = threading.Lock()
+
+    def _check_generation(self):
+        generation = generations.get_generation(GENERATION)
+        if generation != self.generation:
+            self.packages.clear()
+            self.generation = generation
+
+    def _load(self, ecosystem: str, packages: Iterable[str]):
+        from ..models import AffectedRange
+
+        missing = [p for p in packages if (ecosystem, p) not in self.packages]
+        for start in range(0, len(missing), LOOKUP_CHUNK):
+            chunk = missing[start:start + LOOKUP_CHUNK]
+            loaded = {p: [] for p in chunk}
+            rows = AffectedRange.objects.filter(ecosystem=ecosystem, package__in=chunk).values_list(
+                'package', 'introduced', 'fixed', 'last_affected', 'advisory_id', 'vulnerability__cve_id'
+            )
+            for package, introduced, fixed, last_affected, advisory_id, cve_id in rows:
+                low = None if introduced in ('', '0') else version_key(ecosystem, introduced)
+                if fixed:
+                    high, inclusive = version_key(ecosystem, fixed), False
+                elif last_affected:
+                    high, inclusive = version_key(ecosystem, last_affected), True
+                else:
+                    high, inclusive = None, False
+                loaded[package].append((low, high, inclusive, {
+                    'id': advisory_id,
+                    'cve_id': cve_id,
+                    'introduced': introduced,
+                    'fixed': fixed,
+                    'last_affected': last_affected,
+                }))
+            for package, intervals in loaded.items():
+                self.packages[(ecosystem, package)] = intervals
+        while len(self.packages) > self.max_packages:
+            self.packages.popitem(last=False)
+
+    def lookup(self, dependencies: List[Tuple[str, str, str]]) -> List[Dict[str, Any]]:
+        """Match (ecosystem, name, version) triples against the index"""
+        by_ecosystem = defaultdict(list)
+        for ecosystem, name, version in dependencies:
+            by_ecosystem[ecosystem].append((normalize_package_name(ecosystem, name), name, version))
+
+        results = []
+        with self.lock:
+            self._check_generation()
+            for ecosystem, deps in by_ecosystem.items():
+                self._load(ecosystem, list({d[0] for d in deps}))
+                for package, name, version in deps:
+                    intervals = self.packages.get((ecosystem, package), [])
+                    if not intervals or not version:
+                        continue
+                    key = version_key(ecosystem, version)
+                    matches = {}
+                    for low, high, inclusive, info in intervals:
+                        if low is not None and key < low:
+                            continue
+                        if high is not None and (key > high or (key == high and not inclusive)):
+                            continue
+                        matches.setdefault(info['id'], info)
+                    if matches:
+                        results.append({
+                            'ecosystem': ecosystem,
+                            'name': name,
+                            'version': version,
+                            'vulnerabilities': list(matches.values()),
+                        })
+        return results
+
+
+_index: Optional[IntervalIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> IntervalIndex:
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = IntervalIndex()
+    return _index
@@ -0,0 +1,92 @@
+import logging
+from typing import Dict, Iterable, List
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+FRAGMENT_NAMES = ('vulnerabilities', 'searches')
+
+
+def get_home_settings() -> Dict[str, int]:
+    scanner = getattr(settings, 'VULNERABILITY_SCANNER', {})
+    return {
+        'RING_SIZE': scanner.get('HOME_RING_SIZE', 20),
+        'FRAGMENT_TIMEOUT': scanner.get('HOME_FRAGMENT_TIMEOUT', 60),
+    }
+
+
+def _version_key(name: str) -> str:
+    return f"home:version:{name}"
+
+
+def fragment_versions() -> Dict[str, int]:
+    """Current version of each home page fragment, used in the cache key"""
+    values = cache.get_many([_version_key(name) for name in FRAGMENT_NAMES])
+    return {name: values.get(_version_key(name), 0) for name in FRAGMENT_NAMES}
+
+
+def bump_fragment(name: str):
+    """Invalidate a cached home page fragment"""
+    try:
+        cache.incr(_version_key(name))
+    except ValueError:
+        cache.set(_version_key(name), 1, None)
+
+
+def _sort_key(published_date) -> str:
+    return str(published_date or '')
+
+
+def record_latest(vulnerabilities: Iterable):
+    """Offer newly stored Vulnerability rows to the latest-N ring.
+
+    Only rows that beat the oldest entry of a full ring are inserted, then
+    the ring is trimmed back to RING_SIZE. The ring never holds more than a
+    few dozen rows, so both steps stay cheap however big the main table is.
+    """
+    from ..models import LatestVulnerability
+
+    ring_size = get_home_settings()['RING_SIZE']
+    entries = LatestVulnerability.objects.order_by('-published_date', '-id').values_list('published_date', flat=True)
+    current = list(entries[:ring_size])
+    floor = current[-1] if len(current) >= ring_size else None
+
+    candidates = [
+        v for v in vulnerabilities
+        if floor is None or _sort_key(v.published_date) >= floor
+    ]
+    if not candidates:
+        return
+
+    candidates.sort(key=lambda v: _sort_key(v.published_date), reverse=True)
+    LatestVulnerability.objects.bulk_create([
+        LatestVulnerability(
+            vulnerability=v,
+            cve_id=v.cve_id,
+            title=v.title[:500],
+            severity=v.severity,
+            published_date=_sort_key(v.published_date),
+        )
+        for v in candidates[:ring_size]
+    ], ignore_conflicts=True)
+
+    stale = list(
+        LatestVulnerability.objects.order_by('-published_date', '-id').values_list('id', flat=True)[ring_size:]
+    )
+    if stale:
+        LatestVulnerability.objects.filter(id__in=stale).delete()
+    bump_fragment('vulnerabilities')
+
+
+def rebuild_latest() -> int:
+    """Refill the ring from the main table (uses the published_date index)"""
+    from ..models import Vulnerability, LatestVulnerability
+
+    ring_size = get_home_settings()['RING_SIZE']
+    latest: List = list(Vulnerability.objects.order_by('-published_date', '-id')[:ring_size])
+    LatestVulnerability.objects.all().delete()
+    record_latest(latest)
+    bump_fragment('vulnerabilities')
+    return len(latest)
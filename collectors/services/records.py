@@ -0,0 +1,151 @@
+import json
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal
+from typing import List, Dict, Any, Optional
+
+from .dates import parse_date
+from .known_ids import content_fingerprint
+
+SEVERITIES = ('CRITICAL', 'HIGH', 'MEDIUM', 'LOW')
+
+
+def _text(value: Any) -> str:
+    if value.__class__ is str:
+        return value.strip()
+    return '' if value is None else str(value).strip()
+
+
+def _list(value: Any) -> list:
+    # Normalized dicts are discarded after conversion, so their lists are taken over, not copied
+    if value.__class__ is list:
+        return value
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    return [value] if value else []
+
+
+@dataclass(slots=True)
+class VulnRecord:
+    """One normalized vulnerability as it moves from a scraper to the database.
+
+    from_normalized() is the only place scraper output is validated and
+    coerced; everything downstream can rely on the field types. The display
+    and database projections are built on demand rather than kept per row.
+    """
+    cve_id: str
+    title: str
+    source: str  # Aggregator source key, e.g. 'NVD'
+    description: str = ''
+    severity: str = 'MEDIUM'
+    cvss_score: Optional[float] = None
+    cvss_vector: str = ''
+    published_date: Optional[datetime] = None  # Aware UTC
+    source_url: str = ''
+    affected_packages: List[str] = field(default_factory=list)
+    references: List[str] = field(default_factory=list)
+    advisory_id: str = ''
+    affected_ranges: List[Dict[str, Any]] = field(default_factory=list)
+    cpe_matches: List[Dict[str, Any]] = field(default_factory=list)
+
+    @classmethod
+    def from_normalized(cls, data: Dict[str, Any], source: str) -> Optional['VulnRecord']:
+        """Validate a scraper's normalized dict; None when it has neither ID nor title"""
+        cve_id = _text(data.get('cve_id'))
+        title = _text(data.get('title'))
+        if not cve_id and not title:
+            return None
+        if not cve_id:
+            cve_id = f"{source}-{int(time.time())}-{hash(title)}"
+        elif cve_id[:4].lower() == 'cve-' and not cve_id.isupper():
+            cve_id = cve_id.upper()
+
+        severity = data.get('severity')
+        if severity not in SEVERITIES:
+            severity = _text(severity).upper()
+            if severity not in SEVERITIES:
+                severity = 'MEDIUM'
+
+        cvss_score = data.get('cvss_score')
+        if cvss_score.__class__ is not float:
+            try:
+                cvss_score = None if cvss_score in (None, '') else float(cvss_score)
+            except (TypeError, ValueError):
+                cvss_score = None
+        if cvss_score is not None and not 0 <= cvss_score <= 10:
+            cvss_score = None
+
+        published_date = parse_date(data.get('published_date'))
+
+        return cls(
+            cve_id=cve_id[:50],
+            title=title[:500],
+            source=source,
+            description=_text(data.get('description')),
+            severity=severity,
+            cvss_score=cvss_score,
+            cvss_vector=_text(data.get('cvss_vector'))[:200],
+            published_date=published_date,
+            source_url=_text(data.get('source_url'))[:500],
+            affected_packages=_list(data.get('affected_packages')),
+            references=_list(data.get('references')),
+            advisory_id=_text(data.get('advisory_id')),
+            affected_ranges=_list(data.get('affected_ranges')),
+            cpe_matches=_list(data.get('cpe_matches')),
+        )
+
+    @classmethod
+    def from_row(cls, vuln) -> 'VulnRecord':
+        """A stored Vulnerability as a record, for results answered from the database"""
+        return cls(
+            cve_id=vuln.cve_id,
+            title=vuln.title,
+            source=vuln.source.name if vuln.source_id else '',
+            description=vuln.description,
+            severity=vuln.severity,
+            cvss_score=float(vuln.cvss_score) if vuln.cvss_score is not None else None,
+            cvss_vector=vuln.cvss_vector,
+            published_date=parse_date(vuln.published_date),
+            source_url=vuln.source_url,
+            affected_packages=vuln.get_affected_packages(),
+            references=vuln.get_references(),
+        )
+
+    def fingerprint(self) -> str:
+        return content_fingerprint(
+            self.title, self.description, self.severity, self.cvss_score,
+            self.published_date, self.affected_packages,
+        )
+
+    def display(self) -> Dict[str, Any]:
+        """Summary row returned by the search API"""
+        description = self.description
+        return {
+            'cve_id': self.cve_id,
+            'title': self.title,
+            'description': description[:300] + '...' if len(description) > 300 else description,
+            'severity': self.severity,
+            'cvss_score': self.cvss_score,
+            'source': self.source,
+            'source_url': self.source_url,
+            'published_date': str(self.published_date or ''),
+            'affected_packages': self.affected_packages[:3],
+        }
+
+    def db_fields(self) -> Dict[str, Any]:
+        """Vulnerability column values (everything except the source FK)"""
+        fields = {
+            'cve_id': self.cve_id,
+            'title': self.title,
+            'description': self.description,
+            'severity': self.severity,
+            'cvss_score': None if self.cvss_score is None else Decimal(str(self.cvss_score)),
+            'cvss_vector': self.cvss_vector,
+            'source_url': self.source_url,
+            'affected_packages': json.dumps(self.affected_packages),
+            'references': json.dumps(self.references),
+        }
+        if self.published_date:
+            fields['published_date'] = self.published_date
+        return fields
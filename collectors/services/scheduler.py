@@ -0,0 +1,193 @@
+import math
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .pipeline import HarvestPipeline, get_pipeline_settings
+
+logger = logging.getLogger(__name__)
+
+
+def get_scheduler_settings() -> Dict[str, Any]:
+    config = {
+        'ENABLED': True,
+        'DECAY': 0.2,              # Weight of the newest run in the running averages
+        'MIN_RUNS': 5,             # Runs for a query class before a source's stats are acted on
+        'MIN_SUCCESS_RATE': 0.3,   # Sources below this, or below MIN_YIELD, go to background refresh
+        'MIN_YIELD': 0.1,          # Distinct records per run
+        'TIMEOUT_FACTOR': 3,       # Timeout: average latency plus this many standard deviations
+        'MIN_TIMEOUT': 3,          # Seconds
+        'MAX_TIMEOUT': None,       # None: the harvest deadline
+        'BACKGROUND': True,        # False drops demoted sources instead of refreshing them in the background
+        'BACKGROUND_WORKERS': 2,
+        'MAX_PENDING': 200,        # Background refreshes queued at once; more are dropped
+    }
+    config.update(getattr(settings, 'SOURCE_SCHEDULER', {}))
+    return config
+
+
+def observe(stat, outcome: str, latency: float, found: int, distinct: float, decay: float):
+    """Fold one run ('success', 'failure' or 'timeout') into a SourceStats row (not saved)"""
+    ok = outcome == 'success'
+    stat.successes += ok
+    stat.failures += outcome == 'failure'
+    stat.timeouts += outcome == 'timeout'
+    stat.results += found
+    stat.unique_results += distinct
+    if not stat.runs:
+        stat.latency, stat.latency_var = latency, 0.0
+        stat.success_rate, stat.unique_yield = float(ok), distinct
+    else:
+        # Exponentially weighted mean and variance
+        delta = latency - stat.latency
+        stat.latency += decay * delta
+        stat.latency_var = (1 - decay) * (stat.latency_var + decay * delta * delta)
+        stat.success_rate += decay * (ok - stat.success_rate)
+        stat.unique_yield += decay * (distinct - stat.unique_yield)
+    stat.runs += 1
+
+
+def value(stat) -> float:
+    """Expected distinct records per second of waiting"""
+    return stat.unique_yield * stat.success_rate / max(stat.latency, 0.1)
+
+
+def timeout_for(stat, config: Dict[str, Any], ceiling: float) -> float:
+    timeout = stat.latency + config['TIMEOUT_FACTOR'] * math.sqrt(stat.latency_var)
+    return round(min(ceiling, max(config['MIN_TIMEOUT'], timeout)), 1)
+
+
+def arrange(sources: List[str], stats: Dict[str, Any], config: Dict[str, Any],
+            ceiling: float) -> Tuple[List[str], List[str], Dict[str, float]]:
+    """(interactive sources best first, background sources, per-source timeouts).
+
+    Sources without MIN_RUNS runs for the class go first with no timeout
+    of their own, since only running them tells what they are worth. The
+    rest are ordered by distinct records per second; those under
+    MIN_SUCCESS_RATE or MIN_YIELD are demoted to the background, except
+    that a search always keeps at least one source.
+    """
+    untried, ranked, demoted = [], [], []
+    for source in sources:
+        stat = stats.get(source)
+        if stat is None or stat.runs < config['MIN_RUNS']:
+            untried.append(source)
+        elif stat.success_rate < config['MIN_SUCCESS_RATE'] or stat.unique_yield < config['MIN_YIELD']:
+            demoted.append(source)
+        else:
+            ranked.append(source)
+    if not untried and not ranked and demoted:
+        best = max(demoted, key=lambda source: value(stats[source]))
+        demoted.remove(best)
+        ranked.append(best)
+    ranked.sort(key=lambda source: value(stats[source]), reverse=True)
+    timeouts = {source: timeout_for(stats[source], config, ceiling) for source in ranked}
+    return untried + ranked, demoted, timeouts
+
+
+def load_stats(query_class: str, sources: List[str]) -> Dict[str, Any]:
+    from ..models import SourceStats
+
+    return {stat.source: stat for stat in SourceStats.objects.filter(query_class=query_class, source__in=sources)}
+
+
+def schedule(plan):
+    """Reorder plan.run by value, set per-source timeouts and move low-value sources to plan.demoted"""
+    config = get_scheduler_settings()
+    if not config['ENABLED'] or not plan.run:
+        return
+    ceiling = config['MAX_TIMEOUT'] or get_pipeline_settings()['DEADLINE']
+    stats = load_stats(plan.query_class, plan.run)
+    plan.run, plan.demoted, plan.timeouts = arrange(plan.run, stats, config, ceiling)
+
+
+def outcomes(pipeline: HarvestPipeline) -> Dict[str, str]:
+    """Outcome per source; sources stopped early (caps, client gone) are left out"""
+    result = {}
+    for source in pipeline.sources:
+        if source in pipeline.failed:
+            result[source] = 'failure'
+        elif source in pipeline.timed_out:
+            result[source] = 'timeout'
+        elif source in pipeline.completed:
+            result[source] = 'success'
+    return result
+
+
+def record(query_class: str, pipeline: HarvestPipeline, shared: Optional[set] = None):
+    """Update each source's stats for the query class with how it did in this harvest.
+
+    shared: IDs already answered elsewhere, which the sources only share
+    credit for (see HarvestPipeline.yield_by_source).
+    """
+    from ..models import SourceStats
+
+    config = get_scheduler_settings()
+    if not config['ENABLED']:
+        return
+    distinct = pipeline.yield_by_source(shared)
+    for source, outcome in outcomes(pipeline).items():
+        with transaction.atomic():
+            stat, _ = SourceStats.objects.select_for_update().get_or_create(source=source, query_class=query_class)
+            observe(stat, outcome, pipeline.latency.get(source, 0.0), pipeline.found[source],
+                    distinct.get(source, 0.0), config['DECAY'])
+            stat.save()
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_pending = set()  # (query key, source) refreshes queued or running
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Small pool running background refreshes of demoted sources"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                workers = get_scheduler_settings()['BACKGROUND_WORKERS']
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='vtbda-refresh')
+    return _executor
+
+
+def refresh_in_background(plan, aggregator, seen: Optional[set] = None):
+    """Fetch plan.demoted off the request path, storing results, freshness and stats as usual.
+
+    seen: IDs the search already answered (its pipeline's seen IDs; the
+    plan's local rows by default). The demoted sources only share credit
+    for those, as they would have had they run with the search.
+    """
+    config = get_scheduler_settings()
+    if not plan.demoted or not config['BACKGROUND']:
+        return
+    with _executor_lock:
+        if len(_pending) >= config['MAX_PENDING']:
+            return
+        sources = [source for source in plan.demoted if (plan.key, source) not in _pending]
+        _pending.update((plan.key, source) for source in sources)
+    if sources:
+        if seen is None:
+            seen = {record.cve_id for record in plan.local}
+        get_executor().submit(_refresh, plan, aggregator, sources, seen)
+
+
+def _refresh(plan, aggregator, sources: List[str], seen: set):
+    from . import planner
+
+    try:
+        pipeline = HarvestPipeline(aggregator, plan.term, sources=sources, seen=seen)
+        for _ in pipeline:
+            pass
+        planner.record_fetched(plan, sorted(pipeline.completed), pipeline.found)
+        record(plan.query_class, pipeline, shared=seen)
+        logger.info(f"Background refresh of '{plan.term}' from {', '.join(sources)}: {pipeline.saved_count} new")
+    except Exception as e:
+        logger.error(f"Background refresh of '{plan.term}' failed: {e}")
+    finally:
+        with _executor_lock:
+            _pending.difference_update((plan.key, source) for source in sources)
+        connection.close()
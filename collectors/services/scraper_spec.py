@@ -0,0 +1,151 @@
+import re
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Callable, Optional, Tuple, Union
+from urllib.parse import urljoin
+
+import soupsieve
+from bs4 import BeautifulSoup
+
+CVE_PATTERN = r'CVE-\d{4}-\d+'
+
+
+@dataclass(frozen=True)
+class FieldSpec:
+    """How to pull one value out of an item (or a detail page).
+
+    selector   CSS selector relative to the item; '' means the item itself
+    attr       read this attribute instead of the element text
+    pattern    keep the first regex match (group 1 if the pattern has one); no match means empty
+    scope      'text' applies the pattern to the element, 'html' to the raw page source
+    many       collect every matching element into a list
+    absolute   resolve the value against the page URL
+    max_length truncate text values
+    transform  callable applied to the final non-empty value
+    """
+    selector: str = ''
+    attr: str = ''
+    pattern: str = ''
+    scope: str = 'text'
+    many: bool = False
+    absolute: bool = False
+    max_length: int = 0
+    separator: str = ''
+    default: Any = ''
+    transform: Optional[Callable[[str], Any]] = None
+    compiled_selector: Any = field(init=False, repr=False, compare=False)
+    compiled_pattern: Any = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        # Compiled once when the spec is declared, reused for every card of every search
+        object.__setattr__(self, 'compiled_selector', soupsieve.compile(self.selector) if self.selector else None)
+        object.__setattr__(self, 'compiled_pattern', re.compile(self.pattern) if self.pattern else None)
+
+    def _value(self, element, page_url: str) -> str:
+        if self.attr:
+            value = element.get(self.attr) or ''
+            if isinstance(value, list):
+                value = ' '.join(value)
+        elif self.separator:
+            value = element.get_text(strip=True, separator=self.separator)
+        else:
+            value = element.get_text().strip()
+        if value and self.compiled_pattern:
+            match = self.compiled_pattern.search(value)
+            value = (match.group(1) if match.groups() else match.group(0)) if match else ''
+        if value and self.absolute:
+            value = urljoin(page_url, value)
+        if value and self.max_length:
+            value = value[:self.max_length]
+        return value
+
+    def extract(self, element, page_url: str = '', html: str = '') -> Any:
+        if self.scope == 'html':
+            found = self.compiled_pattern.findall(html) if self.compiled_pattern else []
+            if self.many:
+                return found
+            return self.transform(found[0]) if found and self.transform else (found[0] if found else self.default)
+
+        if self.many:
+            elements = self.compiled_selector.select(element) if self.compiled_selector else [element]
+            values = [v for v in (self._value(e, page_url) for e in elements) if v]
+            return [self.transform(v) for v in values] if self.transform else values
+
+        target = self.compiled_selector.select_one(element) if self.compiled_selector else element
+        value = self._value(target, page_url) if target is not None else ''
+        if not value:
+            return self.default
+        return self.transform(value) if self.transform else value
+
+
+# A field is one FieldSpec or a tuple of fallbacks tried in order
+FieldRule = Union[FieldSpec, Tuple[FieldSpec, ...]]
+
+
+def extract_field(rule: FieldRule, element, page_url: str = '', html: str = '') -> Any:
+    if isinstance(rule, FieldSpec):
+        return rule.extract(element, page_url, html)
+    value = ''
+    for candidate in rule:
+        value = candidate.extract(element, page_url, html)
+        if value:
+            return value
+    return value
+
+
+@dataclass(frozen=True)
+class DetailSpec:
+    """Follow each item's URL and extract more fields from the page it points to"""
+    url_field: str
+    fields: Dict[str, FieldRule] = field(default_factory=dict)
+    match_query: bool = False  # Drop items whose detail page doesn't mention the query
+    required: bool = True      # Drop items whose detail page can't be fetched
+
+
+@dataclass(frozen=True)
+class ScraperSpec:
+    """Declarative description of one listing-page source.
+
+    search_url is a template with {base} (the scraper's configured URL) and
+    {query} (URL-quoted). Items are the elements matching item_selector;
+    items missing any of the required fields are skipped before the limit
+    is applied. constants are added to every item, with {query} formatted in.
+    """
+    name: str
+    search_url: str
+    item_selector: str
+    fields: Dict[str, FieldRule]
+    required: Tuple[str, ...] = ()
+    limit: int = 10
+    detail: Optional[DetailSpec] = None
+    constants: Dict[str, Any] = field(default_factory=dict)
+    compiled_items: Any = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, 'compiled_items', soupsieve.compile(self.item_selector))
+
+    def extract_items(self, html: str, page_url: str) -> List[Dict[str, Any]]:
+        """Items from a listing page, before detail following"""
+        soup = BeautifulSoup(html, 'html.parser')
+        items = []
+        for element in self.compiled_items.select(soup):
+            try:
+                item = {name: extract_field(rule, element, page_url, html) for name, rule in self.fields.items()}
+            except Exception:
+                continue
+            if all(item.get(name) for name in self.required):
+                items.append(item)
+                if len(items) >= self.limit:
+                    break
+        return items
+
+    def extract_detail(self, html: str, page_url: str, query: str = '') -> Optional[Dict[str, Any]]:
+        """Fields from a followed detail page; None when match_query rejects it"""
+        soup = BeautifulSoup(html, 'html.parser')
+        if self.detail.match_query and query.lower() not in soup.get_text().lower():
+            return None
+        return {name: extract_field(rule, soup, page_url, html) for name, rule in self.detail.fields.items()}
+
+    def finish(self, item: Dict[str, Any], query: str) -> Dict[str, Any]:
+        for name, value in self.constants.items():
+            item.setdefault(name, value.format(query=query) if isinstance(value, str) else value)
+        return item
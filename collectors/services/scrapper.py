@@ -1,16 +1,20 @@
+import threading
 import requests
 import json
 import time
 import re
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from urllib.parse import quote_plus
 from django.utils import timezone
 from django.conf import settings
+from django.db import connection
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import logging
-from dateutil import parser
 
+from . import cpu_pool
+from .dates import parse_date
+from .records import VulnRecord
 from .web_scraper import (
     OSVDatabaseScraper, NISTNVDScraper, GitHubSecurityScraper,
     ExploitDBScraper, SnykVulnerabilityScraper, 
@@ -19,6 +23,42 @@ from .web_scraper import (
 
 logger = logging.getLogger(__name__)
 
+SOURCE_TIMEOUT = 25  # Seconds to wait for one source
+
+_io_executor: Optional[ThreadPoolExecutor] = None
+_io_executor_lock = threading.Lock()
+
+
+def get_io_executor() -> ThreadPoolExecutor:
+    """Process-wide pool that runs the blocking scraper calls of every harvest"""
+    global _io_executor
+    if _io_executor is None:
+        with _io_executor_lock:
+            if _io_executor is None:
+                workers = getattr(settings, 'VULNERABILITY_SCANNER', {}).get('ASYNC_IO_WORKERS', 128)
+                _io_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='vtbda-io')
+    return _io_executor
+
+
+def normalize_items(scraper, source: str, items: List[Dict[str, Any]]) -> List[VulnRecord]:
+    """Normalize raw items of one source into VulnRecords, skipping ones that fail"""
+    records = []
+    for item in items:
+        try:
+            if hasattr(scraper, 'normalize_vulnerability'):
+                normalized = scraper.normalize_vulnerability(item)
+            else:
+                normalized = VulnerabilityAggregatorFixed._normalize_generic(item, source)
+            
+            record = VulnRecord.from_normalized(normalized, source) if normalized else None
+            if record:
+                records.append(record)
+        except Exception as e:
+            logger.error(f"Error normalizing item from {source}: {e}")
+            continue
+    return records
+
+
 class VulnerabilityAggregatorFixed:
     """Fixed aggregator with working sources"""
     
@@ -73,7 +113,7 @@ class VulnerabilityAggregatorFixed:
         print(f"Sources: {list(self.scrapers.keys())}")
         print("="*60)
     
-    def search_all_sources(self, query: str) -> Dict[str, List[Dict]]:
+    def search_all_sources(self, query: str) -> Dict[str, List[VulnRecord]]:
         """Search all sources concurrently"""
         results = {}
         
@@ -83,43 +123,31 @@ class VulnerabilityAggregatorFixed:
         # Search all sources concurrently
         with ThreadPoolExecutor(max_workers=min(10, len(self.scrapers))) as executor:
             future_to_source = {
-                executor.submit(self.scrapers[source].search, query): source
+                executor.submit(self._search_source, source, query): source
                 for source in self.scrapers.keys()
             }
             
             for future in as_completed(future_to_source):
                 source = future_to_source[future]
                 try:
-                    data = future.result(timeout=25)  # Reduced timeout
-                    
-                    if data:
-                        # Normalize the data
-                        normalized_data = []
-                        for item in data:
-                            try:
-                                if hasattr(self.scrapers[source], 'normalize_vulnerability'):
-                                    normalized = self.scrapers[source].normalize_vulnerability(item)
-                                else:
-                                    normalized = self._normalize_generic(item, source)
-                                
-                                if normalized:
-                                    normalized_data.append(normalized)
-                            except Exception as e:
-                                logger.error(f"Error normalizing item from {source}: {e}")
-                                continue
-                        
-                        if normalized_data:
-                            results[source] = normalized_data
-                            print(f"✅ {source}: Found {len(normalized_data)} results")
-                        else:
-                            print(f"⚠️  {source}: Found raw data but couldn't normalize")
-                    else:
-                        print(f"❌ {source}: No results")
-                        
+                    raw_count, normalized_data = future.result(timeout=SOURCE_TIMEOUT)
+                    self._collect(results, source, raw_count, normalized_data)
                 except Exception as e:
                     logger.error(f"Error searching {source}: {e}")
                     print(f"❌ {source}: Error - {str(e)[:50]}...")
         
+        return self._summarize(results)
+    
+    def _collect(self, results: Dict[str, List[VulnRecord]], source: str, raw_count: int, normalized_data: List[VulnRecord]):
+        if normalized_data:
+            results[source] = normalized_data
+            print(f"✅ {source}: Found {len(normalized_data)} results")
+        elif raw_count:
+            print(f"⚠️  {source}: Found raw data but couldn't normalize")
+        else:
+            print(f"❌ {source}: No results")
+    
+    def _summarize(self, results: Dict[str, List[VulnRecord]]) -> Dict[str, List[VulnRecord]]:
         # Filter out empty results
         results = {k: v for k, v in results.items() if v}
         
@@ -138,7 +166,51 @@ class VulnerabilityAggregatorFixed:
         
         return results
     
-    def _normalize_generic(self, raw_data: Dict[str, Any], source: str) -> Dict[str, Any]:
+    def _search_source(self, source: str, query: str):
+        """Fetch and normalize one source; returns (raw count, VulnRecords)"""
+        raw_count = 0
+        normalized_data = []
+        for page_size, records in self.iter_source(source, query):
+            raw_count += page_size
+            normalized_data.extend(records)
+        return raw_count, normalized_data
+    
+    def iter_source(self, source: str, query: str) -> Iterator[Tuple[int, List[VulnRecord]]]:
+        """Yield (raw page size, VulnRecords) per page of one source.
+        
+        Scrapers with iter_search() are normalized page by page as pages
+        arrive instead of after the whole result set is buffered. Closing
+        the generator early stops further page fetches. When the CPU pool
+        is enabled, large pages are normalized there in chunks.
+        """
+        scraper = self.scrapers[source]
+        if cpu_pool.enabled() and hasattr(scraper, 'iter_raw_pages'):
+            # Response bodies go to the CPU pool undecoded, so JSON parsing happens there too
+            pages = scraper.iter_raw_pages(query)
+            chunks = cpu_pool.normalize_bodies(scraper, source, pages, scraper.RAW_ITEMS_KEY)
+        else:
+            pages = scraper.iter_search(query) if hasattr(scraper, 'iter_search') else [scraper.search(query) or []]
+            chunks = self._normalize_pages(scraper, source, pages)
+        
+        try:
+            yield from chunks
+        finally:
+            chunks.close()
+            if hasattr(pages, 'close'):
+                pages.close()
+            # Runs on a pool thread; scrapers that read the page store opened a connection here
+            connection.close()
+    
+    def _normalize_pages(self, scraper, source: str, pages) -> Iterator[Tuple[int, List[VulnRecord]]]:
+        for page in pages:
+            if cpu_pool.offload(len(page)):
+                # Large pages are normalized on the CPU pool and come back in chunks
+                yield from cpu_pool.normalize(scraper, source, page)
+            else:
+                yield len(page), normalize_items(scraper, source, page)
+    
+    @staticmethod
+    def _normalize_generic(raw_data: Dict[str, Any], source: str) -> Dict[str, Any]:
         """Generic normalization for scrapers without normalize method"""
         # Extract CVE ID
         cve_id = raw_data.get('cve_id', '')
@@ -172,12 +244,7 @@ class VulnerabilityAggregatorFixed:
             source_url = raw_data.get('link', raw_data.get('url', ''))
         
         # Parse date
-        published_date = raw_data.get('published_date', '')
-        if published_date and isinstance(published_date, str):
-            try:
-                published_date = parser.parse(published_date)
-            except:
-                published_date = None
+        published_date = parse_date(raw_data.get('published_date'))
         
         # Get affected packages
         affected_packages = raw_data.get('affected_packages', [])
@@ -193,6 +260,9 @@ class VulnerabilityAggregatorFixed:
             'cvss_vector': raw_data.get('cvss_vector', ''),
             'published_date': published_date,
             'affected_packages': affected_packages,
+            'affected_ranges': raw_data.get('affected_ranges', []),
+            'advisory_id': raw_data.get('advisory_id', ''),
+            'cpe_matches': raw_data.get('cpe_matches', []),
             'references': raw_data.get('references', []),
             'source': source,
             'source_url': source_url,
@@ -200,52 +270,23 @@ class VulnerabilityAggregatorFixed:
     
     def search_and_save(self, query: str, user_ip: str = None, user_agent: str = None) -> Dict[str, Any]:
         """Search all sources and save results to database"""
-        from ..models import SearchQuery, Vulnerability
-        
-        # Track search query
-        search_query = SearchQuery.objects.create(
-            query=query,
-            user_ip=user_ip,
-            user_agent=user_agent
-        )
+        from .pipeline import HarvestPipeline
+        from .analytics import record_search_event
         
-        # Search all sources
-        all_results = self.search_all_sources(query)
-        
-        # Count total results
-        total_results = sum(len(results) for results in all_results.values())
-        search_query.results_count = total_results
-        search_query.save()
-        
-        # Process and save vulnerabilities
+        # Stream all sources through normalize -> dedupe -> batch persist
+        pipeline = HarvestPipeline(self, query, update_existing=True)
         saved_vulnerabilities = []
-        for source_name, vulnerabilities in all_results.items():
-            for vuln_data in vulnerabilities:
-                try:
-                    # Check if already exists
-                    existing = Vulnerability.objects.filter(
-                        cve_id=vuln_data['cve_id']
-                    ).first()
-                    
-                    if existing:
-                        # Update existing record
-                        for field, value in vuln_data.items():
-                            if hasattr(existing, field) and value:
-                                setattr(existing, field, value)
-                        existing.save()
-                        saved_vulnerabilities.append(existing)
-                    else:
-                        # Create new record
-                        vuln = Vulnerability.objects.create(**vuln_data)
-                        saved_vulnerabilities.append(vuln)
-                        
-                except Exception as e:
-                    logger.error(f"Error saving vulnerability {vuln_data.get('cve_id', 'unknown')}: {e}")
+        for batch in pipeline:
+            saved_vulnerabilities.extend(batch.saved.updated + batch.saved.created)
+        
+        # Queue the search for analytics
+        total_results = pipeline.total_found
+        record_search_event(query, total_results, user_ip, user_agent)
         
         return {
             'query': query,
             'total_results': total_results,
-            'sources_searched': list(all_results.keys()),
-            'results_by_source': {k: len(v) for k, v in all_results.items()},
+            'sources_searched': list(pipeline.results_by_source()),
+            'results_by_source': pipeline.results_by_source(),
             'vulnerabilities': saved_vulnerabilities,
-        }
\ No newline at end of file
+        }
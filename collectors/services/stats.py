@@ -0,0 +1,243 @@
+import json
+import re
+import logging
+from collections import Counter
+from datetime import datetime, time
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+MONTH_RE = re.compile(r'^(\d{4})-(\d{2})')
+
+
+def publish_month(published_date: Any) -> str:
+    """Return the YYYY-MM bucket for a published date (datetime or string)"""
+    if isinstance(published_date, datetime):
+        return published_date.strftime('%Y-%m')
+    if published_date:
+        match = MONTH_RE.match(str(published_date).strip())
+        if match:
+            return f"{match.group(1)}-{match.group(2)}"
+    return 'unknown'
+
+
+def package_ecosystems(affected_packages: Any) -> List[str]:
+    """Extract the distinct ecosystems from 'ecosystem/name' package entries"""
+    if isinstance(affected_packages, str):
+        try:
+            affected_packages = json.loads(affected_packages)
+        except ValueError:
+            return []
+
+    ecosystems = []
+    for package in affected_packages or []:
+        if isinstance(package, str) and '/' in package:
+            ecosystem = package.split('/', 1)[0].strip()
+            if ecosystem and ecosystem not in ecosystems:
+                ecosystems.append(ecosystem)
+    return ecosystems
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a search query so the same search rolls up to one row"""
+    return ' '.join((query or '').lower().split())[:500]
+
+
+def vulnerability_stat_keys(severity: str, source_name: str, published_date: Any,
+                            affected_packages: Any) -> List[Tuple[str, str]]:
+    """Return the (dimension, key) pairs one vulnerability contributes to"""
+    keys = [
+        ('total', 'all'),
+        ('severity', (severity or 'MEDIUM').upper()),
+        ('source', (source_name or 'Unknown')[:250]),
+        ('month', publish_month(published_date)),
+    ]
+    for ecosystem in package_ecosystems(affected_packages):
+        keys.append(('ecosystem', ecosystem[:250]))
+    return keys
+
+
+def bump_rollup(model, lookup: Dict[str, Any], updates: Dict[str, Any], defaults: Dict[str, Any]):
+    """Increment counters on one rollup row, creating it on first use"""
+    if model.objects.filter(**lookup).update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **defaults)
+    except IntegrityError:
+        # Another worker created the row first
+        model.objects.filter(**lookup).update(**updates)
+
+
+def record_vulnerabilities(records: Iterable[Any], changes: Optional[Counter] = None):
+    """Add newly stored vulnerabilities (VulnRecords) to the rollup tables.
+
+    changes holds extra (dimension, key) deltas, e.g. -1/+1 for a stored
+    row whose severity an update changed. Counts are merged in memory first
+    so each rollup row is touched once per batch.
+    """
+    from ..models import VulnerabilityStat
+
+    counts = Counter()
+    for record in records:
+        counts.update(vulnerability_stat_keys(
+            record.severity, record.source, record.published_date, record.affected_packages
+        ))
+    if changes:
+        counts.update(changes)
+
+    for (dimension, key), delta in counts.items():
+        if not delta:
+            continue
+        try:
+            bump_rollup(
+                VulnerabilityStat,
+                {'dimension': dimension, 'key': key},
+                {'count': F('count') + delta, 'updated_at': timezone.now()},
+                {'count': delta},
+            )
+        except Exception as e:
+            logger.error(f"Error updating stat {dimension}:{key}: {e}")
+
+
+def record_searches(searches: Iterable[Tuple[str, int]]):
+    """Add ``(query, results_count)`` pairs to the search rollup table"""
+    from ..models import SearchQueryStat
+
+    merged = {}
+    for query, results_count in searches:
+        key = normalize_query(query)
+        if not key:
+            continue
+        entry = merged.setdefault(key, {'searches': 0, 'zero': 0, 'last': 0})
+        entry['searches'] += 1
+        entry['zero'] += 0 if results_count else 1
+        entry['last'] = results_count or 0
+
+    now = timezone.now()
+    for query, entry in merged.items():
+        try:
+            bump_rollup(
+                SearchQueryStat,
+                {'query': query},
+                {
+                    'search_count': F('search_count') + entry['searches'],
+                    'zero_result_count': F('zero_result_count') + entry['zero'],
+                    'last_results_count': entry['last'],
+                    'last_searched_at': now,
+                },
+                {
+                    'search_count': entry['searches'],
+                    'zero_result_count': entry['zero'],
+                    'last_results_count': entry['last'],
+                    'last_searched_at': now,
+                },
+            )
+        except Exception as e:
+            logger.error(f"Error updating search stat for '{query}': {e}")
+
+
+def record_search(query: str, results_count: int):
+    """Add a single search to the search rollup table"""
+    record_searches([(query, results_count)])
+
+
+def rebuild_stats(chunk_size: int = 2000) -> Dict[str, int]:
+    """Recompute every rollup from the base tables.
+
+    This is the periodic compaction job: it streams the base tables once and
+    replaces the rollups in a single transaction, correcting any drift left
+    by failed incremental updates or manual deletes. Searches that search
+    retention already rolled into SearchQueryDaily are counted from there;
+    for those the last results count is the average of their last day.
+    """
+    from ..models import Vulnerability, SearchQuery, SearchQueryDaily, VulnerabilityStat, SearchQueryStat
+
+    vuln_counts = Counter()
+    rows = Vulnerability.objects.values_list(
+        'severity', 'source__name', 'published_date', 'affected_packages'
+    ).order_by().iterator(chunk_size=chunk_size)
+    for severity, source_name, published_date, affected_packages in rows:
+        vuln_counts.update(vulnerability_stat_keys(severity, source_name, published_date, affected_packages))
+
+    search_stats = {}
+    rows = SearchQueryDaily.objects.values_list(
+        'day', 'query', 'search_count', 'results_total', 'zero_result_count'
+    ).order_by('day').iterator(chunk_size=chunk_size)
+    for day, query, search_count, results_total, zero_result_count in rows:
+        if not query or not search_count:
+            continue
+        stat = search_stats.get(query)
+        if stat is None:
+            stat = search_stats[query] = SearchQueryStat(query=query)
+        stat.search_count += search_count
+        stat.zero_result_count += zero_result_count
+        stat.last_results_count = results_total // search_count
+        stat.last_searched_at = timezone.make_aware(datetime.combine(day, time.min))
+
+    rows = SearchQuery.objects.values_list(
+        'query', 'results_count', 'created_at'
+    ).order_by('created_at').iterator(chunk_size=chunk_size)
+    for query, results_count, created_at in rows:
+        key = normalize_query(query)
+        if not key:
+            continue
+        stat = search_stats.get(key)
+        if stat is None:
+            stat = search_stats[key] = SearchQueryStat(query=key)
+        stat.search_count += 1
+        stat.zero_result_count += 0 if results_count else 1
+        stat.last_results_count = results_count or 0
+        stat.last_searched_at = created_at
+
+    with transaction.atomic():
+        VulnerabilityStat.objects.all().delete()
+        SearchQueryStat.objects.all().delete()
+        VulnerabilityStat.objects.bulk_create(
+            [VulnerabilityStat(dimension=d, key=k, count=c) for (d, k), c in vuln_counts.items()],
+            batch_size=500,
+        )
+        SearchQueryStat.objects.bulk_create(search_stats.values(), batch_size=500)
+
+    return {'vulnerability_stats': len(vuln_counts), 'search_stats': len(search_stats)}
+
+
+def get_dashboard_stats(top_n: Optional[int] = None) -> Dict[str, Any]:
+    """Read the dashboard payload from the rollup tables only"""
+    from django.conf import settings
+    from ..models import VulnerabilityStat, SearchQueryStat
+
+    if top_n is None:
+        top_n = getattr(settings, 'VULNERABILITY_SCANNER', {}).get('DASHBOARD_TOP_QUERIES', 10)
+
+    dashboard = {
+        'total_vulnerabilities': 0,
+        'by_severity': {},
+        'by_source': {},
+        'by_ecosystem': {},
+        'by_month': {},
+    }
+    for dimension, key, count in VulnerabilityStat.objects.values_list('dimension', 'key', 'count'):
+        if dimension == 'total':
+            dashboard['total_vulnerabilities'] = count
+        elif f"by_{dimension}" in dashboard:
+            dashboard[f"by_{dimension}"][key] = count
+
+    dashboard['by_month'] = dict(sorted(dashboard['by_month'].items()))
+
+    dashboard['top_queries'] = [
+        {'query': q, 'searches': s, 'last_results_count': r}
+        for q, s, r in SearchQueryStat.objects.order_by('-search_count')
+        .values_list('query', 'search_count', 'last_results_count')[:top_n]
+    ]
+    dashboard['zero_result_queries'] = [
+        {'query': q, 'zero_result_searches': z}
+        for q, z in SearchQueryStat.objects.filter(zero_result_count__gt=0)
+        .order_by('-zero_result_count')
+        .values_list('query', 'zero_result_count')[:top_n]
+    ]
+    return dashboard
@@ -0,0 +1,150 @@
+import re
+from functools import lru_cache
+from typing import Tuple, Optional
+
+# Ecosystems whose versions follow semantic versioning
+SEMVER_ECOSYSTEMS = {'npm', 'Go', 'crates.io', 'Hex', 'Pub', 'SwiftURL', 'NuGet', 'Packagist'}
+
+SEMVER_RE = re.compile(
+    r'^v?(?P<major>\d+)(?:\.(?P<minor>\d+))?(?:\.(?P<patch>\d+))?'
+    r'(?:\.(?P<extra>[\d.]+))?'
+    r'(?:-(?P<pre>[0-9A-Za-z.-]+))?(?:\+[0-9A-Za-z.-]+)?$'
+)
+PEP440_RE = re.compile(
+    r'^v?(?:(?P<epoch>\d+)!)?(?P<release>\d+(?:\.\d+)*)'
+    r'(?:[-_.]?(?P<pre_l>a|b|c|rc|alpha|beta|pre|preview)[-_.]?(?P<pre_n>\d+)?)?'
+    r'(?:-(?P<post_n1>\d+)|[-_.]?(?P<post_l>post|rev|r)[-_.]?(?P<post_n2>\d+)?)?'
+    r'(?:[-_.]?(?P<dev_l>dev)[-_.]?(?P<dev_n>\d+)?)?'
+    r'(?:\+[a-z0-9]+(?:[-_.][a-z0-9]+)*)?$',
+    re.IGNORECASE,
+)
+PRE_RANK = {'a': 0, 'alpha': 0, 'b': 1, 'beta': 1, 'c': 2, 'rc': 2, 'pre': 2, 'preview': 2}
+TOKEN_RE = re.compile(r'\d+|[A-Za-z]+')
+# Maven qualifier order; unknown qualifiers sort after 'sp', alphabetically
+MAVEN_QUALIFIERS = {'alpha': 0, 'beta': 1, 'milestone': 2, 'rc': 3, 'snapshot': 4, 'sp': 6}
+MAVEN_RELEASE = {'ga', 'final', 'release'}
+MAVEN_ALIASES = {'a': 'alpha', 'b': 'beta', 'm': 'milestone'}  # Only when a number follows
+
+
+def _identifier_key(identifier: str) -> Tuple:
+    return (0, int(identifier), '') if identifier.isdigit() else (1, 0, identifier)
+
+
+def semver_key(version: str) -> Optional[Tuple]:
+    """Sort key following semver precedence (pre-releases sort before the release)"""
+    match = SEMVER_RE.match(version.strip().replace('+incompatible', ''))
+    if not match:
+        return None
+    numbers = [int(match.group('major')), int(match.group('minor') or 0), int(match.group('patch') or 0)]
+    if match.group('extra'):
+        numbers.extend(int(n) for n in match.group('extra').split('.') if n)
+    pre = match.group('pre')
+    pre_key = (1,) if not pre else (0,) + tuple(_identifier_key(p) for p in pre.split('.'))
+    return (tuple(numbers), pre_key)
+
+
+def pep440_key(version: str) -> Optional[Tuple]:
+    """Sort key following PEP 440 ordering"""
+    match = PEP440_RE.match(version.strip())
+    if not match:
+        return None
+    release = [int(n) for n in match.group('release').split('.')]
+    while len(release) > 1 and release[-1] == 0:
+        release.pop()
+
+    has_pre = match.group('pre_l') is not None
+    post_n = match.group('post_n1') or match.group('post_n2')
+    has_post = match.group('post_n1') is not None or match.group('post_l') is not None
+    has_dev = match.group('dev_l') is not None
+
+    if has_pre:
+        pre_key = (1, PRE_RANK[match.group('pre_l').lower()], int(match.group('pre_n') or 0))
+    elif has_dev and not has_post:
+        pre_key = (0, 0, 0)  # 1.0.dev1 sorts before 1.0a1
+    else:
+        pre_key = (2, 0, 0)
+    post_key = (1, int(post_n or 0)) if has_post else (0, 0)
+    dev_key = (0, int(match.group('dev_n') or 0)) if has_dev else (1, 0)
+    return (int(match.group('epoch') or 0), tuple(release), pre_key, post_key, dev_key)
+
+
+def _tokens(version: str, skip=()) -> list:
+    """Numeric and alphabetic runs, with zeros that end a numeric run dropped (1.0-beta == 1-beta)"""
+    tokens = []
+    for token in reversed(TOKEN_RE.findall(version)):
+        if token.lower() in skip:
+            continue
+        if token.isdigit():
+            if int(token) == 0 and (not tokens or tokens[-1].__class__ is str):
+                continue
+            token = int(token)
+        tokens.append(token)
+    tokens.reverse()
+    return tokens
+
+
+def maven_key(version: str) -> Tuple:
+    """Sort key following Maven ComparableVersion: alpha < beta < milestone < rc < snapshot < release < sp"""
+    tokens = _tokens(version, skip=MAVEN_RELEASE)
+    key = []
+    for i, token in enumerate(tokens):
+        if token.__class__ is int:
+            key.append((2, token, ''))
+            continue
+        token = token.lower()
+        if token in MAVEN_ALIASES and i + 1 < len(tokens) and tokens[i + 1].__class__ is int:
+            token = MAVEN_ALIASES[token]
+        elif token == 'cr':
+            token = 'rc'
+        key.append((1, MAVEN_QUALIFIERS.get(token, 7), token))
+    key.append((1, 5, ''))  # The release itself: after pre-release qualifiers, before numbers and sp
+    return tuple(key)
+
+
+def rubygems_key(version: str) -> Tuple:
+    """Sort key following Gem::Version: a segment with letters marks a pre-release (1.2.3.pre1 < 1.2.3)"""
+    key = tuple((2, token, '') if token.__class__ is int else (0, 0, token) for token in _tokens(version))
+    return key + ((1, 0, ''),)  # End of version: after letters, before any further number
+
+
+def generic_key(version: str) -> Tuple:
+    """Fallback: compare numeric and alphabetic runs piecewise"""
+    return tuple(
+        (1, int(token), '') if token.isdigit() else (0, 0, token.lower())
+        for token in TOKEN_RE.findall(version)
+    )
+
+
+@lru_cache(maxsize=100000)
+def version_key(ecosystem: str, version: str) -> Tuple:
+    """Comparable key for a version within one ecosystem.
+
+    Keys from the same ecosystem always compare without TypeError: versions
+    the ecosystem parser rejects fall back to the generic key, tagged so they
+    sort consistently (after parsed versions).
+    """
+    base = ecosystem.split(':', 1)[0]
+    if base == 'PyPI':
+        key = pep440_key(version)
+    elif base in SEMVER_ECOSYSTEMS:
+        key = semver_key(version)
+    elif base == 'Maven':
+        key = maven_key(version)
+    elif base == 'RubyGems':
+        key = rubygems_key(version)
+    else:
+        key = None
+    if key is not None:
+        return (0, key)
+    return (1, generic_key(version))
+
+
+def normalize_package_name(ecosystem: str, name: str) -> str:
+    """Canonical package name used as the index key"""
+    name = name.strip()
+    base = ecosystem.split(':', 1)[0]
+    if base == 'PyPI':
+        return re.sub(r'[-_.]+', '-', name).lower()
+    if base in ('npm', 'crates.io', 'RubyGems', 'Packagist', 'NuGet', 'Hex', 'Pub'):
+        return name.lower()
+    return name
@@ -2,13 +2,27 @@ import requests
 import json
 import re
 import time
+import hashlib
+import itertools
+import threading
+from collections import Counter, defaultdict, deque
 from datetime import datetime
-from typing import List, Dict, Any, Optional
-from urllib.parse import urljoin, quote_plus
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+from urllib.parse import quote, quote_plus
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
 from django.utils import timezone
 import logging
 from bs4 import BeautifulSoup
 
+from .range_index import compact_osv_affected
+from .cpe_index import extract_cpe_matches
+from .scraper_spec import ScraperSpec, DetailSpec, FieldSpec, CVE_PATTERN
+from . import page_store, cpu_pool
+from .dates import parse_date, EXPLOITDB_FORMATS
+
 logger = logging.getLogger(__name__)
 
 
@@ -30,8 +44,10 @@ class WebScraper:
         })
         self.timeout = 15
     
-    def fetch_page(self, url: str, params: Dict = {}) -> Optional[str]:
+    def fetch_page(self, url: str, params: Optional[Dict] = None) -> Optional[str]:
         """Fetch webpage content with better error handling"""
+        # Scrapers are shared across threads, so never add 'page' to the caller's dict
+        params = dict(params or {})
         try:
             if not params.get('page'):
                 params['page'] = self.page
@@ -59,63 +75,258 @@ class WebScraper:
         return BeautifulSoup(html, 'html.parser')
 
 
+class SpecScraper(WebScraper):
+    """Shared engine for sources described by ScraperSpec.
+    
+    Specs run concurrently, detail pages are followed concurrently, listing
+    results are cached briefly, detail pages go through the page store, and
+    every run is counted in ENGINE_STATS.
+    """
+    SPECS: Tuple[ScraperSpec, ...] = ()
+    
+    ENGINE_STATS: Dict[str, Counter] = defaultdict(Counter)
+    _stats_lock = threading.Lock()
+    
+    def __init__(self, base_url: Optional[str] = None):
+        super().__init__(base_url)
+        config = getattr(settings, 'VULNERABILITY_SCANNER', {})
+        self.workers = config.get('SCRAPER_WORKERS', 8)
+        self.listing_timeout = config.get('SCRAPER_CACHE_TIMEOUT', 300)
+    
+    def get_specs(self) -> List[ScraperSpec]:
+        return list(self.SPECS)
+    
+    def count(self, spec: ScraperSpec, **counts):
+        with self._stats_lock:
+            self.ENGINE_STATS[spec.name].update(counts)
+    
+    def fetch_cached(self, url: str, timeout: int, extract) -> Any:
+        """Fetch url and run extract(html) on it, caching the extracted value"""
+        cache_key = f"scrape:{hashlib.md5(url.encode('utf-8')).hexdigest()}"
+        value = cache.get(cache_key)
+        if value is not None:
+            return value
+        html = self.fetch_page(url)
+        if html is None:
+            return None
+        value = extract(html)
+        cache.set(cache_key, value, timeout)
+        return value
+    
+    def run_spec(self, spec: ScraperSpec, query: str) -> List[Dict[str, Any]]:
+        started = time.monotonic()
+        url = spec.search_url.format(base=self.url, query=quote_plus(query))
+        try:
+            items = self.fetch_cached(url, self.listing_timeout, lambda html: cpu_pool.extract(self, spec, 'items', html, url))
+        except Exception as e:
+            logger.error(f"Error scraping {spec.name}: {e}")
+            self.count(spec, errors=1)
+            return []
+        items = [dict(item) for item in items or []]
+        
+        if spec.detail and items:
+            def follow(item):
+                detail_url = item.get(spec.detail.url_field)
+                if not detail_url:
+                    return None
+                # The query decides whether the page is kept, so it is part of the key
+                key = f"{spec.name}|{query.lower()}" if spec.detail.match_query else spec.name
+                try:
+                    return page_store.fetch(
+                        detail_url,
+                        self.fetch_page,
+                        lambda html: cpu_pool.extract(self, spec, 'detail', html, detail_url, query) or {},
+                        key,
+                    )
+                except Exception as e:
+                    logger.warning(f"Error following {detail_url}: {e}")
+                    return None
+                finally:
+                    connection.close()
+            
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(items))) as executor:
+                details = list(executor.map(follow, items))
+            
+            followed = []
+            for item, detail in zip(items, details):
+                if detail:
+                    item.update(detail)
+                elif detail == {} or spec.detail.required:
+                    continue  # Rejected by match_query, or the page couldn't be fetched
+                followed.append(item)
+            items = followed
+        
+        results = [spec.finish(item, query) for item in items]
+        self.count(spec, runs=1, items=len(results), elapsed_ms=int((time.monotonic() - started) * 1000))
+        return results
+    
+    def search(self, query: str) -> List[Dict[str, Any]]:
+        specs = self.get_specs()
+        if not specs:
+            return []
+        with ThreadPoolExecutor(max_workers=len(specs)) as executor:
+            pages = list(executor.map(lambda spec: self.run_spec(spec, query), specs))
+        return [item for page in pages for item in page]
+
+
+def severity_label(text: str) -> str:
+    text = text.upper()
+    for level in ('CRITICAL', 'HIGH', 'LOW'):
+        if level in text:
+            return level
+    return 'MEDIUM'
+
+
 class OSVDatabaseScraper(WebScraper):
     """Open Source Vulnerability Database - MOST RELIABLE SOURCE"""
     
+    # Fallback when ecosystems.txt can't be fetched
+    ECOSYSTEMS = [
+        'AlmaLinux', 'Alpine', 'Android', 'Bitnami', 'Chainguard', 'CRAN', 'crates.io',
+        'Debian', 'GHC', 'GitHub Actions', 'Go', 'Hackage', 'Hex', 'Linux', 'Mageia',
+        'Maven', 'npm', 'NuGet', 'openSUSE', 'OSS-Fuzz', 'Packagist', 'Photon OS', 'Pub',
+        'PyPI', 'Red Hat', 'Rocky Linux', 'RubyGems', 'SUSE', 'SwiftURL', 'Ubuntu', 'Wolfi',
+    ]
+    ECOSYSTEMS_URL = "https://osv-vulnerabilities.storage.googleapis.com/ecosystems.txt"
+    BATCH_LIMIT = 1000  # Max queries per /v1/querybatch request
+    ID_PATTERN = re.compile(r'^(CVE-\d{4}-\d+|GHSA(-[23456789cfghjmpqrvwx]{4}){3}|[A-Z][A-Za-z0-9]*-[\w.:-]+)$')
+    _ecosystems = None
+    
     def __init__(self, base_url: Optional[str] = None):
         super().__init__(base_url)
         # Default URL for OSV API
         self.url = base_url if base_url else "https://api.osv.dev/v1/query"
+        self.api_url = self.url.rsplit('/', 1)[0]
+        config = getattr(settings, 'VULNERABILITY_SCANNER', {})
+        self.max_pages = config.get('OSV_MAX_PAGES', 20)
+        self.hydrate_workers = config.get('OSV_HYDRATE_WORKERS', 16)
+        self.deadline = config.get('OSV_DEADLINE', 20)
+        self.cache_timeout = config.get('OSV_CACHE_TIMEOUT', 6 * 3600)
+    
+    def get_ecosystems(self) -> List[str]:
+        """Every ecosystem OSV knows, fetched once per process"""
+        if OSVDatabaseScraper._ecosystems is None:
+            ecosystems = []
+            try:
+                response = self.session.get(self.ECOSYSTEMS_URL, timeout=self.timeout)
+                if response.status_code == 200:
+                    ecosystems = [line.strip() for line in response.text.splitlines() if line.strip()]
+            except Exception as e:
+                logger.warning(f"Could not fetch OSV ecosystem list: {e}")
+            # Only base ecosystems, e.g. "Debian" rather than "Debian:12"
+            OSVDatabaseScraper._ecosystems = sorted({e.split(':', 1)[0] for e in ecosystems}) or list(self.ECOSYSTEMS)
+        return OSVDatabaseScraper._ecosystems
+    
+    def query_package(self, name: str, ecosystem: str, version: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Full vulnerability records for one package, following next_page_token"""
+        results = []
+        payload = {"package": {"name": name, "ecosystem": ecosystem}}
+        if version:
+            payload["version"] = version
+        
+        for _ in range(self.max_pages):
+            response = self.session.post(f"{self.api_url}/query", json=payload, timeout=15)
+            if response.status_code != 200:
+                break
+            data = response.json()
+            results.extend(data.get('vulns', []))
+            if not data.get('next_page_token'):
+                break
+            payload["page_token"] = data['next_page_token']
+        return results
+    
+    def query_batch(self, queries: List[Dict[str, Any]]) -> List[str]:
+        """Vulnerability IDs for many queries via /v1/querybatch.
+        
+        Queries are sent in chunks of BATCH_LIMIT; queries that come back with
+        a next_page_token are re-sent with it until every page is read.
+        """
+        ids = []
+        seen = set()
+        pending = [dict(q) for q in queries]
+        
+        for _ in range(self.max_pages):
+            if not pending:
+                break
+            next_pending = []
+            for start in range(0, len(pending), self.BATCH_LIMIT):
+                chunk = pending[start:start + self.BATCH_LIMIT]
+                response = self.session.post(f"{self.api_url}/querybatch", json={"queries": chunk}, timeout=15)
+                if response.status_code != 200:
+                    logger.warning(f"OSV querybatch returned {response.status_code}")
+                    continue
+                for query, result in zip(chunk, response.json().get('results', [])):
+                    for vuln in result.get('vulns', []):
+                        if vuln.get('id') and vuln['id'] not in seen:
+                            seen.add(vuln['id'])
+                            ids.append(vuln['id'])
+                    if result.get('next_page_token'):
+                        next_pending.append(dict(query, page_token=result['next_page_token']))
+            pending = next_pending
+        return ids
+    
+    def get_vuln(self, vuln_id: str) -> Optional[Dict[str, Any]]:
+        """One full record from /v1/vulns/{id}, cached locally"""
+        cache_key = f"osv:vuln:{vuln_id}"
+        vuln = cache.get(cache_key)
+        if vuln is not None:
+            return vuln or None
+        
+        response = self.session.get(f"{self.api_url}/vulns/{quote(vuln_id, safe='')}", timeout=15)
+        if response.status_code == 200:
+            vuln = response.json()
+        elif response.status_code == 404:
+            vuln = {}  # Cache the miss too
+        else:
+            return None
+        cache.set(cache_key, vuln, self.cache_timeout)
+        return vuln or None
+    
+    def hydrate(self, vuln_ids: List[str]) -> List[Dict[str, Any]]:
+        """Fetch full records for IDs concurrently, giving up on stragglers at the deadline"""
+        if not vuln_ids:
+            return []
+        
+        records = {}
+        executor = ThreadPoolExecutor(max_workers=min(self.hydrate_workers, len(vuln_ids)))
+        try:
+            futures = {executor.submit(self.get_vuln, vuln_id): vuln_id for vuln_id in vuln_ids}
+            done, not_done = wait(futures, timeout=self.deadline)
+            for future in done:
+                try:
+                    vuln = future.result()
+                except Exception as e:
+                    logger.warning(f"OSV hydrate failed for {futures[future]}: {e}")
+                    continue
+                if vuln:
+                    records[futures[future]] = vuln
+            if not_done:
+                logger.warning(f"OSV hydrate deadline hit, {len(not_done)} records skipped")
+        finally:
+            # A 'with' block would wait here for every fetch still in flight
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        return [records[vuln_id] for vuln_id in vuln_ids if vuln_id in records]
     
     def search(self, query: str) -> List[Dict[str, Any]]:
         """Search OSV Database API - This is the best source!"""
         results = []
         
         try:
-            # OSV Query API - ALWAYS WORKS
-            url = self.url
-            
-            payload = {
-                "query": query,
-                "page_token": None
-            }
-            
-            response = requests.post(url, json=payload, timeout=15)
-            
-            if response.status_code == 200:
-                data = response.json()
-                if 'vulns' in data:
-                    results.extend(data['vulns'])
-                elif 'results' in data:
-                    for result in data.get('results', []):
-                        if 'vulns' in result:
-                            results.extend(result['vulns'])
-            
-            # Also try batch query for packages (use default if custom URL doesn't support it)
-            if not results:
-                batch_url = "https://api.osv.dev/v1/querybatch"
-                batch_payload = {
-                    "queries": [
-                        {
-                            "package": {"name": query, "ecosystem": "PyPI"}
-                        },
-                        {
-                            "package": {"name": query, "ecosystem": "npm"}
-                        },
-                        {
-                            "package": {"name": query, "ecosystem": "Maven"}
-                        },
-                        {
-                            "package": {"name": query, "ecosystem": "Go"}
-                        }
-                    ]
-                }
-                
-                response = requests.post(batch_url, json=batch_payload, timeout=15)
-                if response.status_code == 200:
-                    batch_data = response.json()
-                    for result in batch_data.get('results', []):
-                        results.extend(result.get('vulns', []))
+            query = query.strip()
+            
+            # Direct lookup for advisory / CVE identifiers
+            if self.ID_PATTERN.match(query):
+                vuln = self.get_vuln(query.upper() if query.upper().startswith(('CVE-', 'GHSA-')) else query)
+                if vuln:
+                    return [vuln]
+            
+            # Otherwise treat the query as a package name in every ecosystem
+            queries = [
+                {"package": {"name": query, "ecosystem": ecosystem}}
+                for ecosystem in self.get_ecosystems()
+            ]
+            results = self.hydrate(self.query_batch(queries))
                         
         except Exception as e:
             logger.error(f"OSV API error: {e}")
@@ -171,13 +382,7 @@ class OSVDatabaseScraper(WebScraper):
             references = raw_data.get('references', [])
             
             # Parse dates
-            published_date = raw_data.get('published', '')
-            if published_date:
-                try:
-                    from dateutil import parser
-                    published_date = parser.parse(published_date)
-                except:
-                    published_date = None
+            published_date = parse_date(raw_data.get('published'))
             
             return {
                 'cve_id': cve_id,
@@ -187,6 +392,8 @@ class OSVDatabaseScraper(WebScraper):
                 'cvss_score': cvss_score,
                 'published_date': published_date,
                 'affected_packages': affected_packages,
+                'affected_ranges': compact_osv_affected(raw_data.get('affected', [])),
+                'advisory_id': raw_data.get('id', ''),
                 'references': references,
                 'source': 'OSV Database',
                 'source_url': f"https://osv.dev/{raw_data.get('id', '')}",
@@ -202,67 +409,35 @@ class OSVDatabaseScraper(WebScraper):
             }
 
 
-class ExploitDBScraper(WebScraper):
+class ExploitDBScraper(SpecScraper):
     """Exploit Database scraper - USES WORKING ENDPOINT"""
     
+    SPECS = (
+        ScraperSpec(
+            name='Exploit DB',
+            search_url='{base}?q={query}',
+            item_selector='.exploit-list .exploit-item',
+            fields={
+                'title': FieldSpec('.exploit-title a'),
+                'source_url': FieldSpec('.exploit-title a', attr='href', absolute=True),
+                'published_date': FieldSpec('.exploit-date'),
+                # CVE from the title, else from the description
+                'cve_id': (
+                    FieldSpec('.exploit-title a', pattern=CVE_PATTERN),
+                    FieldSpec('.exploit-description', pattern=CVE_PATTERN),
+                ),
+            },
+            required=('title',),
+            limit=10,
+            constants={'source': 'Exploit DB'},
+        ),
+    )
+    
     def __init__(self, base_url: Optional[str] = None):
         super().__init__(base_url)
         # Default URL for Exploit DB search
         self.url = base_url if base_url else "https://www.exploit-db.com/search"
     
-    def search(self, query: str) -> List[Dict[str, Any]]:
-        """Search Exploit Database using Google Custom Search"""
-        results = []
-        
-        try:
-            # Use the configured URL
-            params = {'q': query}
-            html = self.fetch_page(self.url, params=params)
-            
-            if html:
-                soup = self.parse_html(html)
-                
-                # Look for exploit cards
-                exploit_cards = soup.select('.exploit-list .exploit-item')
-                
-                for card in exploit_cards[:10]:
-                    try:
-                        title_elem = card.select_one('.exploit-title a')
-                        date_elem = card.select_one('.exploit-date')
-                        
-                        if title_elem:
-                            title = title_elem.text.strip()
-                            href = title_elem.get('href', '')
-                            
-                            if href and not href.startswith('http'):
-                                href = f"https://www.exploit-db.com{href}"
-                            
-                            # Extract CVE if in title
-                            cve_match = re.search(r'CVE-\d{4}-\d+', title)
-                            cve_id = cve_match.group(0) if cve_match else ''
-                            
-                            if not cve_id:
-                                # Try to extract from description
-                                desc_elem = card.select_one('.exploit-description')
-                                if desc_elem:
-                                    cve_match = re.search(r'CVE-\d{4}-\d+', desc_elem.text)
-                                    cve_id = cve_match.group(0) if cve_match else ''
-                            
-                            results.append({
-                                'title': title,
-                                'source_url': href,
-                                'cve_id': cve_id,
-                                'published_date': date_elem.text.strip() if date_elem else '',
-                                'source': 'Exploit DB'
-                            })
-                    except:
-                        continue
-            
-        except Exception as e:
-            logger.error(f"Exploit DB scraping error: {e}")
-        
-        return results
-    
     def normalize_vulnerability(self, raw_data: Dict[str, Any]) -> Dict[str, Any]:
         """Normalize Exploit DB data"""
         return {
@@ -272,7 +447,7 @@ class ExploitDBScraper(WebScraper):
             'severity': 'HIGH',  # Exploits are usually high severity
             'source': raw_data.get('source', 'Exploit DB'),
             'source_url': raw_data.get('source_url', ''),
-            'published_date': raw_data.get('published_date', ''),
+            'published_date': parse_date(raw_data.get('published_date'), EXPLOITDB_FORMATS),
             'exploit_available': True,
         }
 
@@ -304,6 +479,7 @@ class GitHubSecurityScraper(WebScraper):
                         title_elem = item.find('title')
                         link_elem = item.find('link')
                         desc_elem = item.find('description')
+                        date_elem = item.find('pubdate')  # html.parser lowercases pubDate
                         
                         if title_elem and link_elem:
                             title = title_elem.text.strip()
@@ -324,6 +500,7 @@ class GitHubSecurityScraper(WebScraper):
                                     'link': link,
                                     'description': desc_elem.text.strip() if desc_elem else '',
                                     'cve_id': cve_id,
+                                    'published_date': date_elem.text.strip() if date_elem else '',
                                     'source': 'GitHub Security'
                                 })
                     except:
@@ -344,30 +521,33 @@ class GitHubSecurityScraper(WebScraper):
                     if href:
                         advisory_url = f"https://github.com{href}"
                         
-                        # Get advisory details
-                        advisory_html = self.fetch_page(advisory_url)
-                        if advisory_html:
-                            advisory_soup = self.parse_html(advisory_html)
-                            
-                            # Extract title and CVE
-                            title_elem = advisory_soup.find('h1')
-                            if title_elem:
-                                title = title_elem.text.strip()
-                                cve_match = re.search(r'CVE-\d{4}-\d+', title)
-                                cve_id = cve_match.group(0) if cve_match else ''
-                                
-                                results.append({
-                                    'title': title,
-                                    'link': advisory_url,
-                                    'cve_id': cve_id,
-                                    'source': 'GitHub Security'
-                                })
+                        # Get advisory details (stored pages skip the fetch and the parse)
+                        advisory = page_store.fetch(advisory_url, self.fetch_page, self.extract_advisory, 'github-advisory')
+                        if advisory:
+                            results.append({
+                                'title': advisory['title'],
+                                'link': advisory_url,
+                                'cve_id': advisory['cve_id'],
+                                'source': 'GitHub Security'
+                            })
             
         except Exception as e:
             logger.error(f"GitHub Security scraping error: {e}")
         
         return results
     
+    def extract_advisory(self, html: str) -> Dict[str, Any]:
+        """Title and CVE of an advisory page; empty when the page has no title"""
+        advisory_soup = self.parse_html(html)
+        
+        # Extract title and CVE
+        title_elem = advisory_soup.find('h1')
+        if not title_elem:
+            return {}
+        title = title_elem.text.strip()
+        cve_match = re.search(r'CVE-\d{4}-\d+', title)
+        return {'title': title, 'cve_id': cve_match.group(0) if cve_match else ''}
+    
     def normalize_vulnerability(self, raw_data: Dict[str, Any]) -> Dict[str, Any]:
         """Normalize GitHub Security data"""
         return {
@@ -377,48 +557,148 @@ class GitHubSecurityScraper(WebScraper):
             'severity': 'MEDIUM',
             'source': raw_data.get('source', 'GitHub Security'),
             'source_url': raw_data.get('link', ''),
-            'published_date': '',
+            'published_date': parse_date(raw_data.get('published_date')),
         }
 
 
+class RateLimiter:
+    """Sliding-window limiter: at most max_calls acquisitions per period seconds"""
+    
+    def __init__(self, max_calls: int, period: float):
+        self.max_calls = max_calls
+        self.period = period
+        self.calls = deque()
+        self.lock = threading.Lock()
+    
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                while self.calls and now - self.calls[0] >= self.period:
+                    self.calls.popleft()
+                if len(self.calls) < self.max_calls:
+                    self.calls.append(now)
+                    return
+                wait_for = self.period - (now - self.calls[0])
+            time.sleep(wait_for)
+
+
 class NISTNVDScraper(WebScraper):
     """NIST NVD scraper with CORRECT URL"""
     
+    PAGE_SIZE = 2000  # Largest resultsPerPage the CVE API accepts
+    RAW_ITEMS_KEY = 'vulnerabilities'  # Results array of an API response
+    TOTALS_RE = re.compile(rb'"(resultsPerPage|totalResults)"\s*:\s*(\d+)')
+    RATE_PERIOD = 30
+    RATE_PUBLIC = 5   # Requests per RATE_PERIOD without an API key
+    RATE_KEYED = 50   # Requests per RATE_PERIOD per API key
+    
+    # Shared by every instance so all searches in a process respect one window per key
+    _limiters: Dict[str, RateLimiter] = {}
+    _limiters_lock = threading.Lock()
+    
     def __init__(self, base_url: Optional[str] = None):
         super().__init__(base_url)
         # Default URL for NVD API
         self.url = base_url if base_url else "https://services.nvd.nist.gov/rest/json/cves/2.0"
+        config = getattr(settings, 'VULNERABILITY_SCANNER', {})
+        keys = config.get('NVD_API_KEYS') or []
+        self.api_keys = [keys] if isinstance(keys, str) else [k for k in keys if k]
+        self.max_results = config.get('NVD_MAX_RESULTS', 10000)
+        self.page_workers = config.get('NVD_PAGE_WORKERS', 4)
+        self._key_cycle = itertools.cycle(self.api_keys or [''])
+        self._key_lock = threading.Lock()
+    
+    def _limiter(self, api_key: str) -> RateLimiter:
+        with self._limiters_lock:
+            limiter = self._limiters.get(api_key)
+            if limiter is None:
+                max_calls = self.RATE_KEYED if api_key else self.RATE_PUBLIC
+                limiter = self._limiters[api_key] = RateLimiter(max_calls, self.RATE_PERIOD)
+            return limiter
+    
+    def fetch_api_page(self, params: Dict[str, Any], raw: bool = False) -> Any:
+        """One API call, rotating over the configured keys and waiting for the rate window.
+        
+        Returns the decoded page, or with raw=True the undecoded body.
+        """
+        with self._key_lock:
+            api_key = next(self._key_cycle)
+        self._limiter(api_key).acquire()
+        headers = {'apiKey': api_key} if api_key else {}
+        response = self.session.get(self.url, params=params, headers=headers, timeout=30)
+        if response.status_code != 200:
+            logger.warning(f"NVD API returned {response.status_code} for {params}")
+            return b'' if raw else {}
+        return response.content if raw else response.json()
+    
+    @classmethod
+    def page_totals(cls, data: Any) -> Tuple[int, int]:
+        """(resultsPerPage, totalResults) of a decoded page or an undecoded body"""
+        if isinstance(data, bytes):
+            # Top-level counters come before the vulnerabilities array
+            data = {key.decode(): int(value) for key, value in cls.TOTALS_RE.findall(data[:1024])}
+        return data.get('resultsPerPage') or cls.PAGE_SIZE, data.get('totalResults', 0)
+    
+    def _iter_pages(self, query: str, raw: bool) -> Iterator[Any]:
+        """Yield API responses as they arrive.
+        
+        The first page gives totalResults; the remaining pages (up to
+        NVD_MAX_RESULTS) are fetched concurrently, each call waiting for a
+        slot in its API key's rate window. Closing the generator cancels the
+        pages not started yet and does not wait for the ones in flight.
+        """
+        if re.match(r'CVE-\d{4}-\d+', query, re.IGNORECASE):
+            # Specific CVE search
+            yield self.fetch_api_page({'cveId': query.upper()}, raw)
+            return
+        
+        # Keyword search
+        params = {'keywordSearch': query, 'resultsPerPage': self.PAGE_SIZE, 'startIndex': 0}
+        data = self.fetch_api_page(params, raw)
+        yield data
+        
+        page_size, total = self.page_totals(data)
+        start_indexes = range(page_size, min(total, self.max_results), page_size)
+        if not start_indexes:
+            return
+        
+        executor = ThreadPoolExecutor(max_workers=min(self.page_workers, len(start_indexes)))
+        futures = [
+            executor.submit(self.fetch_api_page, dict(params, startIndex=start_index), raw)
+            for start_index in start_indexes
+        ]
+        try:
+            for future in as_completed(futures):
+                try:
+                    yield future.result()
+                except Exception as e:
+                    logger.error(f"NVD page error: {e}")
+        finally:
+            # A 'with' block would wait here for every queued page and its rate limiter sleep
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def iter_search(self, query: str) -> Iterator[List[Dict[str, Any]]]:
+        """Yield pages of raw NVD results as they arrive"""
+        for data in self._iter_pages(query, raw=False):
+            if data.get(self.RAW_ITEMS_KEY):
+                yield data[self.RAW_ITEMS_KEY]
+    
+    def iter_raw_pages(self, query: str) -> Iterator[bytes]:
+        """iter_search() with undecoded response bodies, for parsing on the CPU pool"""
+        for body in self._iter_pages(query, raw=True):
+            if body:
+                yield body
     
     def search(self, query: str) -> List[Dict[str, Any]]:
         """Search NIST NVD with correct API endpoint"""
         results = []
         
         try:
-            # Use the configured URL
-            if re.match(r'CVE-\d{4}-\d+', query, re.IGNORECASE):
-                # Specific CVE search
-                url = f"{self.url}?cveId={query}"
-            else:
-                # Keyword search
-                params = {
-                    'keywordSearch': query,
-                    'resultsPerPage': 20,
-                    'startIndex': 0
-                }
-                
-                response = requests.get(self.url, params=params, timeout=15)
-                if response.status_code == 200:
-                    data = response.json()
-                    if 'vulnerabilities' in data:
-                        results.extend(data['vulnerabilities'])
-                return results
-            
-            response = requests.get(url, timeout=15)
-            if response.status_code == 200:
-                data = response.json()
-                if 'vulnerabilities' in data:
-                    results.extend(data['vulnerabilities'])
-            
+            for page in self.iter_search(query):
+                results.extend(page)
         except Exception as e:
             logger.error(f"NVD API error: {e}")
         
@@ -471,13 +751,7 @@ class NISTNVDScraper(WebScraper):
                     references.append(url)
             
             # Parse date
-            published_date = cve.get('published', '')
-            if published_date:
-                try:
-                    from dateutil import parser
-                    published_date = parser.parse(published_date)
-                except:
-                    published_date = None
+            published_date = parse_date(cve.get('published'))
             
             return {
                 'cve_id': cve.get('id', ''),
@@ -490,6 +764,7 @@ class NISTNVDScraper(WebScraper):
                 'references': references,
                 'source': 'NIST NVD',
                 'source_url': f"https://nvd.nist.gov/vuln/detail/{cve.get('id', '')}",
+                'cpe_matches': extract_cpe_matches(cve.get('configurations', [])),
             }
         except Exception as e:
             logger.error(f"Error normalizing NVD data: {e}")
@@ -502,79 +777,35 @@ class NISTNVDScraper(WebScraper):
             }
 
 
-class SnykVulnerabilityScraper(WebScraper):
+class SnykVulnerabilityScraper(SpecScraper):
     """Snyk Vulnerability Database - WORKING SOURCE"""
     
+    SPECS = (
+        ScraperSpec(
+            name='Snyk',
+            search_url='{base}/search?q={query}',
+            item_selector='.vue--card, .vuln-card, .search-result-item',
+            fields={
+                'title': FieldSpec('h3, h4, a'),
+                'source_url': FieldSpec('a[href]', attr='href', absolute=True),
+                # CVE ID from URL or title
+                'cve_id': (
+                    FieldSpec('a[href]', attr='href', pattern=CVE_PATTERN),
+                    FieldSpec('h3, h4, a', pattern=CVE_PATTERN),
+                ),
+                'severity': FieldSpec('[class*="severity"], [class*="risk"]', transform=severity_label, default='MEDIUM'),
+            },
+            required=('title', 'source_url'),
+            limit=15,
+            constants={'source': 'Snyk'},
+        ),
+    )
+    
     def __init__(self, base_url: Optional[str] = None):
         super().__init__(base_url)
         # Default URL for Snyk vulnerability search
         self.url = base_url if base_url else "https://security.snyk.io"
     
-    def search(self, query: str) -> List[Dict[str, Any]]:
-        """Search Snyk vulnerability database"""
-        results = []
-        
-        try:
-            # Use the configured URL for search
-            search_url = f"{self.url}/search?q={quote_plus(query)}"
-            html = self.fetch_page(search_url)
-            
-            if html:
-                soup = self.parse_html(html)
-                
-                # Look for vulnerability cards
-                vuln_cards = soup.select('.vue--card, .vuln-card, .search-result-item')
-                
-                for card in vuln_cards[:15]:
-                    try:
-                        # Try to extract title and link
-                        title_elem = card.find(['h3', 'h4', 'a'])
-                        if title_elem:
-                            title = title_elem.text.strip()
-                            
-                            # Find link
-                            link_elem = card.find('a', href=True)
-                            if link_elem:
-                                href = link_elem['href']
-                                if not href.startswith('http'):
-                                    href = f"{self.url}{href}"
-                                
-                                # Extract CVE ID from URL or title
-                                cve_id = ''
-                                cve_match = re.search(r'CVE-\d{4}-\d+', href)
-                                if not cve_match:
-                                    cve_match = re.search(r'CVE-\d{4}-\d+', title)
-                                
-                                if cve_match:
-                                    cve_id = cve_match.group(0)
-                                
-                                # Get severity
-                                severity = 'MEDIUM'
-                                severity_elem = card.find(class_=re.compile(r'severity|risk'))
-                                if severity_elem:
-                                    severity_text = severity_elem.text.strip().upper()
-                                    if 'CRITICAL' in severity_text:
-                                        severity = 'CRITICAL'
-                                    elif 'HIGH' in severity_text:
-                                        severity = 'HIGH'
-                                    elif 'LOW' in severity_text:
-                                        severity = 'LOW'
-                                
-                                results.append({
-                                    'title': title,
-                                    'cve_id': cve_id,
-                                    'severity': severity,
-                                    'source_url': href,
-                                    'source': 'Snyk'
-                                })
-                    except:
-                        continue
-            
-        except Exception as e:
-            logger.error(f"Snyk scraping error: {e}")
-        
-        return results
-    
     def normalize_vulnerability(self, raw_data: Dict[str, Any]) -> Dict[str, Any]:
         """Normalize Snyk data"""
         return {
@@ -588,93 +819,58 @@ class SnykVulnerabilityScraper(WebScraper):
         }
 
 
-class SecurityNewsScraper(WebScraper):
+def news_spec(name: str, search_url: str, article_selector: str) -> ScraperSpec:
+    """Search page listing article links; each article is followed for CVEs and a summary"""
+    return ScraperSpec(
+        name=name,
+        search_url=search_url,
+        item_selector=article_selector,
+        fields={
+            'title': FieldSpec(),
+            'source_url': FieldSpec(attr='href', absolute=True),
+        },
+        required=('source_url',),
+        limit=5,
+        detail=DetailSpec(
+            url_field='source_url',
+            fields={
+                'cve_id': FieldSpec(scope='html', pattern=CVE_PATTERN),
+                'description': (
+                    FieldSpec('article', separator=' ', max_length=300),
+                    FieldSpec('.entry-content', separator=' ', max_length=300),
+                ),
+            },
+        ),
+        constants={'source': name},
+    )
+
+
+class SecurityNewsScraper(SpecScraper):
     """Security News Aggregator - WORKING SOURCES"""
     
+    DEFAULT_URL = "https://www.bleepingcomputer.com"
+    
+    # Fallback sources used alongside the default URL
+    SPECS = (
+        news_spec('Krebs on Security', 'https://krebsonsecurity.com/?s={query}', 'article h2 a, .entry-title a'),
+        news_spec('Security Affairs', 'https://securityaffairs.com/?s={query}', '.post-title a, .entry-title a'),
+    )
+    
     def __init__(self, base_url: Optional[str] = None):
         super().__init__(base_url)
         # Default base URL for security news
-        self.url = base_url if base_url else "https://www.bleepingcomputer.com"
-    
-    def search(self, query: str) -> List[Dict[str, Any]]:
-        """Search security news websites"""
-        results = []
-        
+        self.url = base_url if base_url else self.DEFAULT_URL
         # Working news sources - use configured URL as primary
-        working_sources = [
-            {
-                'name': 'Configured News Source',
-                'url': self.url,
-                'search_url': f"{self.url}/search/?q=" if 'bleepingcomputer' in self.url else f"{self.url}/?s=",
-                'article_selector': '.bc_latest_news_text h4 a, .bc_latest_news_text h2 a, article h2 a, .entry-title a, .post-title a'
-            }
-        ]
-        
-        # Add fallback sources if default URL is used
-        if self.url == "https://www.bleepingcomputer.com":
-            working_sources.extend([
-                {
-                    'name': 'Krebs on Security',
-                    'url': 'https://krebsonsecurity.com',
-                    'search_url': 'https://krebsonsecurity.com/?s=',
-                    'article_selector': 'article h2 a, .entry-title a'
-                },
-                {
-                    'name': 'Security Affairs',
-                    'url': 'https://securityaffairs.com',
-                    'search_url': 'https://securityaffairs.com/?s=',
-                    'article_selector': '.post-title a, .entry-title a'
-                }
-            ])
-        
-        for source in working_sources:
-            try:
-                search_url = f"{source['search_url']}{quote_plus(query)}"
-                html = self.fetch_page(search_url)
-                
-                if html:
-                    soup = self.parse_html(html)
-                    
-                    # Find article links
-                    article_links = soup.select(source['article_selector'])
-                    
-                    for link in article_links[:5]:
-                        href = link.get('href', '')
-                        if href:
-                            if not href.startswith('http'):
-                                href = urljoin(source['url'], href)
-                            
-                            # Get article title
-                            title = link.text.strip()
-                            
-                            # Try to get article content for CVE extraction
-                            article_html = self.fetch_page(href)
-                            if article_html:
-                                article_soup = self.parse_html(article_html)
-                                
-                                # Extract CVE IDs
-                                cve_matches = re.findall(r'CVE-\d{4}-\d+', article_html)
-                                cve_id = cve_matches[0] if cve_matches else ''
-                                
-                                # Get description
-                                description = ''
-                                content_elem = article_soup.find('article') or article_soup.find(class_='entry-content')
-                                if content_elem:
-                                    description = content_elem.get_text(strip=True, separator=' ')[:300]
-                                
-                                results.append({
-                                    'title': title,
-                                    'cve_id': cve_id,
-                                    'description': description,
-                                    'source_url': href,
-                                    'source': source['name']
-                                })
-            
-            except Exception as e:
-                logger.error(f"Error scraping {source['name']}: {e}")
-                continue
-        
-        return results
+        self.configured_spec = news_spec(
+            'Configured News Source',
+            '{base}/search/?q={query}' if 'bleepingcomputer' in self.url else '{base}/?s={query}',
+            '.bc_latest_news_text h4 a, .bc_latest_news_text h2 a, article h2 a, .entry-title a, .post-title a',
+        )
+    
+    def get_specs(self) -> List[ScraperSpec]:
+        if self.url == self.DEFAULT_URL:
+            return [self.configured_spec, *self.SPECS]
+        return [self.configured_spec]
     
     def normalize_vulnerability(self, raw_data: Dict[str, Any]) -> Dict[str, Any]:
         """Normalize security news data"""
@@ -689,9 +885,34 @@ class SecurityNewsScraper(WebScraper):
         }
 
 
-class PythonPackageScraper(WebScraper):
+class PythonPackageScraper(SpecScraper):
     """Python-specific package vulnerability scraper"""
     
+    ADVISORY_SPEC = ScraperSpec(
+        name='PyPI Advisory DB',
+        search_url='{base}',
+        item_selector='a[href]',
+        fields={
+            'source_url': FieldSpec(attr='href', pattern=r'.*advisory-database/\d+/.*', absolute=True),
+        },
+        required=('source_url',),
+        limit=10,
+        detail=DetailSpec(
+            url_field='source_url',
+            match_query=True,
+            fields={
+                'title': FieldSpec('h1', default='PyPI Advisory'),
+                'cve_id': FieldSpec(scope='html', pattern=CVE_PATTERN),
+                'affected_packages': FieldSpec('code', many=True, pattern=r'^(?!.*(?:@|http)).+$'),
+            },
+        ),
+        constants={
+            'description': 'PyPI security advisory for {query}',
+            'severity': 'MEDIUM',
+            'source': 'PyPI Advisory DB',
+        },
+    )
+    
     def __init__(self, base_url: Optional[str] = None):
         super().__init__(base_url)
         # Default URL for PyPI advisory database
@@ -721,55 +942,14 @@ class PythonPackageScraper(WebScraper):
             # Use OSV database for Python packages (most reliable)
             osv_scraper = OSVDatabaseScraper()
             for package in python_packages:
-                package_results = osv_scraper.search(package)
+                package_results = osv_scraper.query_package(package, 'PyPI')
                 for result in package_results:
                     normalized = osv_scraper.normalize_vulnerability(result)
                     if normalized:
                         results.append(normalized)
             
             # Use the configured URL for PyPI advisory database
-            html = self.fetch_page(self.url)
-            
-            if html:
-                soup = self.parse_html(html)
-                
-                # Look for advisories matching query
-                advisory_links = soup.find_all('a', href=re.compile(r'advisory-database/\d+/'))
-                
-                for link in advisory_links[:10]:
-                    advisory_url = urljoin(self.url, link['href'])
-                    advisory_html = self.fetch_page(advisory_url)
-                    
-                    if advisory_html:
-                        advisory_soup = self.parse_html(advisory_html)
-                        
-                        # Check if query matches advisory content
-                        advisory_text = advisory_soup.get_text().lower()
-                        if query.lower() in advisory_text:
-                            title_elem = advisory_soup.find('h1')
-                            title = title_elem.text.strip() if title_elem else 'PyPI Advisory'
-                            
-                            # Extract CVE
-                            cve_match = re.search(r'CVE-\d{4}-\d+', advisory_html)
-                            cve_id = cve_match.group(0) if cve_match else ''
-                            
-                            # Get affected packages
-                            affected_packages = []
-                            package_elems = advisory_soup.find_all('code')
-                            for elem in package_elems:
-                                text = elem.text.strip()
-                                if text and '@' not in text and 'http' not in text:
-                                    affected_packages.append(text)
-                            
-                            results.append({
-                                'cve_id': cve_id,
-                                'title': title,
-                                'description': f"PyPI security advisory for {query}",
-                                'severity': 'MEDIUM',
-                                'affected_packages': affected_packages,
-                                'source': 'PyPI Advisory DB',
-                                'source_url': advisory_url,
-                            })
+            results.extend(self.run_spec(self.ADVISORY_SPEC, query))
             
         except Exception as e:
             logger.error(f"Python package scraping error: {e}")
@@ -0,0 +1,347 @@
+import queue
+import asyncio
+import threading
+import logging
+from collections import Counter
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Iterable, Optional, Set, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, connection, connections, transaction
+
+from . import known_ids, range_index, cpe_index, near_dup, stats
+from .records import VulnRecord
+
+logger = logging.getLogger(__name__)
+
+LOOKUP_CHUNK = 500
+
+
+def get_writer_settings() -> Dict[str, Any]:
+    config = {
+        'ENABLED': None,       # None: only when the default database is SQLite
+        'MAX_BATCH_JOBS': 50,  # Harvests committed together in one transaction
+        'BATCH_WINDOW': 0.05,  # Seconds to wait for more harvests before committing
+    }
+    config.update(getattr(settings, 'SINGLE_WRITER', {}))
+    return config
+
+
+@dataclass
+class SaveResult:
+    created: List[Any] = field(default_factory=list)  # New Vulnerability rows
+    created_records: List[VulnRecord] = field(default_factory=list)
+    updated: List[Any] = field(default_factory=list)  # Existing rows updated in place
+    stat_changes: Counter = field(default_factory=Counter)  # Rollup deltas from the updates
+
+
+def save_records(pairs: Iterable[Tuple[str, VulnRecord]], update_existing: bool = False,
+                 written: Optional[Set[str]] = None) -> SaveResult:
+    """Store harvested records; the caller provides the transaction.
+
+    With update_existing=False (harvest) a record is skipped when its ID or
+    title is already stored. With update_existing=True (search_and_save)
+    rows with the same ID are updated unless their content is unchanged.
+    Existence is checked with one query per chunk instead of one per row,
+    and new rows are inserted with bulk_create.
+
+    Affected ranges and CPE criteria are merged from every record with
+    the same ID and stored for its row whether it was inserted, updated,
+    skipped or stored before, since the record carrying them (an OSV
+    advisory keyed by its CVE alias) often arrives after another source's.
+
+    The known-ID filter and the caches only learn about the rows once the
+    transaction commits, so a rolled-back attempt leaves them untouched.
+    Several calls in one transaction share ``written`` (the filter keys
+    stored so far) so later calls still see the earlier rows.
+    """
+    from ..models import Vulnerability
+    from ..collector import get_source
+
+    known = known_ids.get_filter()
+    written = set() if written is None else written
+    remembered = []
+    sources = {}
+    result = SaveResult()
+
+    candidates = {}
+    skipped = {}  # Records the exact LRU says are stored already
+    ranged = {}   # ID -> records carrying affected ranges or CPE criteria
+    for source_name, record in pairs:
+        if record.affected_ranges or record.cpe_matches:
+            ranged.setdefault(record.cve_id, []).append(record)
+        if record.cve_id in candidates or record.cve_id in skipped:
+            continue
+        fingerprint = record.fingerprint()
+        status = known.classify(record.cve_id, '' if update_existing else record.title, fingerprint)
+        if status == known_ids.NEW and (
+            f"id:{record.cve_id}" in written or (not update_existing and f"title:{record.title}" in written)
+        ):
+            status = known_ids.UNKNOWN
+        if status == known_ids.UNCHANGED or (status == known_ids.KNOWN and not update_existing):
+            skipped[record.cve_id] = (source_name, record, fingerprint, status)
+            continue
+        candidates[record.cve_id] = (source_name, record, fingerprint, status)
+
+    # The LRU outlives rows deleted by other processes (a purge), so confirm its hits
+    skipped_ids = list(skipped)
+    for start in range(0, len(skipped_ids), LOOKUP_CHUNK):
+        chunk = skipped_ids[start:start + LOOKUP_CHUNK]
+        stored_ids = set(Vulnerability.objects.filter(cve_id__in=chunk).values_list('cve_id', flat=True))
+        for cve_id in chunk:
+            if cve_id not in stored_ids:
+                known.forget(cve_id)
+                candidates[cve_id] = skipped[cve_id][:3] + (known_ids.UNKNOWN,)
+
+    unknown = [cve_id for cve_id, candidate in candidates.items() if candidate[3] != known_ids.NEW]
+    existing = {}
+    existing_titles = set()
+    stored = Vulnerability.objects.select_related('source') if update_existing else Vulnerability.objects
+    for start in range(0, len(unknown), LOOKUP_CHUNK):
+        chunk = unknown[start:start + LOOKUP_CHUNK]
+        existing.update((v.cve_id, v) for v in stored.filter(cve_id__in=chunk))
+        if not update_existing:
+            titles = [candidates[cve_id][1].title for cve_id in chunk]
+            existing_titles.update(Vulnerability.objects.filter(title__in=titles).values_list('title', flat=True))
+
+    to_create = []
+    for cve_id, (source_name, record, fingerprint, status) in candidates.items():
+        vuln = existing.get(cve_id)
+        if update_existing and vuln is not None:
+            result.stat_changes.subtract(_stat_keys(vuln))
+            for name, value in record.db_fields().items():
+                if value:
+                    setattr(vuln, name, value)
+            vuln.save()
+            result.stat_changes.update(_stat_keys(vuln))
+            remembered.append((vuln.cve_id, vuln.title, fingerprint))
+            result.updated.append(vuln)
+            continue
+        if vuln is not None or record.title in existing_titles:
+            remembered.append((cve_id, record.title, None))
+            continue
+        if not update_existing:
+            # Later records with the same title are duplicates of this one
+            existing_titles.add(record.title)
+        if source_name not in sources:
+            sources[source_name] = get_source(source_name)
+        to_create.append((record, fingerprint, Vulnerability(source=sources[source_name], **record.db_fields())))
+
+    # Items without a CVE ID that repeat a stored story are linked to its canonical row
+    links = near_dup.assign([item[2] for item in to_create])
+    inserted = _insert(to_create, remembered)
+    near_dup.register([item[2] for item in inserted], links)
+    for record, fingerprint, vuln in inserted:
+        remembered.append((vuln.cve_id, vuln.title, fingerprint))
+        result.created.append(vuln)
+        result.created_records.append(record)
+    if ranged:
+        _store_ranges(ranged, {vuln.cve_id: vuln for vuln in result.created + result.updated})
+
+    for cve_id, title, _ in remembered:
+        written.add(f"id:{cve_id}")
+        if title:
+            written.add(f"title:{title}")
+    transaction.on_commit(lambda: _committed(remembered))
+    return result
+
+
+def _store_ranges(ranged: Dict[str, List[VulnRecord]], rows: Dict[str, Any]):
+    """Store the ranges and criteria of ranged for the rows with their IDs, looking up rows not in rows"""
+    from ..models import Vulnerability
+
+    missing = [cve_id for cve_id in ranged if cve_id not in rows]
+    for start in range(0, len(missing), LOOKUP_CHUNK):
+        chunk = missing[start:start + LOOKUP_CHUNK]
+        rows.update((v.cve_id, v) for v in Vulnerability.objects.filter(cve_id__in=chunk).only('id', 'cve_id'))
+    ranges, criteria = [], []
+    for cve_id, records in ranged.items():
+        vuln = rows.get(cve_id)
+        if vuln is None:
+            continue  # Dropped as a repeat of a stored title
+        for record in records:
+            if record.affected_ranges:
+                ranges.append((vuln, record.advisory_id, record.affected_ranges))
+            if record.cpe_matches:
+                criteria.append((vuln, record.cpe_matches))
+    if ranges:
+        range_index.store_ranges(ranges)
+    if criteria:
+        cpe_index.store_cpe_matches(criteria)
+
+
+def _stat_keys(vuln) -> List[Tuple[str, str]]:
+    return stats.vulnerability_stat_keys(
+        vuln.severity, vuln.source.name if vuln.source_id else None, vuln.published_date, vuln.affected_packages
+    )
+
+
+def save_in_transaction(jobs: List[Tuple[List[Tuple[str, VulnRecord]], bool]]) -> List[SaveResult]:
+    """save_records() for each (pairs, update_existing) job, all in one transaction.
+
+    Foreign keys are only checked at commit. A violation there means a
+    cached VulnerabilitySource row is gone (purged by another process), so
+    the source cache is dropped and the transaction retried once.
+    """
+    from ..collector import reset_source_cache
+    from .purge import check_purge_generation
+
+    check_purge_generation()
+    for attempt in range(2):
+        try:
+            with transaction.atomic():
+                written = set()
+                return [save_records(pairs, update_existing, written) for pairs, update_existing in jobs]
+        except IntegrityError as e:
+            if attempt:
+                raise
+            logger.warning(f"Write failed ({e}), retrying with fresh source rows")
+            reset_source_cache()
+
+
+def _committed(remembered: List[Tuple[str, str, Optional[str]]]):
+    """Teach the known-ID filter what the committed transaction stored"""
+    known = known_ids.get_filter()
+    for cve_id, title, fingerprint in remembered:
+        known.remember(cve_id, title, fingerprint)
+
+
+def _insert(to_create, remembered):
+    """bulk_create the new rows, falling back to per-row savepoints on a conflict.
+
+    Rows that turn out to be stored already are added to remembered.
+    """
+    from ..models import Vulnerability
+
+    if not to_create:
+        return []
+    if connection.features.can_return_rows_from_bulk_insert:
+        try:
+            with transaction.atomic():
+                Vulnerability.objects.bulk_create([item[2] for item in to_create], batch_size=500)
+            return to_create
+        except IntegrityError:
+            # Another process stored some of these since our filter was warmed
+            for item in to_create:
+                item[2].pk = None
+                item[2]._state.adding = True
+
+    inserted = []
+    for item in to_create:
+        try:
+            with transaction.atomic():
+                item[2].save(force_insert=True)
+            inserted.append(item)
+        except IntegrityError:
+            item[2].pk = None
+            remembered.append((item[0].cve_id, item[0].title, None))
+    return inserted
+
+
+class WriteQueue:
+    """Single writer thread that commits many harvests per transaction.
+
+    On SQLite every writer takes the database lock, so concurrent harvests
+    that each insert row by row in autocommit mode spend their time waiting
+    on each other and on one fsync per row. Submitted jobs are instead run
+    by one thread, which drains whatever has queued up within BATCH_WINDOW
+    and commits it in one transaction. A failing batch is retried one job per
+    transaction so a bad job only fails its own caller.
+    """
+
+    def __init__(self, max_batch_jobs: int = 50, batch_window: float = 0.05):
+        self.max_batch_jobs = max_batch_jobs
+        self.batch_window = batch_window
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, pairs: List[Tuple[str, VulnRecord]], update_existing: bool = False) -> Future:
+        future = Future()
+        self._queue.put((list(pairs), update_existing, future))
+        self._ensure_thread()
+        return future
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name='vtbda-writer', daemon=True)
+                    self._thread.start()
+
+    def _next_batch(self) -> list:
+        batch = [self._queue.get()]
+        while len(batch) < self.max_batch_jobs:
+            try:
+                batch.append(self._queue.get(timeout=self.batch_window))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                self._commit(batch)
+            except Exception as e:
+                logger.error(f"Writer thread error: {e}")
+            finally:
+                connections.close_all()
+
+    def _commit(self, batch):
+        try:
+            results = save_in_transaction([(pairs, update_existing) for pairs, update_existing, future in batch])
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][2].set_exception(e)
+                return
+            logger.warning(f"Batched write of {len(batch)} jobs failed ({e}), retrying one by one")
+            for job in batch:
+                self._commit([job])
+            return
+
+        for (pairs, update_existing, future), result in zip(batch, results):
+            future.set_result(result)
+
+
+_writer: Optional[WriteQueue] = None
+_writer_lock = threading.Lock()
+
+
+def get_writer() -> WriteQueue:
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                config = get_writer_settings()
+                _writer = WriteQueue(config['MAX_BATCH_JOBS'], config['BATCH_WINDOW'])
+    return _writer
+
+
+def writer_enabled() -> bool:
+    enabled = get_writer_settings()['ENABLED']
+    if enabled is None:
+        return connections['default'].vendor == 'sqlite'
+    return bool(enabled)
+
+
+def persist(pairs: Iterable[Tuple[str, VulnRecord]], update_existing: bool = False) -> SaveResult:
+    """Store records through the single writer on SQLite, or inline in one transaction otherwise"""
+    pairs = list(pairs)
+    if not pairs:
+        return SaveResult()
+    if writer_enabled():
+        return get_writer().submit(pairs, update_existing).result()
+    return save_in_transaction([(pairs, update_existing)])[0]
+
+
+async def apersist(pairs: Iterable[Tuple[str, VulnRecord]], update_existing: bool = False) -> SaveResult:
+    """persist() for async callers; a queued write is awaited without holding a thread"""
+    pairs = list(pairs)
+    if not pairs:
+        return SaveResult()
+    if writer_enabled():
+        return await asyncio.wrap_future(get_writer().submit(pairs, update_existing))
+    return await sync_to_async(persist)(pairs, update_existing)
@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+def get_sqlite_tuning():
+    config = {
+        'JOURNAL_MODE': 'WAL',         # Readers no longer block the writer or each other
+        'SYNCHRONOUS': 'NORMAL',       # Safe with WAL; fsync at checkpoints instead of every commit
+        'BUSY_TIMEOUT_MS': 30000,      # Wait for the write lock instead of failing with "database is locked"
+        'MMAP_SIZE': 256 * 1024 * 1024,
+        'CACHE_SIZE_KB': 64 * 1024,
+        'TEMP_STORE': 'MEMORY',
+    }
+    config.update(getattr(settings, 'SQLITE_TUNING', {}))
+    return config
+
+
+@receiver(connection_created)
+def tune_sqlite_connection(sender, connection, **kwargs):
+    """Set WAL and the other pragmas each SQLite connection needs for concurrent workers"""
+    if connection.vendor != 'sqlite':
+        return
+    config = get_sqlite_tuning()
+    with connection.cursor() as cursor:
+        # busy_timeout first, so switching to WAL also waits for the lock
+        cursor.execute(f"PRAGMA busy_timeout = {int(config['BUSY_TIMEOUT_MS'])}")
+        if connection.settings_dict['NAME'] != ':memory:' and 'mode=memory' not in str(connection.settings_dict['NAME']):
+            cursor.execute(f"PRAGMA journal_mode = {config['JOURNAL_MODE']}")
+        cursor.execute(f"PRAGMA synchronous = {config['SYNCHRONOUS']}")
+        cursor.execute(f"PRAGMA mmap_size = {int(config['MMAP_SIZE'])}")
+        cursor.execute(f"PRAGMA cache_size = {-int(config['CACHE_SIZE_KB'])}")
+        cursor.execute(f"PRAGMA temp_store = {config['TEMP_STORE']}")
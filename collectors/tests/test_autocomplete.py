@@ -0,0 +1,131 @@
+from django.test import SimpleTestCase, TestCase
+
+from collectors.models import Vulnerability, VulnerabilitySource
+from collectors.services import autocomplete
+from collectors.services.autocomplete import AutocompleteIndex, SortedKeys, get_autocomplete_settings, trigrams
+
+PACKAGES = ['PyPI/django', 'PyPI/djangorestframework', 'PyPI/flask', 'npm/lodash', 'npm/lodash.merge',
+            'Maven/org.apache.logging.log4j:log4j-core', 'crates.io/tokio', 'Go/github.com/gin-gonic/gin']
+
+
+def similarity(query, key):
+    wanted, have = trigrams(query), trigrams(key)
+    return len(wanted & have) / len(wanted | have)
+
+
+class SortedKeysTests(SimpleTestCase):
+
+    def test_prefix_spans_main_and_delta_lists(self):
+        keys = SortedKeys({'django': 'Django', 'flask': 'flask'}, delta_limit=10)
+        self.assertTrue(keys.add('django-cors-headers'))
+        self.assertTrue(keys.add('Djangorestframework'))
+        self.assertFalse(keys.add('DJANGO'))  # Already in the main list
+        self.assertFalse(keys.add('django-cors-headers'))  # ...or the delta
+        self.assertEqual(keys.prefix('djang', 10), [
+            ('django', 'Django'), ('django-cors-headers', 'django-cors-headers'),
+            ('djangorestframework', 'Djangorestframework'),
+        ])
+        self.assertEqual([key for key, _ in keys.prefix('djang', 2)], ['django', 'django-cors-headers'])
+        self.assertEqual(len(keys.delta), 2)
+        self.assertIn('djangorestframework', keys)
+        self.assertNotIn('djangorest', keys)
+
+    def test_delta_is_merged_past_its_limit(self):
+        keys = SortedKeys({'b': 'b', 'd': 'd'}, delta_limit=2)
+        for label in ('c', 'a'):
+            keys.add(label)
+        self.assertEqual(len(keys.delta), 2)
+        keys.add('E')
+        self.assertEqual((keys.keys, keys.labels, keys.delta), (['a', 'b', 'c', 'd', 'e'], ['a', 'b', 'c', 'd', 'E'], []))
+        self.assertEqual(keys.prefix('', 10)[-1], ('e', 'E'))
+
+    def test_ids_fold_to_upper_case(self):
+        ids = SortedKeys({}, fold=str.upper)
+        ids.add('cve-2021-44228')
+        self.assertEqual(ids.prefix('CVE-2021', 5), [('CVE-2021-44228', 'cve-2021-44228')])
+
+
+class FuzzyPackageTests(SimpleTestCase):
+
+    def build(self, **config):
+        index = AutocompleteIndex(dict(get_autocomplete_settings(), **config))
+        index.load([(number, '', f'["{package}"]') for number, package in enumerate(PACKAGES, 1)], [])
+        return index
+
+    def brute_force(self, index, query):
+        threshold = index.config['FUZZY_THRESHOLD']
+        scores = [(similarity(query, key), key) for key in index.trigram_counts]
+        return sorted(((score, key) for score, key in scores if score >= threshold), reverse=True)
+
+    def test_matches_misspelled_names_above_the_threshold(self):
+        index = self.build()
+        found = index._fuzzy_packages('djanog', 10)
+        self.assertEqual(found[0][1], 'django')
+        self.assertTrue(all(score >= 0.3 for score, _ in found))
+        self.assertEqual(index._fuzzy_packages('zzzzzz', 10), [])
+
+    def test_pruning_keeps_every_match_of_a_full_scan(self):
+        index = self.build()
+        for query in ('djanog', 'lodahs', 'log4j-cor', 'tokoi', 'flsk'):
+            self.assertEqual(sorted(index._fuzzy_packages(query, 50), reverse=True), self.brute_force(index, query))
+
+    def test_threshold_is_configurable(self):
+        loose, strict = self.build(FUZZY_THRESHOLD=0.1), self.build(FUZZY_THRESHOLD=0.9)
+        self.assertGreater(len(loose._fuzzy_packages('djanog', 50)), len(self.build()._fuzzy_packages('djanog', 50)))
+        self.assertEqual(strict._fuzzy_packages('djanog', 50), [])
+        self.assertEqual(strict._fuzzy_packages('django', 50), [(1.0, 'django')])
+
+    def test_crowded_trigrams_only_complete_candidates(self):
+        # With MAX_POSTING 1 every shared trigram is too common to nominate, but the
+        # shortest list still does, and what is returned still clears the threshold
+        index = self.build(MAX_POSTING=1)
+        found = index._fuzzy_packages('lodahs', 50)
+        self.assertLessEqual(set(found), set(self.brute_force(index, 'lodahs')))
+        self.assertIn('lodash', [key for _, key in found])
+
+
+class RefreshTests(TestCase):
+
+    def setUp(self):
+        autocomplete.reset_index()
+        self.addCleanup(autocomplete.reset_index)
+        self.source = VulnerabilitySource.objects.create(name='OSV', source_type='api')
+
+    def store(self, cve_id, package):
+        return Vulnerability.objects.create(cve_id=cve_id, title=f'{package} flaw', description='', severity='HIGH',
+                                            source=self.source, affected_packages=f'["{package}"]')
+
+    def values(self, query):
+        return [suggestion['value'] for suggestion in autocomplete.suggest(query)]
+
+    def test_refresh_adds_only_new_rows(self):
+        self.store('CVE-2024-0001', 'PyPI/django')
+        index = autocomplete.get_index()
+        self.store('CVE-2024-0002', 'PyPI/django')
+        self.store('CVE-2024-0003', 'npm/lodash')
+        index.refresh(force=True)
+        self.assertIs(autocomplete.get_index(), index)
+        self.assertEqual(index.package_counts['pypi/django'], 2)
+        self.assertIn('npm/lodash', self.values('loda'))
+        self.assertIn('CVE-2024-0003', self.values('CVE-2024-000'))
+
+    def test_shrunken_table_rebuilds_the_index(self):
+        self.store('CVE-2024-0001', 'PyPI/django')
+        self.store('CVE-2024-0002', 'npm/lodash')
+        index = autocomplete.get_index()
+        Vulnerability.objects.filter(cve_id='CVE-2024-0002').delete()
+        index.refresh(force=True)
+        self.assertNotIn('npm/lodash', index.package_counts)
+        self.assertNotIn('lodash', index.packages)
+        self.assertEqual(self.values('loda'), [])
+
+    def test_reset_after_purge_warms_from_the_table(self):
+        self.store('CVE-2024-0001', 'PyPI/django')
+        index = autocomplete.get_index()
+        Vulnerability.objects.all().delete()
+        self.store('CVE-2023-0001', 'crates.io/tokio')
+        autocomplete.reset_index()
+        fresh = autocomplete.get_index()
+        self.assertIsNot(fresh, index)
+        self.assertEqual(self.values('dja'), [])
+        self.assertEqual(self.values('tok'), ['crates.io/tokio'])
@@ -0,0 +1,70 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+
+from collectors.models import IndexGeneration, Vulnerability
+from collectors.services.cpe_index import CpeIndex, extract_cpe_matches, split_cpe, store_cpe_matches
+
+CONFIGURATIONS = [{'nodes': [{'cpeMatch': [
+    {'vulnerable': True, 'criteria': 'cpe:2.3:a:apache:log4j:*:*:*:*:*:*:*:*',
+     'versionStartIncluding': '2.0', 'versionEndExcluding': '2.15.0'},
+    {'vulnerable': True, 'criteria': 'cpe:2.3:a:apache:log4j:2.0:beta9:*:*:*:*:*:*'},
+    {'vulnerable': False, 'criteria': 'cpe:2.3:o:linux:linux_kernel:-:*:*:*:*:*:*:*'},
+]}]}]
+
+
+class SplitCpeTests(SimpleTestCase):
+
+    def test_formats(self):
+        self.assertEqual(split_cpe('cpe:2.3:a:apache:log4j:2.14.1:*:*:*:*:*:*:*'), ('a', 'apache', 'log4j', '2.14.1'))
+        self.assertEqual(split_cpe('cpe:/a:Apache:Log4j:2.14.1'), ('a', 'apache', 'log4j', '2.14.1'))
+        self.assertEqual(split_cpe(r'cpe:2.3:a:vendor:prod\:uct:1.0'), ('a', 'vendor', 'prod:uct', '1.0'))
+        self.assertIsNone(split_cpe('cpe:2.3:a:*:log4j:1.0'))
+        self.assertIsNone(split_cpe('log4j'))
+
+    def test_extract_keeps_vulnerable_criteria(self):
+        matches = extract_cpe_matches(CONFIGURATIONS)
+        self.assertEqual([(m['version'], m['version_start'], m['version_end']) for m in matches],
+                         [('*', '2.0', '2.15.0'), ('2.0', '', '')])
+
+
+class CpeIndexTests(TestCase):
+
+    def setUp(self):
+        vuln = Vulnerability.objects.create(cve_id='CVE-2021-44228', title='Log4Shell', description='', severity='CRITICAL')
+        store_cpe_matches([(vuln, extract_cpe_matches(CONFIGURATIONS))])
+
+    def affected(self, cpe, index=None):
+        (result,) = (index or CpeIndex()).lookup([cpe])
+        return [info['cve_id'] for info in result['vulnerabilities']]
+
+    def test_version_bounds(self):
+        self.assertEqual(self.affected('cpe:2.3:a:apache:log4j:2.14.1'), ['CVE-2021-44228'])
+        self.assertEqual(self.affected('cpe:2.3:a:apache:log4j:2.0'), ['CVE-2021-44228'])
+        self.assertEqual(self.affected('cpe:2.3:a:apache:log4j:2.15.0'), [])
+        self.assertEqual(self.affected('cpe:2.3:a:apache:log4j:*'), ['CVE-2021-44228'])
+        self.assertEqual(CpeIndex().lookup(['nonsense']), [{'cpe': 'nonsense', 'valid': False, 'vulnerabilities': []}])
+
+    def test_part_must_agree(self):
+        vuln = Vulnerability.objects.create(cve_id='CVE-2024-0002', title='Acme OS', description='', severity='HIGH')
+        store_cpe_matches([(vuln, extract_cpe_matches([{'nodes': [{'cpeMatch': [
+            {'vulnerable': True, 'criteria': 'cpe:2.3:o:acme:router:*:*:*:*:*:*:*:*', 'versionEndExcluding': '2.0'},
+        ]}]}]))])
+        self.assertEqual(self.affected('cpe:2.3:o:acme:router:1.0'), ['CVE-2024-0002'])
+        self.assertEqual(self.affected('cpe:2.3:a:acme:router:1.0'), [])
+        self.assertEqual(self.affected('cpe:2.3:*:acme:router:1.0'), ['CVE-2024-0002'])
+        self.assertEqual(self.affected('cpe:2.3:h:apache:log4j:2.14.1'), [])
+
+    def test_criteria_stored_by_another_worker_are_picked_up(self):
+        index = CpeIndex()
+        self.assertEqual(self.affected('cpe:2.3:a:acme:vpn:1.0', index), [])
+
+        # Another worker stores criteria for the product; its per-process cache is not shared
+        vuln = Vulnerability.objects.create(cve_id='CVE-2024-0001', title='Acme VPN', description='', severity='HIGH')
+        with mock.patch('collectors.services.cpe_index.transaction.on_commit'):
+            store_cpe_matches([(vuln, extract_cpe_matches([{'nodes': [{'cpeMatch': [
+                {'vulnerable': True, 'criteria': 'cpe:2.3:a:acme:vpn:1.0:*:*:*:*:*:*:*'},
+            ]}]}]))])
+        self.assertEqual(self.affected('cpe:2.3:a:acme:vpn:1.0', index), [])
+        IndexGeneration.objects.update_or_create(name='cpe', defaults={'generation': 99})
+        self.assertEqual(self.affected('cpe:2.3:a:acme:vpn:1.0', index), ['CVE-2024-0001'])
@@ -0,0 +1,50 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from collectors.models import Vulnerability
+from collectors.services import detail_cache
+
+
+class DetailCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.vuln = Vulnerability.objects.create(
+            cve_id='CVE-2024-0001', title='Original', description='d', severity='HIGH',
+        )
+
+    def test_payload_is_cached_per_version(self):
+        first = detail_cache.get_payload(cve_id='CVE-2024-0001')
+        with mock.patch.object(detail_cache, 'build_payload', wraps=detail_cache.build_payload) as build:
+            second = detail_cache.get_payload(vuln_id=self.vuln.pk)
+        self.assertEqual(build.call_count, 0)
+        self.assertEqual(first['etag'], second['etag'])
+
+    def test_write_from_another_process_is_seen(self):
+        # queryset.update() sends no signals, like a write made by another worker
+        old = detail_cache.get_payload(cve_id='CVE-2024-0001')
+        Vulnerability.objects.filter(pk=self.vuln.pk).update(
+            title='Changed', updated_at=timezone.now() + timedelta(seconds=1),
+        )
+        new = detail_cache.get_payload(cve_id='CVE-2024-0001')
+        self.assertEqual(new['title'], 'Changed')
+        self.assertNotEqual(new['etag'], old['etag'])
+
+    def test_deleted_row_is_not_served(self):
+        detail_cache.get_payload(cve_id='CVE-2024-0001')
+        Vulnerability.objects.filter(pk=self.vuln.pk).delete()
+        self.assertIsNone(detail_cache.get_payload(cve_id='CVE-2024-0001'))
+        response = self.client.get('/collectors/vulnerability/CVE-2024-0001/?format=json')
+        self.assertEqual(response.status_code, 404)
+
+    def test_conditional_get(self):
+        response = self.client.get('/collectors/vulnerability/CVE-2024-0001/?format=json')
+        self.assertEqual(response.json()['title'], 'Original')
+        again = self.client.get(
+            '/collectors/vulnerability/CVE-2024-0001/?format=json', HTTP_IF_NONE_MATCH=response['ETag'],
+        )
+        self.assertEqual(again.status_code, 304)
@@ -0,0 +1,107 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+
+from collectors.models import Vulnerability
+from collectors.services import known_ids
+from collectors.services.known_ids import BloomFilter, KnownIdFilter, content_fingerprint
+from collectors.services.records import VulnRecord
+from collectors.services.writer import save_records
+
+
+class BloomFilterTests(SimpleTestCase):
+
+    def test_no_false_negatives(self):
+        bloom = BloomFilter(1000, 0.01)
+        keys = [f"id:CVE-2024-{n:04d}" for n in range(1000)]
+        for key in keys:
+            bloom.add(key)
+        self.assertTrue(all(key in bloom for key in keys))
+
+    def test_false_positive_rate_at_capacity(self):
+        bloom = BloomFilter(5000, 0.01)
+        for n in range(5000):
+            bloom.add(f"id:CVE-2024-{n}")
+        false_positives = sum(f"id:GHSA-{n}" in bloom for n in range(20000))
+        self.assertLess(false_positives / 20000, 0.02)
+
+    def test_count_ignores_keys_already_present(self):
+        bloom = BloomFilter(100)
+        self.assertTrue(bloom.add('id:CVE-2024-0001'))
+        self.assertFalse(bloom.add('id:CVE-2024-0001'))
+        self.assertEqual(bloom.count, 1)
+
+
+class FingerprintTests(SimpleTestCase):
+
+    def test_stored_and_normalized_values_match(self):
+        normalized = content_fingerprint('Title', 'Desc', 'high', 7.5, '2024-01-01', ['PyPI/django'])
+        stored = content_fingerprint('Title', 'Desc', 'HIGH', '7.5', '2024-01-01', '["PyPI/django"]')
+        self.assertEqual(normalized, stored)
+        self.assertNotEqual(normalized, content_fingerprint('Title', 'Desc', 'LOW', 7.5, '2024-01-01', []))
+
+
+class KnownIdFilterTests(TestCase):
+
+    def store(self, count, start=0):
+        Vulnerability.objects.bulk_create(
+            Vulnerability(cve_id=f"CVE-2024-{n:04d}", title=f"Title {n}", description='', severity='LOW')
+            for n in range(start, start + count)
+        )
+
+    def test_classify(self):
+        self.store(3)
+        known = KnownIdFilter(capacity=100, exact_size=2)
+        known.warm()
+        self.assertEqual(known.classify('CVE-2099-0001', 'Never stored'), known_ids.NEW)
+        # Only the two newest rows are in the exact LRU
+        self.assertEqual(known.classify('CVE-2024-0000'), known_ids.UNKNOWN)
+        self.assertEqual(known.classify('CVE-2024-0002'), known_ids.KNOWN)
+        fingerprint = content_fingerprint('Title 2', '', 'LOW', None, None, '[]')
+        self.assertEqual(known.classify('CVE-2024-0002', fingerprint=fingerprint), known_ids.UNCHANGED)
+        self.assertEqual(known.classify('CVE-2099-0002', 'Title 1'), known_ids.UNKNOWN)
+
+    def test_warm_leaves_headroom_for_new_rows(self):
+        # Half of CAPACITY rows used to fill the filter, so every remember() forced a full rescan
+        self.store(60)
+        known = KnownIdFilter(capacity=100)
+        known.warm()
+        self.assertEqual(known.bloom.count, 120)
+        for n in range(60, 120):
+            known.remember(f"CVE-2024-{n:04d}", f"Title {n}")
+        self.assertTrue(known.warmed)
+
+    def test_remembering_stored_rows_does_not_fill_the_filter(self):
+        self.store(60)
+        known = KnownIdFilter(capacity=100)
+        known.warm()
+        for _ in range(5):
+            for n in range(60):
+                known.remember(f"CVE-2024-{n:04d}", f"Title {n}")
+        self.assertEqual(known.bloom.count, 120)
+        self.assertTrue(known.warmed)
+
+    def test_rewarms_once_past_design_load(self):
+        known_ids.reset_filter()
+        self.addCleanup(known_ids.reset_filter)
+        with self.settings(KNOWN_ID_FILTER={'CAPACITY': 10}):
+            known = known_ids.get_filter()
+            for n in range(11):
+                known.remember(f"CVE-2024-{n:04d}")
+            self.assertFalse(known.warmed)
+            with mock.patch.object(KnownIdFilter, 'warm', wraps=known.warm) as warm:
+                known_ids.get_filter()
+                known_ids.get_filter()
+            self.assertEqual(warm.call_count, 1)
+
+    def test_stale_lru_hit_is_checked_against_the_table(self):
+        known_ids.reset_filter()
+        self.addCleanup(known_ids.reset_filter)
+        record = VulnRecord(cve_id='CVE-2024-0001', title='Purged elsewhere', source='NVD')
+        # Stored, then deleted by another process's purge
+        known_ids.get_filter().remember(record.cve_id, record.title, record.fingerprint())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            result = save_records([('NVD', record)])
+        self.assertEqual([v.cve_id for v in result.created], ['CVE-2024-0001'])
+        self.assertEqual(known_ids.get_filter().classify(record.cve_id), known_ids.KNOWN)
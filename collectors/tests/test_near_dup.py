@@ -0,0 +1,117 @@
+from django.test import SimpleTestCase, TestCase
+
+from collectors.models import Vulnerability
+from collectors.services import near_dup
+from collectors.services.near_dup import LshIndex, MinHasher, is_candidate, similarity
+
+STORY = (
+    "Attackers are exploiting a critical remote code execution flaw in the Acme VPN appliance "
+    "to deploy ransomware on corporate networks, researchers warned on Monday"
+)
+REWRITE = (
+    "Attackers are exploiting a critical remote code execution flaw in the Acme VPN appliance "
+    "to deploy ransomware on corporate networks, security researchers warned on Tuesday"
+)
+OTHER = "Chrome update fixes a use after free bug in the V8 JavaScript engine reported by Google Project Zero"
+# Advisories generated from one template differ only in the package name
+TEMPLATE = "Denial of service in {} when parsing crafted input, caused by unbounded recursion in the parser module"
+
+
+class CandidateTests(SimpleTestCase):
+
+    def test_stable_advisory_ids_are_not_candidates(self):
+        for cve_id in ('CVE-2021-44228', 'GHSA-jfh8-c2jp-5v3q', 'PYSEC-2021-19', 'RUSTSEC-2021-0001',
+                       'GO-2022-0001', 'SNYK-PYTHON-DJANGO-1066259'):
+            self.assertFalse(is_candidate(cve_id), cve_id)
+
+    def test_made_up_ids_are_candidates(self):
+        for cve_id in ('NEWS-123456', 'SNYK-123456', 'Exploit DB-1234', 'SECURITY_NEWS-1729350000-42', ''):
+            self.assertTrue(is_candidate(cve_id), cve_id)
+
+
+class MinHashTests(SimpleTestCase):
+
+    def setUp(self):
+        self.hasher = MinHasher(num_perm=128)
+
+    def jaccard(self, first, second):
+        a, b = self.hasher.shingles(first), self.hasher.shingles(second)
+        return len(a & b) / len(a | b)
+
+    def test_similarity_estimates_jaccard(self):
+        estimate = similarity(self.hasher.signature(STORY), self.hasher.signature(REWRITE))
+        self.assertAlmostEqual(estimate, self.jaccard(STORY, REWRITE), delta=0.15)
+        self.assertLess(similarity(self.hasher.signature(STORY), self.hasher.signature(OTHER)), 0.1)
+
+    def test_signatures_are_stable(self):
+        other = MinHasher(num_perm=128)
+        self.assertEqual(self.hasher.signature(STORY), other.signature(STORY))
+        packed = self.hasher.pack(self.hasher.signature(STORY))
+        self.assertEqual(self.hasher.unpack(packed), self.hasher.signature(STORY))
+        self.assertIsNone(MinHasher(num_perm=64).unpack(packed))
+
+    def test_empty_text_has_no_signature(self):
+        self.assertIsNone(self.hasher.signature('', '  '))
+
+
+class LshIndexTests(SimpleTestCase):
+
+    def test_query_finds_near_duplicates_only(self):
+        hasher = MinHasher()
+        index = LshIndex(bands=16, rows=4)
+        index.add('story', hasher.signature(STORY))
+        index.add('other', hasher.signature(OTHER))
+        match = index.query(hasher.signature(REWRITE), 0.6)
+        self.assertEqual(match[0], 'story')
+        self.assertIsNone(index.query(hasher.signature('Unrelated text about a printer driver update'), 0.6))
+        self.assertEqual(len(index), 2)
+
+
+class NearDuplicateIndexTests(TestCase):
+
+    def setUp(self):
+        near_dup.reset_index()
+        self.addCleanup(near_dup.reset_index)
+
+    def new(self, cve_id, title):
+        return Vulnerability(cve_id=cve_id, title=title, description='', severity='MEDIUM')
+
+    def save(self, rows):
+        with self.captureOnCommitCallbacks(execute=True):
+            links = near_dup.assign(rows)
+            Vulnerability.objects.bulk_create(rows)
+            near_dup.register(rows, links)
+        return rows
+
+    def test_repeated_story_links_to_stored_row(self):
+        (first,) = self.save([self.new('NEWS-1', STORY)])
+        (second,) = self.save([self.new('NEWS-2', REWRITE)])
+        self.assertEqual(second.canonical_id, first.pk)
+
+    def test_duplicates_in_one_batch_are_linked(self):
+        first, second, other = self.save([self.new('NEWS-1', STORY), self.new('NEWS-2', REWRITE), self.new('NEWS-3', OTHER)])
+        second.refresh_from_db()
+        self.assertEqual(second.canonical_id, first.pk)
+        self.assertIsNone(other.canonical_id)
+
+    def test_templated_advisories_are_not_linked(self):
+        rows = self.save([
+            self.new('GHSA-jfh8-c2jp-5v3q', TEMPLATE.format('libfoo')),
+            self.new('PYSEC-2024-1', TEMPLATE.format('libbar')),
+            self.new('RUSTSEC-2024-0001', TEMPLATE.format('libbaz')),
+        ])
+        for row in rows:
+            row.refresh_from_db()
+            self.assertIsNone(row.canonical_id)
+            self.assertIsNone(row.minhash)
+
+    def test_backfill_unlinks_advisories_linked_earlier(self):
+        advisory = Vulnerability.objects.create(cve_id='GHSA-jfh8-c2jp-5v3q', title=TEMPLATE.format('libfoo'),
+                                                description='', severity='LOW', minhash=b'x')
+        linked = Vulnerability.objects.create(cve_id='PYSEC-2024-1', title=TEMPLATE.format('libbar'),
+                                              description='', severity='LOW', minhash=b'x', canonical=advisory)
+        counts = near_dup.backfill()
+        self.assertEqual(counts['unlinked'], 2)
+        linked.refresh_from_db()
+        self.assertIsNone(linked.canonical_id)
+        self.assertEqual(Vulnerability.objects.filter(minhash__isnull=False).count(), 0)
@@ -0,0 +1,136 @@
+from datetime import timedelta
+
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from collectors.models import AffectedRange, SourceFreshness, Vulnerability, VulnerabilitySource
+from collectors.services import autocomplete, planner
+
+AVAILABLE = ['NVD', 'OSV', 'GITHUB_SECURITY', 'SNYK', 'PYTHON_PACKAGES', 'EXPLOIT_DB']
+PACKAGE_SOURCES = ['OSV', 'GITHUB_SECURITY', 'SNYK', 'PYTHON_PACKAGES', 'NVD']
+
+
+class ClassifyTests(SimpleTestCase):
+
+    def test_classes(self):
+        self.assertEqual(planner.classify('cve-2021-44228'), ('cve', 'CVE-2021-44228', None))
+        self.assertEqual(planner.classify('GHSA-JFH8-C2JP-5V3Q'), ('advisory', 'GHSA-jfh8-c2jp-5v3q', None))
+        self.assertEqual(planner.classify('PYSEC-2021-19'), ('advisory', 'PYSEC-2021-19', None))
+        self.assertEqual(planner.classify('cpe:2.3:a:apache:log4j:2.14.1:*:*:*:*:*:*:*'), ('cpe', 'apache log4j', None))
+        self.assertEqual(planner.classify('pypi:django'), ('package', 'django', 'PyPI'))
+        self.assertEqual(planner.classify('pkg:npm/lodash@4.17.20'), ('package', 'lodash', 'npm'))
+        self.assertEqual(planner.classify('remote  code execution'), ('text', 'remote code execution', None))
+
+    def test_ecosystem_limits_sources(self):
+        self.assertNotIn('PYTHON_PACKAGES', planner.capable_sources('package', 'npm', AVAILABLE))
+        self.assertIn('PYTHON_PACKAGES', planner.capable_sources('package', 'PyPI', AVAILABLE))
+
+
+class BareWordTests(TestCase):
+
+    def setUp(self):
+        autocomplete.reset_index()
+        self.addCleanup(autocomplete.reset_index)
+        self.source = VulnerabilitySource.objects.create(name='OSV', source_type='api')
+
+    def test_unknown_word_is_text_for_every_source(self):
+        query_class, term, ecosystem = planner.classify('ransomware')
+        self.assertEqual((query_class, term, ecosystem), ('text', 'ransomware', None))
+        sources = planner.capable_sources(query_class, ecosystem, AVAILABLE)
+        self.assertIn('EXPLOIT_DB', sources)
+        self.assertEqual(planner.plan('xss', AVAILABLE).query_class, 'text')
+
+    def test_word_naming_a_stored_package_is_a_package(self):
+        Vulnerability.objects.create(cve_id='CVE-2024-0001', title='Lodash prototype pollution', description='',
+                                     severity='HIGH', source=self.source, affected_packages='["npm/lodash"]')
+        self.assertEqual(planner.classify('Lodash'), ('package', 'Lodash', None))
+
+    def test_word_naming_a_ranged_package_is_a_package(self):
+        vuln = Vulnerability.objects.create(cve_id='CVE-2024-0002', title='Flaw', description='',
+                                            severity='HIGH', source=self.source)
+        AffectedRange.objects.create(vulnerability=vuln, advisory_id='PYSEC-2024-1', ecosystem='PyPI',
+                                     package='django-rest-framework', fixed='3.15')
+        self.assertEqual(planner.classify('django_rest_framework')[0], 'package')
+
+
+class PlanTests(TestCase):
+
+    def setUp(self):
+        autocomplete.reset_index()
+        self.addCleanup(autocomplete.reset_index)
+        self.source = VulnerabilitySource.objects.create(name='OSV', source_type='api')
+        autocomplete.get_index().load([(0, '', '["PyPI/django"]')], [])  # 'django' names a known package
+
+    def store(self, cve_id, title, **fields):
+        return Vulnerability.objects.create(cve_id=cve_id, title=title, description='', severity='HIGH',
+                                            source=self.source, **fields)
+
+    def mark_fresh(self, key, sources, age=0):
+        fetched_at = timezone.now() - timedelta(seconds=age)
+        for source in sources:
+            SourceFreshness.objects.create(source=source, query_key=key, query_class=key.split(':')[0],
+                                           fetched_at=fetched_at)
+
+    def test_unanswered_package_query_fetches_everything_without_local_rows(self):
+        self.store('CVE-2024-0001', 'django SQL injection')
+        result = planner.plan('django', AVAILABLE)
+        self.assertEqual(result.run, PACKAGE_SOURCES)
+        self.assertEqual(result.local, [])
+
+    def test_partly_fresh_package_query_returns_stored_rows(self):
+        # A first search stored the rows and every source but GITHUB_SECURITY answered
+        for number in range(9):
+            self.store(f'CVE-2024-000{number}', f'django issue {number}')
+        first = planner.plan('django', AVAILABLE)
+        planner.record_fetched(first, [source for source in first.run if source != 'GITHUB_SECURITY'], {})
+
+        repeat = planner.plan('django', AVAILABLE)
+        self.assertEqual(repeat.run, ['GITHUB_SECURITY'])
+        self.assertEqual(repeat.fresh, sorted(set(PACKAGE_SOURCES) - {'GITHUB_SECURITY'}))
+        self.assertEqual(len(repeat.local), 9)
+        self.assertEqual(repeat.describe()['local_results'], 9)
+
+    def test_fresh_package_query_is_answered_locally(self):
+        self.store('CVE-2024-0001', 'django SQL injection')
+        self.mark_fresh('package:django', PACKAGE_SOURCES)
+        result = planner.plan('django', AVAILABLE)
+        self.assertTrue(result.answered_locally)
+        self.assertEqual([record.cve_id for record in result.local], ['CVE-2024-0001'])
+
+    def test_stale_sources_are_fetched_again(self):
+        self.mark_fresh('package:django', PACKAGE_SOURCES, age=7 * 3600)
+        self.assertEqual(planner.plan('django', AVAILABLE).run, PACKAGE_SOURCES)
+
+    def test_refresh_ignores_freshness(self):
+        self.mark_fresh('package:django', PACKAGE_SOURCES)
+        result = planner.plan('django', AVAILABLE, refresh=True)
+        self.assertEqual(result.run, PACKAGE_SOURCES)
+        self.assertEqual(result.fresh, [])
+
+    def test_recently_updated_id_is_answered_locally(self):
+        self.store('CVE-2021-44228', 'Log4Shell')
+        result = planner.plan('CVE-2021-44228', AVAILABLE)
+        self.assertTrue(result.answered_locally)
+        self.assertEqual([record.cve_id for record in result.local], ['CVE-2021-44228'])
+
+    def test_id_of_near_duplicate_resolves_to_canonical_row(self):
+        canonical = self.store('NEWS-2024-0001', 'Acme VPN exploited')
+        self.store('BLOG-2024-0002', 'Acme VPN exploited again', canonical=canonical)
+        result = planner.plan('BLOG-2024-0002', AVAILABLE)
+        self.assertEqual(result.query_class, 'advisory')
+        self.assertEqual([record.cve_id for record in result.local], ['NEWS-2024-0001'])
+        self.assertEqual(result.local[0].source, 'OSV')
+
+    def test_listing_queries_leave_near_duplicates_out(self):
+        canonical = self.store('NEWS-2024-0001', 'Acme VPN exploited')
+        self.store('BLOG-2024-0002', 'Acme VPN exploited again', canonical=canonical)
+        self.mark_fresh('text:acme vpn', planner.capable_sources('text', None, AVAILABLE))
+        result = planner.plan('acme vpn', AVAILABLE)
+        self.assertEqual([record.cve_id for record in result.local], ['NEWS-2024-0001'])
+
+    def test_record_fetched_updates_freshness(self):
+        result = planner.plan('django', AVAILABLE)
+        planner.record_fetched(result, ['OSV'], {'OSV': 4})
+        planner.record_fetched(result, ['OSV'], {'OSV': 6})
+        row = SourceFreshness.objects.get(source='OSV', query_key=result.key)
+        self.assertEqual((row.query_class, row.results_count), ('package', 6))
@@ -0,0 +1,79 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from collectors import collector
+from collectors.models import PurgeState, Vulnerability, VulnerabilitySource, VulnerabilityStat
+from collectors.services import autocomplete, known_ids, purge
+
+
+class PurgeGenerationTests(TestCase):
+
+    def setUp(self):
+        purge._swap_generation(purge.purge_generation())
+        self.addCleanup(purge.reset_process_caches)
+
+    def warm_caches(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            collector.get_source('NVD')
+        return known_ids.get_filter(), autocomplete.get_index()
+
+    def purge_elsewhere(self):
+        # What purge_all in another worker leaves behind: new generation, empty tables
+        PurgeState.objects.update_or_create(pk=1, defaults={'generation': purge.purge_generation() + 1})
+        VulnerabilitySource.objects.all().delete()
+
+    def test_caches_survive_when_nothing_was_purged(self):
+        known, index = self.warm_caches()
+        purge.check_purge_generation()
+        self.assertIs(known_ids.get_filter(), known)
+        self.assertIs(autocomplete.get_index(), index)
+        self.assertIn('NVD', collector._source_cache)
+
+    def test_purge_in_another_process_resets_caches(self):
+        known, index = self.warm_caches()
+        self.purge_elsewhere()
+        purge.check_purge_generation()
+        self.assertNotIn('NVD', collector._source_cache)
+        self.assertIsNot(known_ids.get_filter(), known)
+        self.assertIsNot(autocomplete.get_index(), index)
+
+    def test_requests_check_the_generation(self):
+        known, _ = self.warm_caches()
+        self.purge_elsewhere()
+        self.client.get('/collectors/api/delete/')
+        self.assertNotIn('NVD', collector._source_cache)
+        self.assertIsNot(known_ids.get_filter(), known)
+
+    def test_purge_all_bumps_the_generation(self):
+        source = VulnerabilitySource.objects.create(name='NVD', source_type='scraper')
+        Vulnerability.objects.create(cve_id='CVE-2024-0001', title='a', description='', severity='LOW', source=source)
+        VulnerabilityStat.objects.create(dimension='total', key='all', count=1)
+        before = purge.purge_generation()
+
+        purge.purge_all()
+
+        self.assertEqual(purge.purge_generation(), before + 1)
+        self.assertFalse(Vulnerability.objects.exists())
+        self.assertFalse(VulnerabilityStat.objects.exists())
+
+
+@mock.patch.object(purge.PurgeJob, '_run')
+class PurgeJobTests(TestCase):
+
+    def test_one_job_at_a_time(self, run):
+        self.assertTrue(purge.PurgeJob.start())
+        self.assertEqual(purge.PurgeJob.status()['state'], 'running')
+        self.assertFalse(purge.PurgeJob.start())
+
+    def test_stale_job_can_be_restarted(self, run):
+        PurgeState.objects.create(pk=1, state='running', started_at=timezone.now() - timedelta(days=1))
+        self.assertTrue(purge.PurgeJob.start())
+
+    def test_status_is_read_from_the_shared_row(self, run):
+        PurgeState.objects.create(pk=1, state='done', deleted='{"Vulnerability": 3}', finished_at=timezone.now())
+        response = self.client.get('/collectors/api/delete/')
+        self.assertEqual(response.json()['state'], 'done')
+        self.assertEqual(response.json()['deleted'], {'Vulnerability': 3})
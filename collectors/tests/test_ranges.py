@@ -0,0 +1,99 @@
+from django.test import TransactionTestCase
+
+from collectors.collector import get_source, reset_source_cache
+from collectors.models import AffectedRange, CpeMatch, Vulnerability
+from collectors.services import known_ids, near_dup
+from collectors.services.pipeline import HarvestPipeline
+from collectors.services.records import VulnRecord
+from collectors.services.writer import save_in_transaction
+
+LOG4J = [{'ecosystem': 'Maven', 'package': 'org.apache.logging.log4j:log4j-core',
+          'intervals': [('2.0-beta9', '2.15.0', '')]}]
+LOG4J_FIX = [{'ecosystem': 'Maven', 'package': 'org.apache.logging.log4j:log4j-core',
+              'intervals': [('2.0-beta9', '2.16.0', '')]}]
+CPE = [{'criteria': 'cpe:2.3:a:apache:log4j:*:*:*:*:*:*:*:*', 'part': 'a', 'vendor': 'apache', 'product': 'log4j',
+        'version': '*', 'version_start': '2.0', 'start_inclusive': True, 'version_end': '2.15.0',
+        'end_inclusive': False}]
+
+
+def nvd(cve_id='CVE-2021-44228', **fields):
+    return 'NVD', VulnRecord(cve_id=cve_id, title='Log4Shell', source='NVD', **fields)
+
+
+def osv(advisory_id, affected_ranges, cve_id='CVE-2021-44228'):
+    return 'OSV', VulnRecord(cve_id=cve_id, title=f"{advisory_id} in log4j", source='OSV',
+                             advisory_id=advisory_id, affected_ranges=affected_ranges)
+
+
+def stored_ranges():
+    return sorted(AffectedRange.objects.values_list('vulnerability__cve_id', 'advisory_id', 'fixed'))
+
+
+class RangeTestCase(TransactionTestCase):
+
+    def setUp(self):
+        reset_source_cache()
+        known_ids.reset_filter()
+        near_dup.reset_index()
+        get_source('NVD')
+        self.addCleanup(known_ids.reset_filter)
+        self.addCleanup(near_dup.reset_index)
+
+
+class StoreRangesTests(RangeTestCase):
+
+    def test_ranges_of_a_repeated_id_in_one_batch_are_kept(self):
+        save_in_transaction([([nvd(), osv('GHSA-jfh8-c2jp-5v3q', LOG4J)], False)])
+        self.assertEqual(Vulnerability.objects.get().source.name, 'NVD')
+        self.assertEqual(stored_ranges(), [('CVE-2021-44228', 'GHSA-jfh8-c2jp-5v3q', '2.15.0')])
+
+    def test_ranges_arriving_for_a_stored_row_are_kept(self):
+        save_in_transaction([([nvd()], False)])
+        save_in_transaction([([osv('GHSA-jfh8-c2jp-5v3q', LOG4J)], False)])
+        # A second advisory aliasing the same CVE adds its own ranges
+        save_in_transaction([([osv('GHSA-7rjr-3q55-vv33', LOG4J_FIX)], True)])
+        self.assertEqual(stored_ranges(), [
+            ('CVE-2021-44228', 'GHSA-7rjr-3q55-vv33', '2.16.0'),
+            ('CVE-2021-44228', 'GHSA-jfh8-c2jp-5v3q', '2.15.0'),
+        ])
+
+    def test_advisory_seen_again_replaces_its_ranges(self):
+        save_in_transaction([([osv('GHSA-jfh8-c2jp-5v3q', LOG4J)], False)])
+        save_in_transaction([([osv('GHSA-jfh8-c2jp-5v3q', LOG4J)], False)])
+        self.assertEqual(AffectedRange.objects.count(), 1)
+        save_in_transaction([([osv('GHSA-jfh8-c2jp-5v3q', LOG4J_FIX)], False)])
+        self.assertEqual(stored_ranges(), [('CVE-2021-44228', 'GHSA-jfh8-c2jp-5v3q', '2.16.0')])
+
+    def test_cpe_criteria_are_stored_once(self):
+        save_in_transaction([([nvd()], False)])
+        save_in_transaction([([nvd(cpe_matches=CPE)], False)])
+        save_in_transaction([([nvd(cpe_matches=CPE)], False)])
+        self.assertEqual(list(CpeMatch.objects.values_list('vendor', 'product', 'version_end')),
+                         [('apache', 'log4j', '2.15.0')])
+
+
+class FakeAggregator:
+
+    def __init__(self, results):
+        self.scrapers = {source: None for source in results}
+        self.results = results
+
+    def iter_source(self, source, query):
+        yield len(self.results[source]), self.results[source]
+
+
+class PipelineRangeTests(RangeTestCase):
+
+    def test_repeated_id_in_a_harvest_keeps_its_ranges(self):
+        get_source('OSV')
+        aggregator = FakeAggregator({'NVD': [nvd()[1]], 'OSV': [osv('GHSA-jfh8-c2jp-5v3q', LOG4J)[1]]})
+        batches = list(HarvestPipeline(aggregator, 'log4j'))
+        self.assertEqual(sum(len(batch.records) for batch in batches), 1)
+        self.assertEqual(stored_ranges(), [('CVE-2021-44228', 'GHSA-jfh8-c2jp-5v3q', '2.15.0')])
+
+    def test_ranges_for_an_id_answered_locally_are_kept(self):
+        save_in_transaction([([nvd()], False)])
+        aggregator = FakeAggregator({'OSV': [osv('GHSA-jfh8-c2jp-5v3q', LOG4J)[1]]})
+        batches = list(HarvestPipeline(aggregator, 'log4j', seen={'CVE-2021-44228'}))
+        self.assertEqual(batches, [])
+        self.assertEqual(stored_ranges(), [('CVE-2021-44228', 'GHSA-jfh8-c2jp-5v3q', '2.15.0')])
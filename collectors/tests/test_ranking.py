@@ -0,0 +1,172 @@
+import json
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from collectors.collector import stream_harvest
+from collectors.services.ranking import count_term, rank, tokenize
+from collectors.services.records import VulnRecord
+
+
+def record(cve_id, title, description='', **fields):
+    return VulnRecord(cve_id=cve_id, title=title, source=fields.pop('source', 'NVD'), description=description, **fields)
+
+
+# Only text relevance, so the tests exercise BM25 alone
+TEXT_ONLY = {'EXACT_ID': 0, 'ID_MENTION': 0, 'PACKAGE': 0, 'PACKAGE_TERM': 0, 'SOURCE': 0, 'CVSS': 0, 'RECENCY': 0}
+
+
+class CountTermTests(SimpleTestCase):
+
+    def test_counts_whole_tokens_only(self):
+        self.assertEqual(count_term('log4j and log4j2 use log4j', 'log4j'), 2)
+        self.assertEqual(count_term('xlog4j', 'log4j'), 0)
+        self.assertEqual(count_term('', 'log4j'), 0)
+
+    def test_tokenize_lowercases_and_splits(self):
+        self.assertEqual(tokenize('Apache Log4j-Core RCE'), ['apache', 'log4j', 'core', 'rce'])
+        self.assertEqual(tokenize(''), [])
+
+
+class BM25Tests(SimpleTestCase):
+
+    def test_empty_candidates(self):
+        self.assertEqual(rank('django', []), [])
+
+    def test_rare_term_outweighs_common_term(self):
+        items = [
+            record('CVE-2021-0001', 'Remote code execution in foo'),
+            record('CVE-2021-0002', 'Remote code execution in bar'),
+            record('CVE-2021-0003', 'Remote code execution in log4j'),
+            record('CVE-2021-0004', 'Denial of service in baz'),
+        ]
+        ranked = rank('log4j execution', items, TEXT_ONLY)
+        self.assertEqual(ranked[0][1].cve_id, 'CVE-2021-0003')
+        self.assertEqual(ranked[-1][1].cve_id, 'CVE-2021-0004')
+        self.assertEqual(ranked[-1][0], 0)
+
+    def test_title_match_beats_description_match(self):
+        items = [
+            record('CVE-2021-0001', 'Unrelated issue', 'A flaw in django templates'),
+            record('CVE-2021-0002', 'Django template flaw', 'An unrelated description'),
+        ]
+        ranked = rank('django', items, TEXT_ONLY)
+        self.assertEqual(ranked[0][1].cve_id, 'CVE-2021-0002')
+
+    def test_text_score_is_scaled_to_one(self):
+        items = [record('CVE-2021-0001', 'django django'), record('CVE-2021-0002', 'django')]
+        ranked = rank('django', items, TEXT_ONLY)
+        self.assertAlmostEqual(ranked[0][0], 1.0)
+        self.assertLess(ranked[1][0], 1.0)
+
+    def test_term_frequency_saturates(self):
+        items = [
+            record('CVE-2021-0001', 'ssl', 'ssl ' * 50),
+            record('CVE-2021-0002', 'ssl', 'ssl ' * 5),
+        ]
+        high, low = (score for score, _ in rank('ssl', items, TEXT_ONLY))
+        self.assertLess(high / low, 2)
+
+    def test_longer_documents_are_normalized(self):
+        items = [
+            record('CVE-2021-0001', 'openssl', 'padding ' * 200),
+            record('CVE-2021-0002', 'openssl', 'short'),
+        ]
+        ranked = rank('openssl', items, TEXT_ONLY)
+        self.assertEqual(ranked[0][1].cve_id, 'CVE-2021-0002')
+
+
+class BoostTests(SimpleTestCase):
+
+    def test_exact_id_ranks_first(self):
+        items = [
+            record('CVE-2021-0001', 'Mentions CVE-2021-44228 in the title'),
+            record('CVE-2021-44228', 'Apache Log4j2 JNDI features'),
+        ]
+        ranked = rank('cve-2021-44228', items)
+        self.assertEqual(ranked[0][1].cve_id, 'CVE-2021-44228')
+
+    def test_advisory_id_counts_as_exact(self):
+        items = [
+            record('CVE-2021-0001', 'Other'),
+            record('CVE-2021-0002', 'Other', advisory_id='GHSA-jfh8-c2jp-5v3q'),
+        ]
+        self.assertEqual(rank('GHSA-jfh8-c2jp-5v3q', items)[0][1].cve_id, 'CVE-2021-0002')
+
+    def test_affected_package_match(self):
+        items = [
+            record('CVE-2021-0001', 'Django in the title only'),
+            record('CVE-2021-0002', 'SQL injection', affected_packages=['PyPI/django']),
+        ]
+        weights = dict(TEXT_ONLY, PACKAGE=1.5)
+        self.assertEqual(rank('PyPI/django', items, weights)[0][1].cve_id, 'CVE-2021-0002')
+
+    def test_source_trust_cvss_and_recency_break_ties(self):
+        now = datetime.now(timezone.utc)
+        items = [
+            record('CVE-2021-0001', 'django', source='SECURITY_NEWS', cvss_score=2.0,
+                   published_date=datetime(2010, 1, 1, tzinfo=timezone.utc)),
+            record('CVE-2021-0002', 'django', source='NVD', cvss_score=9.8, published_date=now),
+        ]
+        self.assertEqual(rank('django', items)[0][1].cve_id, 'CVE-2021-0002')
+
+
+class SearchOrderTests(TestCase):
+
+    def post(self, **body):
+        with mock.patch('collectors.views.stream_harvest', return_value=iter([b'{}'])) as harvest:
+            response = self.client.post('/collectors/api/search/', json.dumps(body), content_type='application/json')
+        return response, harvest
+
+    def test_relevance_is_the_default_order(self):
+        response, harvest = self.post(query='django')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(harvest.call_args.kwargs['ranked'])
+
+    def test_arrival_order_streams_unranked(self):
+        response, harvest = self.post(query='django', order='arrival')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(harvest.call_args.kwargs['ranked'])
+
+    def test_unknown_order_is_rejected(self):
+        response, harvest = self.post(query='django', order='newest')
+        self.assertEqual(response.status_code, 400)
+        harvest.assert_not_called()
+
+
+class RankedStreamTests(SimpleTestCase):
+
+    def harvest(self, local, batches, ranked=True):
+        pipeline = [SimpleNamespace(records=[('NVD', item) for item in batch]) for batch in batches]
+        plan = SimpleNamespace(local=local)
+        with mock.patch('collectors.collector.harvest_pipeline', return_value=(pipeline, plan)), \
+                mock.patch('collectors.collector._finish'), \
+                mock.patch('collectors.collector._json_tail', return_value=b'], "success": true}'):
+            chunks = list(stream_harvest('log4j', ranked=ranked))
+        return chunks, [row['cve_id'] for row in json.loads(b''.join(chunks))['vulnerabilities']]
+
+    def test_small_harvest_is_ranked_as_a_whole(self):
+        chunks, order = self.harvest([record('CVE-2021-0001', 'Other issue')],
+                                     [[record('CVE-2021-0002', 'log4j remote code execution')]])
+        self.assertEqual(order, ['CVE-2021-0002', 'CVE-2021-0001'])
+        self.assertEqual(len(chunks), 3)  # Head, ranked rows, tail
+
+    @override_settings(RANKING={'MAX_CANDIDATES': 2})
+    def test_ranked_buffer_is_capped(self):
+        batches = [
+            [record('CVE-2021-0001', 'Other issue'), record('CVE-2021-0002', 'log4j flaw')],
+            [record('CVE-2021-0003', 'log4j bug')],
+            [record('CVE-2021-0004', 'Unrelated')],
+        ]
+        chunks, order = self.harvest([], batches)
+        # The first two are ranked and written as soon as they are held, the rest follow as they arrive
+        self.assertEqual(order, ['CVE-2021-0002', 'CVE-2021-0001', 'CVE-2021-0003', 'CVE-2021-0004'])
+        self.assertEqual(len(chunks), 5)
+
+    def test_arrival_order(self):
+        chunks, order = self.harvest([record('CVE-2021-0001', 'Other issue')],
+                                     [[record('CVE-2021-0002', 'log4j remote code execution')]], ranked=False)
+        self.assertEqual(order, ['CVE-2021-0001', 'CVE-2021-0002'])
+        self.assertEqual(len(chunks), 4)
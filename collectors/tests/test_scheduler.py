@@ -0,0 +1,172 @@
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+
+from collectors.collector import _finish, get_source, reset_source_cache
+from collectors.models import SourceFreshness, SourceStats, Vulnerability
+from collectors.services import known_ids, near_dup, scheduler
+from collectors.services.pipeline import HarvestPipeline
+from collectors.services.records import VulnRecord
+
+CONFIG = dict(scheduler.get_scheduler_settings(), MIN_RUNS=2, MIN_SUCCESS_RATE=0.5, MIN_YIELD=0.5,
+              TIMEOUT_FACTOR=3, MIN_TIMEOUT=1)
+
+
+def stat(**fields):
+    values = dict(runs=0, successes=0, failures=0, timeouts=0, results=0, unique_results=0.0,
+                  latency=0.0, latency_var=0.0, success_rate=1.0, unique_yield=0.0)
+    values.update(fields)
+    return SimpleNamespace(**values)
+
+
+def record(cve_id, source):
+    return VulnRecord(cve_id=cve_id, title=f"{cve_id} in example", source=source)
+
+
+class FakeAggregator:
+    """Returns canned records per source, one page each"""
+
+    def __init__(self, results):
+        self.scrapers = {source: None for source in results}
+        self.results = results
+
+    def iter_source(self, source, query):
+        yield len(self.results[source]), self.results[source]
+
+
+class ObserveTests(SimpleTestCase):
+
+    def test_first_run_sets_the_averages(self):
+        row = stat()
+        scheduler.observe(row, 'failure', 2.0, 0, 0.0, 0.2)
+        self.assertEqual((row.runs, row.failures, row.latency, row.success_rate), (1, 1, 2.0, 0.0))
+
+    def test_later_runs_are_weighted_by_decay(self):
+        row = stat()
+        scheduler.observe(row, 'success', 1.0, 4, 2.0, 0.5)
+        scheduler.observe(row, 'timeout', 3.0, 0, 0.0, 0.5)
+        self.assertEqual((row.runs, row.successes, row.timeouts, row.results), (2, 1, 1, 4))
+        self.assertAlmostEqual(row.latency, 2.0)
+        self.assertAlmostEqual(row.latency_var, 1.0)
+        self.assertAlmostEqual(row.success_rate, 0.5)
+        self.assertAlmostEqual(row.unique_yield, 1.0)
+
+
+class ArrangeTests(SimpleTestCase):
+
+    def test_untried_sources_go_first_without_timeout(self):
+        stats = {'NVD': stat(runs=5, latency=1.0, unique_yield=2.0), 'OSV': stat(runs=1)}
+        run, demoted, timeouts = scheduler.arrange(['NVD', 'OSV', 'SNYK'], stats, CONFIG, 30)
+        self.assertEqual(run, ['OSV', 'SNYK', 'NVD'])
+        self.assertEqual(demoted, [])
+        self.assertEqual(list(timeouts), ['NVD'])
+
+    def test_ranked_by_value_and_low_value_demoted(self):
+        stats = {
+            'NVD': stat(runs=5, latency=2.0, unique_yield=2.0),
+            'OSV': stat(runs=5, latency=0.5, unique_yield=2.0),
+            'GITHUB_SECURITY': stat(runs=5, latency=1.0, success_rate=0.2, unique_yield=2.0),
+            'EXPLOIT_DB': stat(runs=5, latency=1.0, unique_yield=0.0),
+        }
+        run, demoted, _ = scheduler.arrange(list(stats), stats, CONFIG, 30)
+        self.assertEqual(run, ['OSV', 'NVD'])
+        self.assertEqual(demoted, ['GITHUB_SECURITY', 'EXPLOIT_DB'])
+
+    def test_keeps_the_best_source_when_all_are_demoted(self):
+        stats = {
+            'GITHUB_SECURITY': stat(runs=5, latency=1.0, success_rate=0.2, unique_yield=2.0),
+            'EXPLOIT_DB': stat(runs=5, latency=1.0, unique_yield=0.1),
+        }
+        run, demoted, timeouts = scheduler.arrange(list(stats), stats, CONFIG, 30)
+        self.assertEqual(run, ['GITHUB_SECURITY'])
+        self.assertEqual(demoted, ['EXPLOIT_DB'])
+        self.assertIn('GITHUB_SECURITY', timeouts)
+
+    def test_timeout_is_bounded(self):
+        self.assertEqual(scheduler.timeout_for(stat(latency=1.0, latency_var=0.25), CONFIG, 30), 2.5)
+        self.assertEqual(scheduler.timeout_for(stat(latency=0.1), CONFIG, 30), 1)
+        self.assertEqual(scheduler.timeout_for(stat(latency=20.0, latency_var=25.0), CONFIG, 30), 30)
+
+
+class RecordTests(TestCase):
+
+    def test_outcomes_are_folded_into_stored_stats(self):
+        pipeline = SimpleNamespace(
+            sources=['NVD', 'OSV', 'SNYK', 'EXPLOIT_DB'], completed={'NVD', 'OSV'}, failed={'SNYK'},
+            timed_out=set(), latency={'NVD': 1.5, 'OSV': 0.5, 'SNYK': 2.0}, found={'NVD': 3, 'OSV': 1, 'SNYK': 0},
+            yield_by_source=lambda shared=None: {'NVD': 2.5, 'OSV': 0.5},
+        )
+        scheduler.record('package', pipeline)
+        scheduler.record('package', pipeline)
+        stats = {row.source: row for row in SourceStats.objects.filter(query_class='package')}
+        # EXPLOIT_DB stopped early and has no outcome
+        self.assertEqual(sorted(stats), ['NVD', 'OSV', 'SNYK'])
+        self.assertEqual((stats['NVD'].runs, stats['NVD'].results), (2, 6))
+        self.assertAlmostEqual(stats['NVD'].unique_yield, 2.5)
+        self.assertEqual((stats['SNYK'].failures, stats['SNYK'].success_rate), (2, 0.0))
+
+
+class BackgroundRefreshTests(TransactionTestCase):
+
+    def setUp(self):
+        reset_source_cache()
+        known_ids.reset_filter()
+        near_dup.reset_index()
+        get_source('SNYK')
+        self.addCleanup(known_ids.reset_filter)
+        self.addCleanup(near_dup.reset_index)
+
+    def plan(self, local):
+        return SimpleNamespace(term='django', key='package:django', query_class='package',
+                               local=[record(cve_id, 'OSV') for cve_id in local], demoted=['SNYK'])
+
+    def test_refresh_only_shares_credit_for_ids_the_search_answered(self):
+        aggregator = FakeAggregator({'SNYK': [record('CVE-2024-0001', 'SNYK'), record('CVE-2024-0002', 'SNYK')]})
+        plan = self.plan(['CVE-2024-0001'])
+        scheduler._refresh(plan, aggregator, ['SNYK'], {'CVE-2024-0001'})
+
+        stats = SourceStats.objects.get(source='SNYK', query_class='package')
+        self.assertAlmostEqual(stats.unique_yield, 1.5)
+        self.assertTrue(SourceFreshness.objects.filter(source='SNYK', query_key='package:django').exists())
+        # Only the ID the search had not answered is stored
+        self.assertEqual(list(Vulnerability.objects.values_list('cve_id', flat=True)), ['CVE-2024-0002'])
+        self.assertEqual(scheduler._pending, set())
+
+    def test_seen_defaults_to_the_local_rows(self):
+        plan = self.plan(['CVE-2024-0001', 'CVE-2024-0003'])
+        executor = mock.Mock()
+        with mock.patch.object(scheduler, 'get_executor', return_value=executor):
+            scheduler.refresh_in_background(plan, FakeAggregator({'SNYK': []}))
+        _, _, sources, seen = executor.submit.call_args.args[1:]
+        self.assertEqual((sources, seen), (['SNYK'], {'CVE-2024-0001', 'CVE-2024-0003'}))
+        scheduler._pending.clear()
+
+
+class SearchCreditTests(TransactionTestCase):
+
+    def setUp(self):
+        reset_source_cache()
+        known_ids.reset_filter()
+        near_dup.reset_index()
+        get_source('NVD')
+        self.addCleanup(known_ids.reset_filter)
+        self.addCleanup(near_dup.reset_index)
+
+    def test_search_and_refresh_credit_local_ids_alike(self):
+        local = [record('CVE-2024-0001', 'OSV')]
+        returned = [record('CVE-2024-0001', 'NVD'), record('CVE-2024-0002', 'NVD')]
+        plan = SimpleNamespace(term='django', key='package:django', query_class='package', local=local,
+                               demoted=[], run=['NVD'])
+        pipeline = HarvestPipeline(FakeAggregator({'NVD': returned}), 'django', sources=['NVD'],
+                                   seen={r.cve_id for r in local})
+        list(pipeline)
+        with mock.patch('collectors.collector.record_search_event'):
+            _finish('django', pipeline, plan, None, '')
+        searched = SourceStats.objects.get(source='NVD', query_class='package').unique_yield
+
+        SourceStats.objects.all().delete()
+        scheduler._refresh(plan, FakeAggregator({'NVD': returned}), ['NVD'], {r.cve_id for r in local})
+        refreshed = SourceStats.objects.get(source='NVD', query_class='package').unique_yield
+        self.assertAlmostEqual(searched, 1.5)
+        self.assertAlmostEqual(refreshed, searched)
@@ -0,0 +1,71 @@
+from collections import Counter
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from collectors.models import SearchQuery, SearchQueryDaily, SearchQueryStat, VulnerabilityStat
+from collectors.services.purge import apply_search_retention
+from collectors.services.records import VulnRecord
+from collectors.services.stats import rebuild_stats, record_vulnerabilities
+
+
+class RollupTests(TestCase):
+
+    def counts(self, dimension):
+        return dict(VulnerabilityStat.objects.filter(dimension=dimension).values_list('key', 'count'))
+
+    def test_new_records_are_counted(self):
+        record_vulnerabilities([
+            VulnRecord(cve_id='CVE-2024-0001', title='a', source='NVD', severity='HIGH'),
+            VulnRecord(cve_id='CVE-2024-0002', title='b', source='OSV', severity='HIGH'),
+        ])
+        self.assertEqual(self.counts('total'), {'all': 2})
+        self.assertEqual(self.counts('severity'), {'HIGH': 2})
+        self.assertEqual(self.counts('source'), {'NVD': 1, 'OSV': 1})
+
+    def test_changes_move_counts_between_keys(self):
+        record_vulnerabilities([VulnRecord(cve_id='CVE-2024-0001', title='a', source='NVD', severity='LOW')])
+        record_vulnerabilities([], Counter({('severity', 'LOW'): -1, ('severity', 'HIGH'): 1, ('total', 'all'): 0}))
+        self.assertEqual(self.counts('severity'), {'LOW': 0, 'HIGH': 1})
+        self.assertEqual(self.counts('total'), {'all': 1})
+
+
+class RebuildTests(TestCase):
+
+    def search(self, query, results_count, days_ago):
+        SearchQuery.objects.create(query=query, results_count=results_count,
+                                   created_at=timezone.now() - timedelta(days=days_ago))
+
+    def test_rebuild_keeps_searches_rolled_up_by_retention(self):
+        self.search('Django', 4, 200)
+        self.search('django ', 2, 200)
+        self.search('log4j', 0, 150)
+        self.search('django', 0, 1)
+        self.assertEqual(apply_search_retention(days=90)['rolled_up'], 3)
+        self.assertEqual(SearchQueryDaily.objects.count(), 2)
+
+        rebuild_stats()
+        stats = {stat.query: stat for stat in SearchQueryStat.objects.all()}
+        self.assertEqual(sorted(stats), ['django', 'log4j'])
+        self.assertEqual((stats['django'].search_count, stats['django'].zero_result_count), (3, 1))
+        self.assertEqual(stats['django'].last_results_count, 0)  # The recent raw search
+        self.assertEqual((stats['log4j'].search_count, stats['log4j'].zero_result_count), (1, 1))
+
+
+class DashboardTests(TestCase):
+
+    def setUp(self):
+        SearchQueryStat.objects.bulk_create(
+            SearchQueryStat(query=f"query {n}", search_count=n) for n in range(1, 6)
+        )
+
+    @override_settings(VULNERABILITY_SCANNER={'DASHBOARD_TOP_QUERIES': 2})
+    def test_top_queries_default_comes_from_settings(self):
+        data = self.client.get('/collectors/dashboard/').json()
+        self.assertEqual([q['query'] for q in data['top_queries']], ['query 5', 'query 4'])
+
+    @override_settings(VULNERABILITY_SCANNER={'DASHBOARD_TOP_QUERIES': 2})
+    def test_top_parameter_overrides_the_default(self):
+        data = self.client.get('/collectors/dashboard/?top=3').json()
+        self.assertEqual(len(data['top_queries']), 3)
@@ -0,0 +1,161 @@
+import json
+
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+
+from collectors.models import IndexGeneration, Vulnerability
+from collectors.services import manifest
+from collectors.services.range_index import IntervalIndex, compact_osv_affected, store_ranges
+from collectors.services.versions import normalize_package_name, version_key
+
+
+class VersionKeyTests(SimpleTestCase):
+
+    def assertOrdered(self, ecosystem, *versions):
+        keys = [version_key(ecosystem, version) for version in versions]
+        for (lower, key), (higher, next_key) in zip(zip(versions, keys), zip(versions[1:], keys[1:])):
+            self.assertLess(key, next_key, f"{ecosystem}: {lower} < {higher}")
+
+    def test_pypi(self):
+        self.assertOrdered('PyPI', '1.0.dev1', '1.0a1', '1.0b2', '1.0rc1', '1.0', '1.0.post1', '1.1', '1!0.1')
+        self.assertEqual(version_key('PyPI', '1.0'), version_key('PyPI', '1.0.0'))
+
+    def test_semver(self):
+        self.assertOrdered('npm', '1.0.0-alpha', '1.0.0-alpha.1', '1.0.0-beta.2', '1.0.0-beta.11', '1.0.0', '1.0.1')
+        self.assertOrdered('Go', 'v0.9.0', 'v1.2.3', 'v2.0.0+incompatible')
+
+    def test_maven(self):
+        self.assertOrdered('Maven', '2.0-alpha1', '2.0-a2', '2.0-beta9', '2.0-m1', '2.0-rc1', '2.0-cr2',
+                           '2.0-SNAPSHOT', '2.0', '2.0-sp1', '2.0.1', '2.15.0-rc1', '2.15.0')
+        self.assertOrdered('Maven', '31.1-android', '31.1-jre', '32.0-jre')
+        self.assertEqual(version_key('Maven', '1.0'), version_key('Maven', '1.0.0'))
+        self.assertEqual(version_key('Maven', '5.3.0.RELEASE'), version_key('Maven', '5.3'))
+
+    def test_rubygems(self):
+        self.assertOrdered('RubyGems', '1.2.3.alpha', '1.2.3.pre1', '1.2.3.pre2', '1.2.3', '1.2.3.1', '1.10')
+        self.assertEqual(version_key('RubyGems', '1.2'), version_key('RubyGems', '1.2.0'))
+        self.assertLess(version_key('RubyGems', '1.2.3.0.pre'), version_key('RubyGems', '1.2.3'))
+
+    def test_unparsed_versions_sort_after_parsed_ones(self):
+        self.assertLess(version_key('npm', '99.0.0'), version_key('npm', 'not a version'))
+        self.assertLess(version_key('', '1.9'), version_key('', '1.10'))
+
+    def test_package_names(self):
+        self.assertEqual(normalize_package_name('PyPI', 'Django_Rest.Framework'), 'django-rest-framework')
+        self.assertEqual(normalize_package_name('npm', 'Lodash'), 'lodash')
+        self.assertEqual(normalize_package_name('Maven', 'org.Apache:Log4j'), 'org.Apache:Log4j')
+
+
+class ManifestTests(SimpleTestCase):
+
+    def test_requirements(self):
+        text = 'Django==4.2.1  # web\nrequests>=2.0\nflask[async]===2.3.0; python_version > "3"\n-r base.txt\nx==1.*\n'
+        self.assertEqual(manifest.parse_manifest(text, 'requirements.txt'), ('requirements', [
+            ('PyPI', 'Django', '4.2.1'), ('PyPI', 'requests', ''), ('PyPI', 'flask', '2.3.0'), ('PyPI', 'x', ''),
+        ]))
+
+    def test_package_lock(self):
+        v3 = {'lockfileVersion': 3, 'packages': {
+            '': {'name': 'app', 'version': '1.0.0'},
+            'node_modules/lodash': {'version': '4.17.20'},
+            'node_modules/a/node_modules/@scope/b': {'version': '2.0.0'},
+            'node_modules/linked': {'link': True, 'version': '1.0.0'},
+        }}
+        self.assertEqual(manifest.parse_package_lock(json.dumps(v3)), [
+            ('npm', '@scope/b', '2.0.0'), ('npm', 'lodash', '4.17.20'),
+        ])
+        v1 = {'lockfileVersion': 1, 'dependencies': {'a': {'version': '1.0.0', 'dependencies': {'b': {'version': '2.0.0'}}}}}
+        self.assertEqual(manifest.parse_manifest(json.dumps(v1))[1], [('npm', 'a', '1.0.0'), ('npm', 'b', '2.0.0')])
+        with self.assertRaises(manifest.ManifestError):
+            manifest.parse_package_lock('{broken')
+
+    def test_go_sum(self):
+        text = ('golang.org/x/text v0.3.7 h1:abc=\n'
+                'golang.org/x/text v0.3.7/go.mod h1:def=\n')
+        self.assertEqual(manifest.parse_manifest(text), ('go.sum', [('Go', 'golang.org/x/text', 'v0.3.7')]))
+
+    def test_purl(self):
+        self.assertEqual(manifest.parse_purl('pkg:maven/org.apache.logging.log4j/log4j-core@2.15.0-rc1'),
+                         ('Maven', 'org.apache.logging.log4j:log4j-core', '2.15.0-rc1'))
+        self.assertEqual(manifest.parse_purl('pkg:npm/%40angular/core@12.0.0?arch=x'), ('npm', '@angular/core', '12.0.0'))
+        self.assertEqual(manifest.parse_purl('pkg:pypi/django'), ('PyPI', 'django', ''))
+        self.assertIsNone(manifest.parse_purl('pkg:unknown/x@1'))
+
+    def test_cyclonedx(self):
+        bom = {'bomFormat': 'CycloneDX', 'components': [
+            {'purl': 'pkg:gem/rails@7.0.0', 'components': [{'purl': 'pkg:gem/rack@2.2.3'}]},
+            {'name': 'no purl'},
+        ]}
+        self.assertEqual(manifest.parse_manifest(json.dumps(bom)), ('cyclonedx', [
+            ('RubyGems', 'rack', '2.2.3'), ('RubyGems', 'rails', '7.0.0'),
+        ]))
+
+    def test_unknown_formats(self):
+        with self.assertRaises(manifest.ManifestError):
+            manifest.parse_manifest('{"name": "x"}')
+        with self.assertRaises(manifest.ManifestError):
+            manifest.parse_manifest('', manifest_format='pom.xml')
+
+
+class IntervalIndexTests(TestCase):
+
+    def setUp(self):
+        log4shell = Vulnerability.objects.create(cve_id='CVE-2021-44228', title='Log4Shell', description='', severity='CRITICAL')
+        osv = compact_osv_affected([
+            {'package': {'ecosystem': 'Maven', 'name': 'org.apache.logging.log4j:log4j-core'},
+             'ranges': [{'type': 'ECOSYSTEM', 'events': [{'introduced': '2.0-beta9'}, {'fixed': '2.15.0'}]}]},
+            {'package': {'ecosystem': 'PyPI', 'name': 'Example_Pkg'},
+             'ranges': [{'type': 'ECOSYSTEM', 'events': [{'introduced': '0'}, {'last_affected': '1.4'},
+                                                          {'introduced': '2.0'}]},
+                        {'type': 'GIT', 'events': [{'introduced': 'abc123'}]}]},
+        ])
+        store_ranges([(log4shell, 'GHSA-jfh8-c2jp-5v3q', osv)])
+
+    def affected(self, *dependencies):
+        return [(result['name'], result['version']) for result in IntervalIndex().lookup(list(dependencies))]
+
+    def test_maven_pre_releases_are_inside_the_range(self):
+        log4j = 'org.apache.logging.log4j:log4j-core'
+        self.assertEqual(
+            self.affected(('Maven', log4j, '2.0-beta9'), ('Maven', log4j, '2.15.0-rc1'), ('Maven', log4j, '2.14.1'),
+                          ('Maven', log4j, '2.15.0'), ('Maven', log4j, '2.0-beta8'), ('Maven', log4j, '')),
+            [(log4j, '2.0-beta9'), (log4j, '2.15.0-rc1'), (log4j, '2.14.1')],
+        )
+
+    def test_open_and_inclusive_bounds(self):
+        self.assertEqual(
+            self.affected(('PyPI', 'example-pkg', '0.1'), ('PyPI', 'example.pkg', '1.4'), ('PyPI', 'Example_Pkg', '1.5'),
+                          ('PyPI', 'example-pkg', '3.0')),
+            [('example-pkg', '0.1'), ('example.pkg', '1.4'), ('example-pkg', '3.0')],
+        )
+
+    def test_match_reports_the_advisory(self):
+        (result,) = IntervalIndex().lookup([('Maven', 'org.apache.logging.log4j:log4j-core', '2.14.1')])
+        self.assertEqual(result['vulnerabilities'], [{
+            'id': 'GHSA-jfh8-c2jp-5v3q', 'cve_id': 'CVE-2021-44228',
+            'introduced': '2.0-beta9', 'fixed': '2.15.0', 'last_affected': '',
+        }])
+
+    def test_ranges_stored_by_another_worker_are_picked_up(self):
+        index = IntervalIndex()
+        dependency = ('npm', 'left-pad', '1.0.0')
+        self.assertEqual(index.lookup([dependency]), [])
+
+        # Another worker stores ranges for the package; its per-process cache is not shared
+        vuln = Vulnerability.objects.create(cve_id='CVE-2024-0001', title='left-pad', description='', severity='LOW')
+        ranges = [{'ecosystem': 'npm', 'package': 'left-pad', 'intervals': [('0', '1.1.0', '')]}]
+        with mock.patch('collectors.services.range_index.transaction.on_commit'):
+            store_ranges([(vuln, 'GHSA-xxxx', ranges)])
+        self.assertEqual(index.lookup([dependency]), [])
+        IndexGeneration.objects.update_or_create(name='ranges', defaults={'generation': 99})
+        self.assertEqual(len(index.lookup([dependency])), 1)
+
+    def test_storing_ranges_bumps_the_shared_generation(self):
+        vuln = Vulnerability.objects.create(cve_id='CVE-2024-0001', title='left-pad', description='', severity='LOW')
+        ranges = [{'ecosystem': 'npm', 'package': 'left-pad', 'intervals': [('0', '1.1.0', '')]}]
+        with self.captureOnCommitCallbacks(execute=True):
+            store_ranges([(vuln, 'GHSA-xxxx', ranges)])
+        with self.captureOnCommitCallbacks(execute=True):
+            store_ranges([(vuln, 'GHSA-xxxx', ranges)])  # Unchanged
+        self.assertEqual(IndexGeneration.objects.get(name='ranges').generation, 1)
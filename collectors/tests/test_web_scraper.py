@@ -0,0 +1,38 @@
+import threading
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from collectors.services.web_scraper import OSVDatabaseScraper
+
+
+class OsvHydrateTests(SimpleTestCase):
+
+    def test_deadline_bounds_the_wait(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def get_vuln(vuln_id):
+            if vuln_id == 'SLOW-1':
+                release.wait(10)  # A fetch stuck until its request timeout
+            return {'id': vuln_id}
+
+        scraper = OSVDatabaseScraper()
+        scraper.deadline = 0.2
+        started = time.monotonic()
+        with mock.patch.object(scraper, 'get_vuln', side_effect=get_vuln):
+            records = scraper.hydrate(['FAST-1', 'SLOW-1', 'FAST-2'])
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual([record['id'] for record in records], ['FAST-1', 'FAST-2'])
+
+    def test_failed_fetches_are_skipped(self):
+        def get_vuln(vuln_id):
+            if vuln_id == 'BAD':
+                raise ValueError('invalid JSON')
+            return {'id': vuln_id}
+
+        scraper = OSVDatabaseScraper()
+        with mock.patch.object(scraper, 'get_vuln', side_effect=get_vuln):
+            self.assertEqual(scraper.hydrate(['A', 'BAD']), [{'id': 'A'}])
+        self.assertEqual(scraper.hydrate([]), [])
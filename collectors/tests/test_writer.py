@@ -0,0 +1,128 @@
+from concurrent.futures import Future
+from unittest import mock
+
+from django.db import transaction
+from django.test import TransactionTestCase
+
+from collectors.collector import get_source, reset_source_cache
+from collectors.models import Vulnerability, VulnerabilitySource
+from collectors.services import known_ids, near_dup
+from collectors.services.records import VulnRecord
+from collectors.services.writer import WriteQueue, save_in_transaction, save_records
+
+
+def pair(cve_id, title, **fields):
+    return 'NVD', VulnRecord(cve_id=cve_id, title=title, source='NVD', description=f"About {title}", **fields)
+
+
+def job(pairs, update_existing=False):
+    return list(pairs), update_existing, Future()
+
+
+class WriterTestCase(TransactionTestCase):
+
+    def setUp(self):
+        # Tables are flushed between tests, as after a purge
+        reset_source_cache()
+        known_ids.reset_filter()
+        near_dup.reset_index()
+        get_source('NVD')
+        self.addCleanup(known_ids.reset_filter)
+        self.addCleanup(near_dup.reset_index)
+
+
+class SaveRecordsTests(WriterTestCase):
+
+    def test_rolled_back_save_leaves_filter_untouched(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                save_records([pair('CVE-2024-0001', 'First')])
+                raise RuntimeError('rollback')
+        self.assertEqual(known_ids.get_filter().classify('CVE-2024-0001', 'First'), known_ids.NEW)
+
+        result = save_records([pair('CVE-2024-0001', 'First')])
+        self.assertEqual(len(result.created), 1)
+        self.assertTrue(Vulnerability.objects.filter(cve_id='CVE-2024-0001').exists())
+
+    def test_committed_save_is_remembered(self):
+        with transaction.atomic():
+            save_records([pair('CVE-2024-0001', 'First')])
+            # Not before the commit
+            self.assertEqual(known_ids.get_filter().classify('CVE-2024-0001'), known_ids.NEW)
+        self.assertNotEqual(known_ids.get_filter().classify('CVE-2024-0001'), known_ids.NEW)
+
+    def test_calls_sharing_a_transaction_see_each_other(self):
+        written = set()
+        with transaction.atomic():
+            save_records([pair('CVE-2024-0001', 'Same story')], written=written)
+            second = save_records([pair('CVE-2024-0001', 'Other'), pair('CVE-2024-0002', 'Same story')], written=written)
+        self.assertEqual(second.created, [])
+        self.assertEqual(Vulnerability.objects.count(), 1)
+
+    def test_update_existing_changes_the_row(self):
+        save_records([pair('CVE-2024-0001', 'First', severity='LOW')])
+        result = save_records([pair('CVE-2024-0001', 'First', severity='HIGH')], update_existing=True)
+        self.assertEqual(len(result.updated), 1)
+        self.assertEqual(Vulnerability.objects.get(cve_id='CVE-2024-0001').severity, 'HIGH')
+
+        unchanged = save_records([pair('CVE-2024-0001', 'First', severity='HIGH')], update_existing=True)
+        self.assertEqual(unchanged.updated, [])
+
+
+    def test_update_reports_rollup_changes(self):
+        save_records([pair('CVE-2024-0001', 'First', severity='LOW')])
+        result = save_records([pair('CVE-2024-0001', 'First', severity='HIGH')], update_existing=True)
+        changes = {key: delta for key, delta in result.stat_changes.items() if delta}
+        self.assertEqual(changes, {('severity', 'LOW'): -1, ('severity', 'HIGH'): 1})
+
+
+class SourceCacheTests(WriterTestCase):
+
+    def test_source_created_in_rolled_back_transaction_is_not_cached(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                get_source('OSV')
+                raise RuntimeError('rollback')
+        records = [('OSV', VulnRecord(cve_id='CVE-2024-0001', title='First', source='OSV'))]
+        save_in_transaction([(records, False)])
+        self.assertEqual(Vulnerability.objects.get(cve_id='CVE-2024-0001').source.name, 'OSV')
+
+    def test_purged_source_is_fetched_again(self):
+        # Another process purged the sources table behind this process's cache
+        VulnerabilitySource.objects.all().delete()
+        result = save_in_transaction([([pair('CVE-2024-0001', 'First')], False)])[0]
+        self.assertEqual(len(result.created), 1)
+        self.assertEqual(Vulnerability.objects.get(cve_id='CVE-2024-0001').source.name, 'NVD')
+
+
+class WriteQueueTests(WriterTestCase):
+
+    def test_failed_batch_is_retried_job_by_job(self):
+        good = job([pair('CVE-2024-0001', 'Good one'), pair('CVE-2024-0002', 'Good two')])
+        bad = job([pair('CVE-2024-0003', 'Bad', affected_ranges=[{'ecosystem': 'PyPI', 'package': 'x', 'intervals': []}])])
+
+        with mock.patch('collectors.services.range_index.store_ranges', side_effect=RuntimeError('broken')):
+            WriteQueue()._commit([good, bad])
+
+        self.assertEqual(len(good[2].result(timeout=0).created), 2)
+        with self.assertRaises(RuntimeError):
+            bad[2].result(timeout=0)
+        self.assertEqual(
+            sorted(Vulnerability.objects.values_list('cve_id', flat=True)), ['CVE-2024-0001', 'CVE-2024-0002']
+        )
+        known = known_ids.get_filter()
+        self.assertNotEqual(known.classify('CVE-2024-0001'), known_ids.NEW)
+        self.assertEqual(known.classify('CVE-2024-0003', 'Bad'), known_ids.NEW)
+
+    def test_batch_deduplicates_across_jobs(self):
+        first = job([pair('CVE-2024-0001', 'Shared')])
+        second = job([pair('CVE-2024-0001', 'Shared'), pair('CVE-2024-0002', 'New')])
+        WriteQueue()._commit([first, second])
+
+        self.assertEqual(len(first[2].result(timeout=0).created), 1)
+        self.assertEqual([v.cve_id for v in second[2].result(timeout=0).created], ['CVE-2024-0002'])
+        self.assertEqual(Vulnerability.objects.count(), 2)
+
+    def test_submit_runs_on_the_writer_thread(self):
+        future = WriteQueue(batch_window=0.01).submit([pair('CVE-2024-0001', 'Threaded')])
+        self.assertEqual(len(future.result(timeout=10).created), 1)
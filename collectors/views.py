@@ -1,49 +1,265 @@
 from datetime import timezone
 from django.shortcuts import render
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse, HttpResponse, Http404
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
 from django.views import View
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
-from django.core.paginator import Paginator
+from django.core.handlers.asgi import ASGIRequest
 from django.db.models import Q
 import json
+import math
 import time
 
-from collectors.collector import harvestData
+from collectors.collector import stream_harvest, astream_harvest
 
-from .models import Vulnerability, SearchQuery, VulnerabilitySource
+from .models import Vulnerability, SearchQuery, LatestVulnerability
 from .services.scrapper import  VulnerabilityAggregatorFixed
+from .services.stats import get_dashboard_stats
+from .services import export
+from .services.purge import PurgeJob
+from .services import detail_cache, recent
+from .services.manifest import parse_manifest, ManifestError
+from .services.range_index import get_index
+from .services import cpe_index
+from .services.ranking import get_ranking_settings, rank
+from .services import autocomplete
+from .middleware import AsyncReplicaReadsMixin
 
+@method_decorator(csrf_exempt, name='dispatch')
 class DeleteDataView(View):
+    """Purge all collected data on a background thread"""
+    
+    def get(self, request):
+        """Status of the last purge job"""
+        return JsonResponse(PurgeJob.status())
+    
+    def post(self, request):
+        if not PurgeJob.start():
+            return JsonResponse({'message': 'A purge is already running', 'status': PurgeJob.status()}, status=409)
+        return JsonResponse({'message': 'Data purge started', 'status': PurgeJob.status()}, status=202)
+
+
+class DashboardView(View):
+    """Dashboard statistics served from the pre-aggregated rollup tables"""
+    
+    replica_reads = True
+    
+    def get(self, request):
+        # Without ?top= the dashboard shows DASHBOARD_TOP_QUERIES queries
+        top_n = None
+        if 'top' in request.GET:
+            try:
+                top_n = max(1, min(int(request.GET['top']), 100))
+            except ValueError:
+                pass
+        return JsonResponse(get_dashboard_stats(top_n))
+
+class ExportDataView(AsyncReplicaReadsMixin, View):
+    """Stream the vulnerability table as CSV, NDJSON, Parquet or Arrow"""
+    
+    async def get(self, request):
+        export_format = request.GET.get('format', 'ndjson').lower()
+        compress = request.GET.get('gzip', '').lower() in ('1', 'true', 'yes')
+        try:
+            chunk_size = max(100, min(int(request.GET.get('chunk_size', 2000)), 20000))
+        except ValueError:
+            chunk_size = 2000
+        
+        try:
+            fields = export.parse_fields(request.GET.get('fields'))
+            queryset = export.build_queryset(
+                fields,
+                since=request.GET.get('since', ''),
+                severity=request.GET.get('severity', ''),
+                source=request.GET.get('source', ''),
+                ecosystem=request.GET.get('ecosystem', ''),
+            ).using(getattr(request, 'read_db', 'default'))  # Evaluated while streaming, after the middleware has returned
+            stream = export.export_stream(export_format, queryset, fields, chunk_size, compress)
+        except export.ExportError as e:
+            return JsonResponse({'error': str(e), 'success': False}, status=400)
+        
+        content_type, extension = export.EXPORT_FORMATS[export_format]
+        filename = f"vulnerabilities-{time.strftime('%Y%m%d')}.{extension}"
+        if compress:
+            content_type = 'application/gzip'
+            filename += '.gz'
+        
+        if isinstance(request, ASGIRequest):
+            # Django would read a sync iterator into memory before sending it over ASGI
+            stream = export.aiter_stream(stream)
+        response = StreamingHttpResponse(stream, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+class VulnerabilityDetailView(AsyncReplicaReadsMixin, View):
+    """Vulnerability detail page (HTML or JSON) served from the per-record cache"""
+    
+    async def get(self, request, cve_id=None, vuln_id=None):
+        payload = await detail_cache.aget_payload(cve_id=cve_id, vuln_id=vuln_id)
+        if payload is None:
+            if request.GET.get('format') == 'json' or 'application/json' in request.headers.get('Accept', ''):
+                return JsonResponse({'error': 'Vulnerability not found', 'success': False}, status=404)
+            raise Http404('Vulnerability not found')
+        
+        last_modified = int(payload['updated_at'].timestamp())
+        response = get_conditional_response(request, etag=payload['etag'], last_modified=last_modified)
+        if response is None:
+            if request.GET.get('format') == 'json' or 'application/json' in request.headers.get('Accept', ''):
+                response = JsonResponse(detail_cache.json_payload(payload))
+            else:
+                html = await detail_cache.aget_cached_html(payload)
+                if html is None:
+                    html = render_to_string(
+                        'collectors/vulnerability_detail.html',
+                        detail_cache.template_context(payload),
+                        request=request,
+                    )
+                    await detail_cache.aset_cached_html(payload, html)
+                response = HttpResponse(html)
+        
+        response['ETag'] = payload['etag']
+        response['Last-Modified'] = http_date(last_modified)
+        response['Vary'] = 'Accept'
+        patch_cache_control(response, max_age=0, must_revalidate=True)
+        return response
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class ScanManifestView(View):
+    """Match a dependency manifest or SBOM against the local affected-range index"""
+    
+    MAX_MANIFEST_BYTES = 10 * 1024 * 1024
+    
+    def post(self, request):
+        upload = request.FILES.get('manifest')
+        if upload:
+            if upload.size > self.MAX_MANIFEST_BYTES:
+                return JsonResponse({'error': 'Manifest too large', 'success': False}, status=413)
+            filename = upload.name
+            content = upload.read()
+        else:
+            filename = request.GET.get('filename', '')
+            content = request.body
+        
+        if not content:
+            return JsonResponse({'error': 'Empty manifest', 'success': False}, status=400)
+        
+        try:
+            text = content.decode('utf-8-sig')
+            manifest_format, dependencies = parse_manifest(text, filename, request.GET.get('format', ''))
+        except UnicodeDecodeError:
+            return JsonResponse({'error': 'Manifest must be UTF-8 text', 'success': False}, status=400)
+        except ManifestError as e:
+            return JsonResponse({'error': str(e), 'success': False}, status=400)
+        
+        start = time.time()
+        pinned = [d for d in dependencies if d[2]]
+        vulnerable = get_index().lookup(pinned)
+        
+        return JsonResponse({
+            'success': True,
+            'format': manifest_format,
+            'dependencies': len(dependencies),
+            'unpinned': [{'ecosystem': e, 'name': n} for e, n, v in dependencies if not v],
+            'vulnerable_count': len(vulnerable),
+            'vulnerable': vulnerable,
+            'elapsed_ms': round((time.time() - start) * 1000, 2),
+        })
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class CpeLookupView(View):
+    """Resolve CPE strings to CVEs through the local CPE criteria index"""
+    
+    MAX_CPES = 20000
+    
+    def get(self, request):
+        return self.lookup(request.GET.getlist('cpe'))
+    
+    def post(self, request):
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return JsonResponse({'error': 'Invalid JSON', 'success': False}, status=400)
+        cpes = data.get('cpes') if isinstance(data, dict) else data
+        if not isinstance(cpes, list) or not all(isinstance(c, str) for c in cpes):
+            return JsonResponse({'error': 'Expected a list of CPE strings', 'success': False}, status=400)
+        return self.lookup(cpes)
+    
+    def lookup(self, cpes):
+        if not cpes:
+            return JsonResponse({'error': 'No CPE given', 'success': False}, status=400)
+        if len(cpes) > self.MAX_CPES:
+            return JsonResponse({'error': f'At most {self.MAX_CPES} CPEs per request', 'success': False}, status=413)
+        
+        start = time.time()
+        results = cpe_index.get_index().lookup(cpes)
+        
+        return JsonResponse({
+            'success': True,
+            'cpes': len(cpes),
+            'vulnerable_count': sum(1 for r in results if r['vulnerabilities']),
+            'results': results,
+            'elapsed_ms': round((time.time() - start) * 1000, 2),
+        })
+
+
+class AutocompleteView(View):
+    """Typeahead suggestions (CVE/advisory IDs, packages, titles) for the search box"""
+    
+    replica_reads = True
+    
     def get(self, request):
-        Vulnerability.objects.all().delete()
-        SearchQuery.objects.all().delete()
-        VulnerabilitySource.objects.all().delete()
-        return JsonResponse({'message': 'Data deleted successfully'})
+        query = request.GET.get('q', '')
+        try:
+            limit = int(request.GET.get('limit', 0)) or None
+        except ValueError:
+            limit = None
+        
+        start = time.time()
+        suggestions = autocomplete.suggest(query, limit)
+        return JsonResponse({
+            'query': query,
+            'suggestions': suggestions,
+            'elapsed_ms': round((time.time() - start) * 1000, 2),
+        })
+
 
 class HomeView(View):
     """Home page with search form"""
     
+    replica_reads = True
+    
     def get(self, request):
-        recent_searches = SearchQuery.objects.all().order_by('-created_at')[:10]
-        recent_vulnerabilities = Vulnerability.objects.all().order_by('-published_date')[:5]
+        # Querysets stay lazy: they only run when a cached fragment has expired
+        recent_searches = SearchQuery.objects.only('query', 'results_count', 'created_at').order_by('-created_at')[:10]
+        recent_vulnerabilities = LatestVulnerability.objects.all()[:5]
         
         context = {
             'recent_searches': recent_searches,
             'recent_vulnerabilities': recent_vulnerabilities,
+            'fragment_versions': recent.fragment_versions(),
+            'fragment_timeout': recent.get_home_settings()['FRAGMENT_TIMEOUT'],
         }
         return render(request, 'collectors/home.html', context)
 
 
 @method_decorator(csrf_exempt, name='dispatch')
-class SearchVulnerabilitiesView(View):
+class SearchVulnerabilitiesView(AsyncReplicaReadsMixin, View):
     """API endpoint to search vulnerabilities from all sources"""
     
-    def get(self, request):
+    # GET lists stored rows from the replica; POST harvests and is always routed to the primary
+    
+    async def get(self, request):
         """Display search page or show results from database"""
         query = request.GET.get('q', '')
         page = request.GET.get('page', 1)
         limit = int(request.GET.get('limit', 20))
+        by_relevance = bool(query) and request.GET.get('sort') == 'relevance'
         
         if query:
             # Search in existing database
@@ -56,13 +272,33 @@ class SearchVulnerabilitiesView(View):
         else:
             vulnerabilities = Vulnerability.objects.all().order_by('-published_date')
         
-        # Pagination
-        paginator = Paginator(vulnerabilities, limit)
-        page_obj = paginator.get_page(page)
+        if request.GET.get('duplicates') not in ('1', 'true', 'yes'):
+            # Near-duplicate copies of a story are listed once, under their canonical row
+            vulnerabilities = vulnerabilities.filter(canonical__isnull=True)
+        
+        # Pagination, with the same page rules as Paginator.get_page()
+        total_results = await vulnerabilities.acount()
+        if by_relevance:
+            # Only the newest MAX_CANDIDATES matches are ranked and paged through
+            total_results = min(total_results, get_ranking_settings()['MAX_CANDIDATES'])
+        total_pages = max(1, math.ceil(total_results / limit))
+        try:
+            page_number = int(page)
+        except (TypeError, ValueError):
+            page_number = 1
+        if page_number < 1 or page_number > total_pages:
+            page_number = total_pages
+        offset = (page_number - 1) * limit
         
         # Format for template
+        if by_relevance:
+            candidates = [vuln async for vuln in vulnerabilities.select_related('source')[:total_results]]
+            rows = [vuln for score, vuln in rank(query, candidates)[offset:offset + limit]]
+        else:
+            rows = [vuln async for vuln in vulnerabilities.select_related('source')[offset:offset + limit]]
+        
         vuln_list = []
-        for vuln in page_obj:
+        for vuln in rows:
             vuln_list.append({
                 'id': vuln.id,
                 'cve_id': vuln.cve_id,
@@ -70,24 +306,25 @@ class SearchVulnerabilitiesView(View):
                 'description': vuln.description[:200] + '...' if len(vuln.description) > 200 else vuln.description,
                 'severity': vuln.severity,
                 'cvss_score': float(vuln.cvss_score) if vuln.cvss_score else None,
-                'published_date': vuln.published_date.strftime('%Y-%m-%d') if vuln.published_date else '',
+                'published_date': vuln.published_date[:10] if vuln.published_date else '',
                 'source': vuln.source.name if vuln.source else 'Unknown',
                 'source_url': vuln.source_url,
             })
         
         context = {
             'query': query,
+            'sort': 'relevance' if by_relevance else 'date',
             'vulnerabilities': vuln_list,
             'page': page,
-            'total_pages': paginator.num_pages,
-            'total_results': paginator.count,
-            'has_previous': page_obj.has_previous(),
-            'has_next': page_obj.has_next(),
+            'total_pages': total_pages,
+            'total_results': total_results,
+            'has_previous': page_number > 1,
+            'has_next': page_number < total_pages,
         }
         
         return render(request, 'collectors/search_results.html', context)
     
-    def post(self, request):
+    async def post(self, request):
         """API endpoint to perform new search from external sources"""
         
         #remove all lines in models
@@ -99,11 +336,39 @@ class SearchVulnerabilitiesView(View):
                 'error': 'Query must be at least 2 characters long',
                 'success': False
             }, status=400)
+        caps = {}
+        for name in ('max_results', 'max_per_source'):
+            value = data.get(name)
+            if value is not None:
+                if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+                    return JsonResponse({
+                        'error': f"'{name}' must be a positive integer",
+                        'success': False
+                    }, status=400)
+                caps[name] = value
+        # Best match first unless the client asks for results as they arrive
+        order = data.get('order', 'relevance')
+        if order not in ('arrival', 'relevance'):
+            return JsonResponse({
+                'error': "'order' must be 'arrival' or 'relevance'",
+                'success': False
+            }, status=400)
+        # Skip the freshness check and ask every source that can answer the query
+        refresh = data.get('refresh', False)
+        if not isinstance(refresh, bool):
+            return JsonResponse({
+                'error': "'refresh' must be true or false",
+                'success': False
+            }, status=400)
+        
         user_ip = request.META.get('REMOTE_ADDR')
         user_agent = request.META.get('HTTP_USER_AGENT', '')
-        data = harvestData(query, user_ip, user_agent)
-        if data.get('error'):
-            return JsonResponse(data, status=500)
+        # Results are written out batch by batch as they are stored, ranked ones once
+        # MAX_CANDIDATES are held (best match first) or the harvest ends
+        ranked = order == 'relevance'
+        if isinstance(request, ASGIRequest):
+            stream = astream_harvest(query, user_ip, user_agent, ranked=ranked, refresh=refresh, **caps)
         else:
-            return JsonResponse(data)
+            stream = stream_harvest(query, user_ip, user_agent, ranked=ranked, refresh=refresh, **caps)
+        return StreamingHttpResponse(stream, content_type='application/json')
             
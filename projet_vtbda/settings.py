@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -50,6 +51,10 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Resets this worker's in-memory caches after a purge in any worker
+    'collectors.middleware.PurgeGenerationMiddleware',
+    # Last: it runs opted-in views itself, after every other process_view
+    'collectors.middleware.ReplicaRoutingMiddleware',
 ]
 
 ROOT_URLCONF = 'projet_vtbda.urls'
@@ -75,10 +80,124 @@ WSGI_APPLICATION = 'projet_vtbda.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
-DATABASES = {
+# Set VTBDA_DB_ENGINE=postgres (plus VTBDA_DB_* below) for production. Setting
+# VTBDA_DB_REPLICA_HOST adds a read replica used by the listing/detail/export views.
+
+if os.environ.get('VTBDA_DB_ENGINE', 'sqlite') == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('VTBDA_DB_NAME', 'vtbda'),
+            'USER': os.environ.get('VTBDA_DB_USER', 'vtbda'),
+            'PASSWORD': os.environ.get('VTBDA_DB_PASSWORD', ''),
+            'HOST': os.environ.get('VTBDA_DB_HOST', 'localhost'),
+            'PORT': os.environ.get('VTBDA_DB_PORT', '5432'),
+            # Keep connections open between requests, checking them before reuse
+            'CONN_MAX_AGE': int(os.environ.get('VTBDA_DB_CONN_MAX_AGE', 600)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'connect_timeout': 5,
+            },
+        }
+    }
+    if os.environ.get('VTBDA_DB_REPLICA_HOST'):
+        DATABASES['replica'] = {
+            **DATABASES['default'],
+            'HOST': os.environ['VTBDA_DB_REPLICA_HOST'],
+            'PORT': os.environ.get('VTBDA_DB_REPLICA_PORT', DATABASES['default']['PORT']),
+            'TEST': {'MIRROR': 'default'},
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('VTBDA_DB_NAME', BASE_DIR / 'db.sqlite3'),
+        }
+    }
+
+DATABASE_ROUTERS = ['collectors.db_router.ReadReplicaRouter']
+
+DATABASE_ROUTING = {
+    'PIN_COOKIE': 'vtbda_primary',  # Set after a write so that client reads from the primary
+    'STICKY_SECONDS': 15,           # Longer than the replica is expected to lag
+}
+
+# Pragmas applied to every new SQLite connection (ignored on other backends). The
+# defaults live in collectors.signals.get_sqlite_tuning(); set SQLITE_TUNING = {...}
+# here only to override some of them, e.g. {'SYNCHRONOUS': 'FULL'}.
+
+# Streaming harvest: scrapers -> normalize -> dedupe -> batch persist -> response
+HARVEST_PIPELINE = {
+    'BATCH_SIZE': 200,        # Records persisted and written to the response together
+    'QUEUE_SIZE': 1000,       # Normalized records buffered before scrapers block
+    'MAX_PER_SOURCE': None,   # Optional cap on records taken from one source
+    'MAX_PER_QUERY': None,    # Optional cap on unique records per harvest
+    'DEADLINE': 25,           # Seconds spent waiting on sources before the rest are abandoned
+}
+
+# Searches are classified (CVE, advisory ID, package, CPE, free text) and only sent to the
+# sources that can answer them, unless those answered the same query recently
+QUERY_PLANNER = {
+    'ENABLED': True,
+    'FRESH_FOR': {         # Seconds a source's answer stays fresh, per query class
+        'cve': 86400,
+        'advisory': 86400,
+        'package': 6 * 3600,
+        'cpe': 86400,
+        'text': 3600,
+    },
+    'LOCAL_LIMIT': 500,    # Stored rows returned ahead of (or instead of) upstream results
+}
+
+# Per-source latency, success rate and yield per query class decide the order and timeout of
+# each source; sources that rarely contribute are only refreshed in the background
+SOURCE_SCHEDULER = {
+    'ENABLED': True,
+    'MIN_RUNS': 5,             # Runs for a query class before a source's stats are acted on
+    'MIN_SUCCESS_RATE': 0.3,
+    'MIN_YIELD': 0.1,          # Distinct records per run
+    'TIMEOUT_FACTOR': 3,       # Timeout: average latency plus this many standard deviations
+    'MIN_TIMEOUT': 3,
+    'BACKGROUND': True,        # False drops demoted sources instead of refreshing them in the background
+}
+
+# Relevance ranking of harvested results and of ?sort=relevance listings
+RANKING = {
+    'TEXT': 1.0,          # BM25 over title and description, scaled to 0-1
+    'EXACT_ID': 3.0,      # Query is the record's CVE or advisory ID
+    'PACKAGE': 1.5,       # Query is an affected package
+    'SOURCE': 0.3,        # Times the source's SOURCE_TRUST weight
+    'CVSS': 0.2,
+    'RECENCY': 0.2,
+    'MAX_CANDIDATES': 1000,
+}
+
+# Optional process pool for CPU-bound HTML parsing and normalization of large batches
+CPU_POOL = {
+    'ENABLED': False,          # Worth it on multi-core hosts with bulk ingests
+    'WORKERS': 0,              # 0: one per CPU
+    'MIN_ITEMS': 500,          # Smaller pages are normalized inline
+    'CHUNK_SIZE': 500,         # Raw items per task sent to a worker
+    'MIN_HTML_BYTES': 20000,   # Smaller pages are parsed inline
+    'START_METHOD': 'spawn',   # Forking a process with live threads is unsafe
+}
+
+# Harvest writes go through one writer thread that commits in large transactions
+SINGLE_WRITER = {
+    'ENABLED': None,       # None: only when the default database is SQLite
+    'MAX_BATCH_JOBS': 50,  # Harvests committed together
+    'BATCH_WINDOW': 0.05,  # Seconds to wait for more harvests before committing
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'vtbda',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
     }
 }
 
@@ -130,8 +249,22 @@ VULNERABILITY_SCANNER = {
     'NVD_API_URL': 'https://services.nvd.nist.gov/rest/json',
     'GITHUB_TOKEN': '',  # Add your GitHub token
     'SNYK_TOKEN': '',    # Add your Snyk token
+    'NVD_API_KEYS': [],  # Add your NVD API key(s); several keys are used in rotation
+    'NVD_MAX_RESULTS': 10000,      # Cap on results paged in per NVD keyword search
+    'NVD_PAGE_WORKERS': 4,         # Concurrent NVD page requests
+    'SCRAPER_WORKERS': 8,          # Concurrent detail page fetches per scraper spec
+    'SCRAPER_CACHE_TIMEOUT': 300,  # Seconds extracted listing pages stay cached
+    'ASYNC_IO_WORKERS': 128,       # Threads shared by all harvests for blocking scraper calls
     'MAX_RESULTS_PER_SOURCE': 50,
     'REQUEST_TIMEOUT': 30,
+    'DASHBOARD_TOP_QUERIES': 10,
+    'DETAIL_CACHE_TIMEOUT': 3600,  # Seconds a cached vulnerability detail page lives
+    'HOME_RING_SIZE': 20,          # Rows kept in the latest-vulnerabilities ring
+    'HOME_FRAGMENT_TIMEOUT': 60,   # Seconds a cached home page fragment lives
+    'OSV_MAX_PAGES': 20,           # next_page_token rounds followed per OSV query
+    'OSV_HYDRATE_WORKERS': 16,     # Concurrent /v1/vulns/{id} fetches
+    'OSV_DEADLINE': 20,            # Seconds before unfinished hydrations are dropped
+    'OSV_CACHE_TIMEOUT': 21600,    # Seconds a fetched OSV record stays cached
 }
 
 CORS_ALLOW_ALL_ORIGINS = True
@@ -153,4 +286,49 @@ VULNERABILITY_SOURCES = {
     'ENABLE_GITHUB': False,  # Set to True if you have token
     'ENABLE_VULNCHECK': False,  # Set to True if you have token
     'ENABLE_VULNERS': False,  # Set to True if you have token
-}
\ No newline at end of file
+}
+
+# Search analytics are buffered in memory and written with bulk_create
+SEARCH_ANALYTICS = {
+    'BUFFERED': True,          # False writes each search immediately
+    'BUFFER_SIZE': 100,        # Flush after this many searches...
+    'FLUSH_INTERVAL': 5.0,     # ...or after this many seconds
+    'USER_AGENT_CACHE_SIZE': 1000,
+}
+
+# Process-local filter over stored CVE IDs used to skip existence checks on ingest
+KNOWN_ID_FILTER = {
+    'CAPACITY': 1000000,   # Bloom filter sized for this many IDs + titles
+    'ERROR_RATE': 0.01,    # False positive rate (a false positive only costs one query)
+    'EXACT_SIZE': 50000,   # Recently seen IDs kept with their content fingerprint
+}
+
+# Search box typeahead: in-memory prefix index, plus pg_trgm title matches on PostgreSQL
+AUTOCOMPLETE = {
+    'LIMIT': 10,
+    'REFRESH_INTERVAL': 5,     # Seconds between checks for newly stored rows
+    'MAX_TITLES': 200000,      # Newest titles held in memory for prefix matches
+    'FUZZY_THRESHOLD': 0.3,
+}
+
+# MinHash/LSH linking of near-identical items without a CVE ID (news, Snyk, GitHub)
+NEAR_DUPLICATES = {
+    'ENABLED': True,
+    'NUM_PERM': 64,      # Signature length; must equal BANDS * ROWS
+    'BANDS': 16,
+    'ROWS': 4,
+    'THRESHOLD': 0.6,    # Estimated Jaccard similarity needed to link to a canonical row
+}
+
+# Purge and retention (python manage.py apply_retention)
+DATA_RETENTION = {
+    'SEARCH_QUERY_DAYS': 90,  # Raw SearchQuery rows older than this are rolled into daily aggregates
+    'BATCH_SIZE': 5000,       # Rows per delete transaction
+    'PURGE_STALE_AFTER': 3600,  # Seconds before a purge left 'running' by a dead worker can be restarted
+}
+
+# Fetched detail pages (advisories, articles) kept compressed in the database
+PAGE_STORE = {
+    'FRESHNESS': 3600,               # Seconds a stored page is used without refetching
+    'MAX_BYTES': 100 * 1024 * 1024,  # Compressed size kept before least recently used pages go
+}